@@ -0,0 +1,4 @@
+"""benchmarks: reproducible performance measurements for pydpkg
+
+Run ``python -m benchmarks --help`` from the top of the repository.
+"""
@@ -0,0 +1,99 @@
+"""Run the pydpkg benchmarks and write the results as JSON.
+
+usage: python -m benchmarks [--size N] [--quick] [--filter SUBSTR]
+                            [--output FILE] [--compare OLD.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import importlib
+import json
+import pkgutil
+import platform
+import subprocess
+import sys
+from typing import Any
+
+import benchmarks
+from benchmarks.harness import BENCHMARKS, Context
+
+
+def _load_benchmarks() -> None:
+    for module in pkgutil.iter_modules(benchmarks.__path__):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(old: dict[str, Any], new: dict[str, Any]) -> None:
+    """Print the relative change of every metric present in both runs"""
+    for name, metrics in sorted(new["results"].items()):
+        for metric, value in sorted(metrics.items()):
+            previous = old.get("results", {}).get(name, {}).get(metric)
+            if not isinstance(previous, (int, float)) or not isinstance(value, (int, float)) or not previous:
+                continue
+            change = (value - previous) / previous * 100
+            if metric.endswith(("_bytes", "_seconds")):
+                change = -change
+            print(f"{name + ':' + metric:<70} {previous:>14} -> {value:>14}  {change:+7.1f}%")
+
+
+def main() -> None:
+    """pylint really wants a docstring :)"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000, help="corpus size (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=5612, help="corpus seed (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="small corpora, skip the slowest baselines")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--compare", help="print changes relative to an earlier JSON result file")
+    args = parser.parse_args()
+
+    ctx = Context(size=args.size, seed=args.seed, repeat=args.repeat, quick=args.quick)
+    if args.quick:
+        ctx.size = min(ctx.size, 10_000)
+        ctx.repeat = 1
+
+    _load_benchmarks()
+    results: dict[str, Any] = {}
+    for name, func in sorted(BENCHMARKS.items()):
+        if args.filter not in name:
+            continue
+        print(f"running {name}", file=sys.stderr)
+        results[name] = func(ctx)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "size": ctx.size,
+            "seed": ctx.seed,
+            "repeat": ctx.repeat,
+        },
+        "results": results,
+    }
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fileobj:
+            fileobj.write(rendered + "\n")
+    else:
+        print(rendered)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fileobj:
+            _compare(json.load(fileobj), report)
+
+
+if __name__ == "__main__":
+    main()
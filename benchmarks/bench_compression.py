@@ -0,0 +1,46 @@
+"""benchmarks.bench_compression: throughput of each available decompressor
+backend on a tar archive shaped like a package's data.tar"""
+
+from __future__ import annotations
+
+import random
+
+from pydpkg.ar import MemoryviewReader
+from pydpkg.compression import Opener, decompressors
+from pydpkg.dpkg import READ_BUFFER_SIZE
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time
+from tests.debfactory import build_tar, compress
+
+
+def _payload(rnd: random.Random, files: int) -> bytes:
+    """Return a tar archive of half text, half incompressible files"""
+    members = []
+    for idx in range(files):
+        if idx % 2:
+            data = rnd.randbytes(32768)
+        else:
+            data = "".join(f"line {line}: lorem ipsum dolor sit amet\n" for line in range(800)).encode()
+        members.append((f"./usr/share/synthetic/file{idx}", data))
+    return build_tar(members)
+
+
+def _drain(opener: Opener, compressed: bytes) -> int:
+    total = 0
+    with memoryview(compressed) as view, MemoryviewReader(view) as reader, opener(reader) as fileobj:
+        while chunk := fileobj.read(READ_BUFFER_SIZE):
+            total += len(chunk)
+    return total
+
+
+@benchmark("compression.backends")
+def bench_backends(ctx: Context) -> Metrics:
+    payload = _payload(random.Random(ctx.seed), 64 if ctx.quick else 512)
+    metrics: Metrics = {"payload_bytes": len(payload)}
+    for suffix in ("gz", "xz", "zst", "bz2", ""):
+        compressed = compress(payload, suffix)
+        for backend in decompressors(suffix):
+            assert _drain(backend.open, compressed) == len(payload)
+            seconds = best_time(lambda: _drain(backend.open, compressed), ctx.repeat)  # pylint: disable=cell-var-from-loop
+            metrics[f"{suffix or 'none'}_{backend.name}_mb_per_sec"] = round(len(payload) / seconds / (1 << 20), 1)
+    return metrics
@@ -0,0 +1,75 @@
+"""benchmarks.bench_deb822: deb822 versus email parsing of control data"""
+
+from __future__ import annotations
+
+import random
+import re
+from email import message_from_string
+
+from pydpkg.deb822 import Deb822, iter_paragraphs
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+
+_SEPARATOR = re.compile(r"\n(?:[ \t]*\n)+")
+
+
+def stanza(rnd: random.Random, idx: int, description_lines: int) -> str:
+    """Return a Packages stanza shaped like those in the Debian archive"""
+    description = "".join(f" {'lorem ipsum dolor sit amet ' * 2}{line}\n" for line in range(description_lines))
+    depends = ", ".join(f"lib{rnd.getrandbits(24):06x}{rnd.randint(0, 9)} (>= {rnd.randint(1, 9)}.0)" for _ in range(8))
+    return (
+        f"Package: synthetic{idx}\n"
+        f"Version: 1:{rnd.randint(0, 20)}.{rnd.randint(0, 99)}-{rnd.randint(1, 5)}\n"
+        "Architecture: amd64\n"
+        "Maintainer: Nobody <nobody@example.com>\n"
+        f"Installed-Size: {rnd.randint(1, 100000)}\n"
+        f"Depends: {depends}\n"
+        "Section: misc\n"
+        "Priority: optional\n"
+        f"Filename: pool/main/s/synthetic{idx}/synthetic{idx}_1.0-1_amd64.deb\n"
+        f"Size: {rnd.randint(1000, 10**8)}\n"
+        f"MD5sum: {rnd.getrandbits(128):032x}\n"
+        f"SHA256: {rnd.getrandbits(256):064x}\n"
+        f"Description: a synthetic package\n{description}"
+    )
+
+
+def _email_paragraphs(text: str) -> list[dict[str, str]]:
+    return [dict(message_from_string(para).items()) for para in _SEPARATOR.split(text) if para.strip()]
+
+
+def _deb822_paragraphs(text: str) -> list[dict[str, str]]:
+    return [dict(para.fields()) for para in iter_paragraphs(text)]
+
+
+@benchmark("deb822.large_control")
+def bench_large_control(ctx: Context) -> Metrics:
+    rnd = random.Random(ctx.seed)
+    text = stanza(rnd, 0, 2000 if ctx.quick else 20000)
+    loops = 10
+    email_seconds = best_time(lambda: [dict(message_from_string(text).items()) for _ in range(loops)], ctx.repeat)
+    deb822_seconds = best_time(lambda: [dict(Deb822.parse(text).fields()) for _ in range(loops)], ctx.repeat)
+    # what Dpkg.headers needs versus what Dpkg.package needs
+    lookup_seconds = best_time(lambda: [Deb822.parse(text)["package"] for _ in range(loops)], ctx.repeat)
+    return {
+        "control_bytes": len(text),
+        "email_per_sec": rate(loops, email_seconds),
+        "deb822_per_sec": rate(loops, deb822_seconds),
+        "deb822_one_field_per_sec": rate(loops, lookup_seconds),
+    }
+
+
+@benchmark("deb822.packages_file")
+def bench_packages_file(ctx: Context) -> Metrics:
+    rnd = random.Random(ctx.seed)
+    count = 2000 if ctx.quick else 20000
+    text = "\n".join(stanza(rnd, idx, rnd.randint(1, 12)) for idx in range(count))
+    assert _email_paragraphs(text) == _deb822_paragraphs(text)
+    email_seconds = best_time(lambda: _email_paragraphs(text), ctx.repeat)
+    deb822_seconds = best_time(lambda: _deb822_paragraphs(text), ctx.repeat)
+    return {
+        "packages_bytes": len(text),
+        "stanzas": count,
+        "email_per_sec": rate(count, email_seconds),
+        "deb822_per_sec": rate(count, deb822_seconds),
+    }
@@ -0,0 +1,68 @@
+"""benchmarks.bench_extract: control extraction time and peak memory on
+packages with very large control archives"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import tracemalloc
+
+from pydpkg.dpkg import Dpkg
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time
+from tests.debfactory import write_deb
+
+
+def md5sums(size: int) -> bytes:
+    """Return an md5sums file of roughly the given size"""
+    lines = []
+    total = 0
+    idx = 0
+    while total < size:
+        line = f"{idx:032x}  usr/share/synthetic/{idx:010d}/some/longish/path/file.txt\n".encode()
+        lines.append(line)
+        total += len(line)
+        idx += 1
+    return b"".join(lines)
+
+
+def _measure(path: str, repeat: int) -> Metrics:
+    seconds = best_time(lambda: Dpkg(path).message, repeat)
+    tracemalloc.start()
+    try:
+        Dpkg(path).message
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(seconds, 4), "peak_bytes": peak}
+
+
+def _bench(ctx: Context, compression: str) -> Metrics:
+    size = 4 << 20 if ctx.quick else 64 << 20
+    payload = md5sums(size)
+    metrics: Metrics = {"md5sums_bytes": len(payload)}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for order in ("control_first", "control_last"):
+            members = [("./md5sums", payload)]
+            if order == "control_last":
+                members.insert(0, ("./triggers", b"interest foo\n"))
+                members.append(("./control", b""))
+            path = write_deb(os.path.join(tmpdir, f"{order}.deb"), control_members=members, compression=compression)
+            for metric, value in _measure(path, ctx.repeat).items():
+                metrics[f"{order}_{metric}"] = value
+    return metrics
+
+
+@benchmark("extract.large_control_gz")
+def bench_large_control_gz(ctx: Context) -> Metrics:
+    return _bench(ctx, "gz")
+
+
+@benchmark("extract.large_control_xz")
+def bench_large_control_xz(ctx: Context) -> Metrics:
+    return _bench(ctx, "xz")
+
+
+@benchmark("extract.large_control_zst")
+def bench_large_control_zst(ctx: Context) -> Metrics:
+    return _bench(ctx, "zst")
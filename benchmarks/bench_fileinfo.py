@@ -0,0 +1,69 @@
+"""benchmarks.bench_fileinfo: checksumming throughput, and the cost of
+reading control plus checksums in one pass versus two"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+
+from unittest import mock
+
+from pydpkg.dpkg import DIGESTS, Dpkg
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+from tests.debfactory import write_deb
+
+
+def _write_package(tmpdir: str, ctx: Context) -> str:
+    """Write a package with a large, incompressible data.tar"""
+    size = 16 << 20 if ctx.quick else 256 << 20
+    rnd = random.Random(ctx.seed)
+    blob = b"".join(rnd.randbytes(1 << 20) for _ in range(size >> 20))
+    return write_deb(os.path.join(tmpdir, "large.deb"), data_members=[("./usr/share/blob", blob)])
+
+
+def _separate(path: str) -> None:
+    dpkg = Dpkg(path)
+    dpkg.headers
+    dpkg.fileinfo
+
+
+def _ingest(path: str) -> None:
+    dpkg = Dpkg(path, ingest=True)
+    dpkg.headers
+    dpkg.fileinfo
+
+
+@benchmark("fileinfo.ingest")
+def bench_ingest(ctx: Context) -> Metrics:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_package(tmpdir, ctx)
+        filesize = os.path.getsize(path)
+        fileinfo_seconds = best_time(lambda: Dpkg(path).fileinfo, ctx.repeat)
+        separate_seconds = best_time(lambda: _separate(path), ctx.repeat)
+        ingest_seconds = best_time(lambda: _ingest(path), ctx.repeat)
+    return {
+        "filesize_bytes": filesize,
+        "fileinfo_mb_per_sec": rate(filesize >> 20, fileinfo_seconds),
+        "separate_seconds": round(separate_seconds, 4),
+        "ingest_seconds": round(ingest_seconds, 4),
+    }
+
+
+@benchmark("fileinfo.digests")
+def bench_digests(ctx: Context) -> Metrics:
+    metrics: Metrics = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = _write_package(tmpdir, ctx)
+        megabytes = os.path.getsize(path) >> 20
+        for name in DIGESTS:
+            seconds = best_time(lambda: Dpkg(path).digest(name), ctx.repeat)  # pylint: disable=cell-var-from-loop
+            metrics[f"{name}_mb_per_sec"] = rate(megabytes, seconds)
+        with mock.patch("pydpkg.dpkg.PARALLEL_DIGEST_THRESHOLD", sys.maxsize):
+            serial_seconds = best_time(lambda: Dpkg(path, digests=DIGESTS).fileinfo, ctx.repeat)
+        parallel_seconds = best_time(lambda: Dpkg(path, digests=DIGESTS).fileinfo, ctx.repeat)
+    metrics["all_serial_mb_per_sec"] = rate(megabytes, serial_seconds)
+    metrics["all_parallel_mb_per_sec"] = rate(megabytes, parallel_seconds)
+    return metrics
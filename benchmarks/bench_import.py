@@ -0,0 +1,61 @@
+"""benchmarks.bench_import: time to import pydpkg, and what it costs to
+reach the package readers, measured in fresh interpreters with
+python -X importtime"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import Context, Metrics, benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a bare "import pydpkg" loads no submodule, so anything near the cost of
+# the eager imports (about 0.16s, most of it pgpy) is a regression
+IMPORT_BUDGET_SECONDS = 0.02
+
+STATEMENTS = {
+    "import": "import pydpkg",
+    "versions": "from pydpkg import DebVersion",
+    "dpkg": "from pydpkg import Dpkg",
+    "dsc": "from pydpkg.dsc import Dsc; import pgpy",
+}
+
+
+def import_seconds(statement: str) -> float:
+    """Return the cumulative import time of a statement run in a fresh
+    interpreter, leaving out what the interpreter imports at startup"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    started = False
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        if name.strip() == "site" and not started:
+            # everything before and including site is interpreter startup
+            started = True
+            continue
+        if started and not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1_000_000
+
+
+@benchmark("import.pydpkg")
+def bench_import(ctx: Context) -> Metrics:
+    metrics: Metrics = {}
+    for label, statement in STATEMENTS.items():
+        metrics[f"{label}_seconds"] = round(min(import_seconds(statement) for _ in range(ctx.repeat)), 4)
+    assert metrics["import_seconds"] < IMPORT_BUDGET_SECONDS, f"import pydpkg took {metrics['import_seconds']}s"
+    return metrics
@@ -0,0 +1,28 @@
+"""benchmarks.bench_metrics: the cost of instrumentation, off and on"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.metrics import PhaseStats, instrument
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+from tests.debfactory import write_deb
+
+
+@benchmark("metrics.overhead")
+def bench_overhead(ctx: Context) -> Metrics:
+    loops = 500 if ctx.quick else 5000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_deb(os.path.join(tmpdir, "synthetic.deb"), data_members=[("./usr/share/blob", os.urandom(65536))])
+        off_seconds = best_time(lambda: [Dpkg(path).control for _ in range(loops)], ctx.repeat)
+        stats = PhaseStats()
+        with instrument(stats):
+            on_seconds = best_time(lambda: [Dpkg(path).control for _ in range(loops)], ctx.repeat)
+    return {
+        "control_off_per_sec": rate(loops, off_seconds),
+        "control_on_per_sec": rate(loops, on_seconds),
+        "phases_recorded": sum(stats.count(phase) for phase in stats.phases()),
+    }
@@ -0,0 +1,39 @@
+"""benchmarks.bench_packages: full versus no-change Packages index builds"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+from pydpkg.packages import PackagesIndex
+
+from benchmarks.harness import Context, Metrics, benchmark, rate
+from tests.debfactory import DEFAULT_CONTROL, write_deb
+
+
+def _build(root: str, state_file: str) -> float:
+    start = time.perf_counter()
+    index = PackagesIndex(root, state_file=state_file)
+    index.update()
+    index.write(os.path.join(root, "dists", "Packages"), compressions=("", "gz", "xz"))
+    return time.perf_counter() - start
+
+
+@benchmark("packages.incremental")
+def bench_incremental(ctx: Context) -> Metrics:
+    count = 500 if ctx.quick else 5000
+    with tempfile.TemporaryDirectory() as root:
+        pool = os.path.join(root, "pool")
+        os.mkdir(pool)
+        for idx in range(count):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            write_deb(os.path.join(pool, f"synthetic{idx}_1.0-1_all.deb"), control=control)
+        state_file = os.path.join(root, "state.json")
+        full_seconds = _build(root, state_file)
+        unchanged_seconds = min(_build(root, state_file) for _ in range(ctx.repeat))
+    return {
+        "packages": count,
+        "full_per_sec": rate(count, full_seconds),
+        "unchanged_per_sec": rate(count, unchanged_seconds),
+    }
@@ -0,0 +1,63 @@
+"""benchmarks.bench_record: memory per package, PackageRecord versus Dpkg"""
+
+from __future__ import annotations
+
+import gc
+import os
+import random
+import tempfile
+import tracemalloc
+from typing import Any, Callable
+
+from pydpkg.deb822 import iter_paragraphs
+from pydpkg.dpkg import Dpkg
+from pydpkg.record import PackageRecord
+
+from benchmarks.bench_deb822 import stanza
+from benchmarks.harness import Context, Metrics, benchmark
+from tests.debfactory import write_deb
+
+
+def _allocated(build: Callable[[], list[Any]]) -> tuple[list[Any], int]:
+    """Return what build() returns and the bytes it still holds on to"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build()
+        gc.collect()
+        return built, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def _dpkg(path: str) -> Dpkg:
+    dpkg = Dpkg(path)
+    # what a Packages index needs from each package
+    dpkg.headers  # pylint: disable=pointless-statement
+    dpkg.fileinfo  # pylint: disable=pointless-statement
+    return dpkg
+
+
+@benchmark("record.memory")
+def bench_memory(ctx: Context) -> Metrics:
+    rnd = random.Random(ctx.seed)
+    count = 200 if ctx.quick else 2000
+    stanzas = [stanza(rnd, idx, rnd.randint(1, 12)) for idx in range(count)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for idx, text in enumerate(stanzas):
+            control = "".join(f"{name}: {value}\n" for name, value in next(iter_paragraphs(text)).fields())
+            paths.append(write_deb(os.path.join(tmpdir, f"synthetic{idx}.deb"), control=control))
+        _, dpkg_bytes = _allocated(lambda: [_dpkg(path) for path in paths])
+        # each Dpkg is dropped once its record is built
+        _, record_bytes = _allocated(lambda: [PackageRecord.from_dpkg(_dpkg(path)) for path in paths])
+    _, packages_bytes = _allocated(
+        lambda: [PackageRecord.from_stanza(para) for para in iter_paragraphs("\n".join(stanzas))]
+    )
+    return {
+        "packages": count,
+        "dpkg_per_package_bytes": dpkg_bytes // count,
+        "record_per_package_bytes": record_bytes // count,
+        "record_from_packages_per_package_bytes": packages_bytes // count,
+    }
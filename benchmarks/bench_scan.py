@@ -0,0 +1,27 @@
+"""benchmarks.bench_scan: package scanning throughput by worker count"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+from pydpkg.scanner import scan
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+from tests.debfactory import DEFAULT_CONTROL, write_deb
+
+
+@benchmark("scan.pool")
+def bench_scan(ctx: Context) -> Metrics:
+    count = 200 if ctx.quick else 2000
+    metrics: Metrics = {"packages": count}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for idx in range(count):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            files = [(f"./usr/share/doc/synthetic{idx}/file{n}", os.urandom(4096)) for n in range(8)]
+            write_deb(os.path.join(tmpdir, f"synthetic{idx}_1.0-1_all.deb"), control=control, data_members=files)
+        cpus = os.cpu_count() or 1
+        for workers in sorted({1, 2, cpus}):
+            seconds = best_time(lambda: sum(1 for _ in scan([tmpdir], workers=workers, chunksize=8)), ctx.repeat)  # pylint: disable=cell-var-from-loop
+            metrics[f"workers{workers}_per_sec"] = rate(count, seconds)
+    return metrics
@@ -0,0 +1,35 @@
+"""benchmarks.bench_verify: md5sums verification throughput by worker count"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+from pydpkg.verify import verify
+
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+from tests.debfactory import DEFAULT_CONTROL, write_deb
+
+
+@benchmark("verify.pool")
+def bench_verify(ctx: Context) -> Metrics:
+    count = 50 if ctx.quick else 500
+    files = 16
+    metrics: Metrics = {"packages": count, "payload_bytes": count * files * 65536}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for idx in range(count):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            members = [(f"./usr/share/doc/synthetic{idx}/file{n}", os.urandom(65536)) for n in range(files)]
+            sums = "".join(f"{hashlib.md5(data).hexdigest()}  {path[2:]}\n" for path, data in members)
+            write_deb(
+                os.path.join(tmpdir, f"synthetic{idx}_1.0-1_all.deb"),
+                control=control,
+                control_members=[("./md5sums", sums.encode())],
+                data_members=members,
+            )
+        cpus = os.cpu_count() or 1
+        for workers in sorted({1, 2, cpus}):
+            seconds = best_time(lambda: sum(1 for _ in verify([tmpdir], workers=workers, chunksize=4)), ctx.repeat)  # pylint: disable=cell-var-from-loop
+            metrics[f"workers{workers}_per_sec"] = rate(count, seconds)
+    return metrics
@@ -0,0 +1,110 @@
+"""benchmarks.bench_versions: version parsing, comparison and sorting"""
+
+from __future__ import annotations
+
+import tracemalloc
+from functools import cmp_to_key
+
+from pydpkg import versions
+from pydpkg.dpkg import Dpkg
+from pydpkg.versions import DebVersion
+
+from benchmarks.corpus import generate_pairs, generate_versions
+from benchmarks.harness import Context, Metrics, benchmark, best_time, rate
+
+
+def _clear_memos() -> None:
+    versions.revision_key.cache_clear()
+    versions.alpha_key.cache_clear()
+    versions._encode_revision.cache_clear()  # pylint: disable=protected-access
+    versions._encode_alphas.cache_clear()  # pylint: disable=protected-access
+
+
+@benchmark("versions.compare_versions")
+def bench_compare_versions(ctx: Context) -> Metrics:
+    pairs = generate_pairs(ctx.size // 4, ctx.seed)
+    seconds = best_time(lambda: [Dpkg.compare_versions(a, b) for a, b in pairs], ctx.repeat)
+    return {"comparisons_per_sec": rate(len(pairs), seconds)}
+
+
+@benchmark("versions.compare_revision_strings")
+def bench_compare_revision_strings(ctx: Context) -> Metrics:
+    pairs = [(Dpkg.get_upstream(a)[0], Dpkg.get_upstream(b)[0]) for a, b in generate_pairs(ctx.size // 4, ctx.seed)]
+    single_pass = best_time(lambda: [Dpkg.compare_revision_strings(a, b) for a, b in pairs], ctx.repeat)
+    listify = best_time(lambda: [Dpkg.compare_revision_strings_listify(a, b) for a, b in pairs], ctx.repeat)
+    return {
+        "single_pass_comparisons_per_sec": rate(len(pairs), single_pass),
+        "listify_comparisons_per_sec": rate(len(pairs), listify),
+    }
+
+
+@benchmark("versions.dstringcmp")
+def bench_dstringcmp(ctx: Context) -> Metrics:
+    words = ["~rc", "+dfsg", ".", "ubuntu", "+deb", "~bpo", "build", "+b", "~git", "."]
+    pairs = [(a, b) for a in words for b in words] * max(1, ctx.size // 400)
+    seconds = best_time(lambda: [Dpkg.dstringcmp(a, b) for a, b in pairs], ctx.repeat)
+    return {"comparisons_per_sec": rate(len(pairs), seconds)}
+
+
+@benchmark("versions.listify")
+def bench_listify(ctx: Context) -> Metrics:
+    upstreams = [Dpkg.get_upstream(v)[0] for v in generate_versions(ctx.size // 4, ctx.seed)]
+    seconds = best_time(lambda: [Dpkg.listify(u) for u in upstreams], ctx.repeat)
+    return {"calls_per_sec": rate(len(upstreams), seconds)}
+
+
+@benchmark("versions.compare_versions_key")
+def bench_compare_versions_key(ctx: Context) -> Metrics:
+    corpus = generate_versions(ctx.size, ctx.seed)
+
+    def cold() -> None:
+        _clear_memos()
+        for version in corpus:
+            Dpkg.compare_versions_key(version)
+
+    seconds = best_time(cold, ctx.repeat)
+    return {"keys_per_sec": rate(len(corpus), seconds)}
+
+
+@benchmark("versions.sort")
+def bench_sort(ctx: Context) -> Metrics:
+    corpus = generate_versions(ctx.size, ctx.seed)
+
+    def key_sort() -> None:
+        _clear_memos()
+        sorted(corpus, key=Dpkg.compare_versions_key)
+
+    def bulk_sort() -> None:
+        _clear_memos()
+        Dpkg.sort_versions(corpus)
+
+    def bulk_max() -> None:
+        _clear_memos()
+        Dpkg.max_version(corpus)
+
+    metrics = {
+        "key_sort_versions_per_sec": rate(len(corpus), best_time(key_sort, ctx.repeat)),
+        "sort_versions_per_sec": rate(len(corpus), best_time(bulk_sort, ctx.repeat)),
+        "max_version_versions_per_sec": rate(len(corpus), best_time(bulk_max, ctx.repeat)),
+    }
+    if not ctx.quick:
+        # the old cmp_to_key path is quadratic-ish in parse work; keep it small
+        sample = corpus[: min(len(corpus), 20_000)]
+        seconds = best_time(lambda: sorted(sample, key=cmp_to_key(Dpkg.compare_versions)), 1)
+        metrics["cmp_to_key_sort_versions_per_sec"] = rate(len(sample), seconds)
+    return metrics
+
+
+@benchmark("versions.memory")
+def bench_memory(ctx: Context) -> Metrics:
+    corpus = generate_versions(min(ctx.size, 100_000), ctx.seed)
+    _clear_memos()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        parsed = [DebVersion(version) for version in corpus]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {"debversion_bytes": round(allocated / len(parsed), 1)}
@@ -0,0 +1,107 @@
+"""benchmarks.corpus: generate realistic debian version string corpora
+
+The shapes and rough frequencies are modelled on the Debian and Ubuntu
+archives: mostly dotted upstream versions, some date-based ones, a few
+epochs, native packages without a debian revision, ~rc/~beta pre-releases,
++dfsg/+ds repacks, stable updates (+debNNuN), backports (~bpoNN+N) and
+Ubuntu's ubuntuN, buildN and point-release revisions.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Callable
+
+FLAVORS = ("debian", "ubuntu", "mixed")
+
+
+def _upstream(rnd: random.Random) -> str:
+    shape = rnd.random()
+    if shape < 0.08:
+        upstream = f"{rnd.randint(2005, 2025)}{rnd.randint(1, 12):02}{rnd.randint(1, 28):02}"
+    elif shape < 0.15:
+        upstream = str(rnd.randint(0, 200))
+    else:
+        parts = rnd.choice((2, 3, 3, 3, 4))
+        upstream = ".".join(str(int(rnd.expovariate(0.25))) for _ in range(parts))
+    suffix = rnd.random()
+    if suffix < 0.06:
+        upstream += f"~rc{rnd.randint(1, 5)}"
+    elif suffix < 0.09:
+        upstream += f"~beta{rnd.randint(1, 3)}"
+    elif suffix < 0.12:
+        upstream += (
+            f"~git{rnd.randint(2015, 2025)}{rnd.randint(1, 12):02}{rnd.randint(1, 28):02}.{rnd.getrandbits(28):07x}"
+        )
+    if rnd.random() < 0.12:
+        upstream += rnd.choice(("+dfsg", "+dfsg1", "+ds", "+ds1", "+repack"))
+    return upstream
+
+
+def _debian_revision(rnd: random.Random) -> str:
+    revision = str(rnd.choice((1, 1, 1, 1, 2, 2, 3, 4, 5, 7, 12)))
+    kind = rnd.random()
+    if kind < 0.08:
+        revision += f"+deb{rnd.randint(9, 13)}u{rnd.randint(1, 9)}"
+    elif kind < 0.12:
+        revision += f"~bpo{rnd.randint(9, 13)}+{rnd.randint(1, 3)}"
+    elif kind < 0.15:
+        revision += f"+b{rnd.randint(1, 4)}"
+    return revision
+
+
+def _ubuntu_revision(rnd: random.Random) -> str:
+    kind = rnd.random()
+    if kind < 0.35:
+        return f"{rnd.randint(0, 5)}ubuntu{rnd.randint(1, 9)}"
+    if kind < 0.5:
+        release = rnd.choice(("18.04", "20.04", "22.04", "24.04"))
+        return f"{rnd.randint(0, 3)}ubuntu0.{release}.{rnd.randint(1, 9)}"
+    if kind < 0.6:
+        return f"{rnd.randint(1, 5)}build{rnd.randint(1, 3)}"
+    if kind < 0.65:
+        return f"0ubuntu1~{rnd.choice(('20.04', '22.04', '24.04'))}.{rnd.randint(1, 3)}"
+    return _debian_revision(rnd)
+
+
+def generate_version(rnd: random.Random, flavor: str = "mixed") -> str:
+    """Return a single random version string of the given flavor"""
+    if flavor == "mixed":
+        flavor = rnd.choice(("debian", "ubuntu"))
+    revision: Callable[[random.Random], str] = _ubuntu_revision if flavor == "ubuntu" else _debian_revision
+    version = _upstream(rnd)
+    if rnd.random() < 0.9:
+        version += "-" + revision(rnd)
+    epoch = rnd.random()
+    if epoch < 0.05:
+        version = f"1:{version}"
+    elif epoch < 0.06:
+        version = f"{rnd.randint(2, 5)}:{version}"
+    return version
+
+
+def generate_versions(count: int, seed: int = 5612, flavor: str = "mixed") -> list[str]:
+    """Return a reproducible list of version strings.  Versions repeat
+    the way they do in a real archive listing: most packages have a
+    handful of versions and many packages share the same one."""
+    if flavor not in FLAVORS:
+        raise ValueError(f"flavor must be one of {FLAVORS}")
+    rnd = random.Random(seed)
+    distinct = [generate_version(rnd, flavor) for _ in range(max(1, count // 3))]
+    return [rnd.choice(distinct) if rnd.random() < 0.4 else generate_version(rnd, flavor) for _ in range(count)]
+
+
+def generate_pairs(count: int, seed: int = 5612) -> list[tuple[str, str]]:
+    """Return a reproducible list of version pairs to compare; half of
+    them are versions of the same upstream, as dependency checks are"""
+    rnd = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        ver1 = generate_version(rnd)
+        if rnd.random() < 0.5:
+            upstream = ver1.rsplit("-", 1)[0]
+            ver2 = f"{upstream}-{_debian_revision(rnd)}"
+        else:
+            ver2 = generate_version(rnd)
+        pairs.append((ver1, ver2))
+    return pairs
@@ -0,0 +1,58 @@
+"""benchmarks.harness: timing helpers and the benchmark registry"""
+
+from __future__ import annotations
+
+import gc
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict
+
+Metrics = Dict[str, Any]
+
+
+@dataclass
+class Context:
+    """Settings shared by every benchmark in a run"""
+
+    size: int = 100_000
+    seed: int = 5612
+    repeat: int = 3
+    quick: bool = False
+
+
+BenchmarkFunc = Callable[[Context], Metrics]
+BENCHMARKS: dict[str, BenchmarkFunc] = {}
+
+
+def benchmark(name: str) -> Callable[[BenchmarkFunc], BenchmarkFunc]:
+    """Decorator registering a benchmark function under a dotted name.
+    Benchmark functions take a Context and return a flat dict of
+    metrics; throughput metrics should be named *_per_sec and sizes
+    *_bytes so that comparisons know which direction is better."""
+
+    def register(func: BenchmarkFunc) -> BenchmarkFunc:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def best_time(func: Callable[[], Any], repeat: int = 3) -> float:
+    """Return the fastest wall clock time, in seconds, of several calls
+    to func, with the garbage collector disabled while timing"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings)
+
+
+def rate(count: int, seconds: float) -> float:
+    """Return operations per second, rounded for stable diffs"""
+    return round(count / seconds, 1) if seconds else float("inf")
@@ -1,9 +1,49 @@
 """pydpkg: tools for inspecting dpkg archive files in python
 without any dependency on libapt
+
+The submodules and the names below are imported when first used, so
+that a script which only compares version strings does not pay for
+loading the package readers (or pgpy, which Dsc needs).
 """
 
-from pydpkg import dpkg
-from pydpkg import dsc
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pydpkg.dpkg import Dpkg
+    from pydpkg.dsc import Dsc
+    from pydpkg.scanner import scan
+    from pydpkg.versions import DebVersion, VersionConstraint, VersionIndex
+
+# name -> (module, attribute), or (module, None) for the module itself
+_LAZY = {
+    "dpkg": ("pydpkg.dpkg", None),
+    "dsc": ("pydpkg.dsc", None),
+    "scanner": ("pydpkg.scanner", None),
+    "versions": ("pydpkg.versions", None),
+    "Dpkg": ("pydpkg.dpkg", "Dpkg"),
+    "Dsc": ("pydpkg.dsc", "Dsc"),
+    "DebVersion": ("pydpkg.versions", "DebVersion"),
+    "VersionConstraint": ("pydpkg.versions", "VersionConstraint"),
+    "VersionIndex": ("pydpkg.versions", "VersionIndex"),
+    "scan": ("pydpkg.scanner", "scan"),
+}
+
+__all__ = ["Dpkg", "Dsc", "DebVersion", "VersionConstraint", "VersionIndex", "scan"]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY:
+        raise AttributeError(f"module 'pydpkg' has no attribute '{name}'")
+    module_name, attribute = _LAZY[name]
+    module = importlib.import_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    # later lookups find it directly, without coming back here
+    globals()[name] = value
+    return value
+
 
-Dpkg = dpkg.Dpkg
-Dsc = dsc.Dsc
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,388 @@
+"""pydpkg.aio: asyncio counterparts of Dpkg, Dsc and scan()
+
+Reading, decompressing and hashing packages blocks, so the async classes
+hand that work to an executor: by default the event loop's thread pool,
+or any concurrent.futures executor, including a ProcessPoolExecutor for
+hashing-bound workloads.  A semaphore (shared between objects if you
+like) caps how many jobs are in flight at once.
+
+Cancelling an await stops waiting at once; a job that an executor has
+already started runs to completion in the background, and its result is
+discarded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Sequence,
+    TypeVar,
+)
+
+from pydpkg.deb822 import Deb822
+from pydpkg.dpkg import DEFAULT_DIGESTS, DataMember, Digest, Dpkg, FileInfo, Source
+from pydpkg.dsc import Dsc, file_digests
+from pydpkg.exceptions import DpkgError, DscMissingFileError, DscBadChecksumsError
+from pydpkg.scanner import ScanRecord, iter_packages, scan_package
+
+if TYPE_CHECKING:
+    from collections import defaultdict
+    from email.message import Message
+
+    from pydpkg.cache import MetadataCache
+
+R = TypeVar("R")
+
+DEFAULT_LIMIT = 8
+
+
+def _semaphore(limit: int | asyncio.Semaphore) -> asyncio.Semaphore:
+    return limit if isinstance(limit, asyncio.Semaphore) else asyncio.Semaphore(limit)
+
+
+async def _run(executor: Executor | None, semaphore: asyncio.Semaphore, func: Callable[..., R], *args: Any) -> R:
+    """Run func(*args) in executor once the semaphore lets us"""
+    async with semaphore:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def _dpkg_ingest(
+    filename: str, digests: tuple[Digest, ...], ignore_missing: bool, cache: MetadataCache | None
+) -> dict[str, Any]:
+    """Ingest a package in a worker process and return what was learned"""
+    dpkg = Dpkg(filename, ignore_missing=ignore_missing, digests=digests, ingest=True, cache=cache)
+    return dpkg.ingest()._snapshot()  # pylint: disable=protected-access
+
+
+def _dpkg_data_members(filename: str) -> list[DataMember]:
+    return list(Dpkg(filename).data_members())
+
+
+def _dpkg_control(dpkg: Dpkg) -> Deb822:
+    return dpkg.control
+
+
+def _dpkg_message(dpkg: Dpkg) -> Message[str, str]:
+    return dpkg.message
+
+
+def _dpkg_fileinfo(dpkg: Dpkg) -> FileInfo:
+    return dpkg.fileinfo
+
+
+class AsyncDpkg:
+    """An asyncio wrapper for a Dpkg object; each coroutine runs the work
+    behind the matching Dpkg property in the executor.
+
+    Once loaded, everything is also available synchronously on the
+    wrapped dpkg attribute.
+    """
+
+    def __init__(
+        self, dpkg: Dpkg, executor: Executor | None = None, limit: int | asyncio.Semaphore = DEFAULT_LIMIT
+    ) -> None:
+        """Constructor for AsyncDpkg objects; see also AsyncDpkg.open()
+
+        :param dpkg: Dpkg
+        :param executor: concurrent.futures.Executor, defaulting to the
+            event loop's; with a ProcessPoolExecutor, dpkg must have been
+            made from a filename
+        :param limit: int or asyncio.Semaphore; jobs in flight at once
+        """
+        if isinstance(executor, ProcessPoolExecutor) and dpkg.filename is None:
+            raise DpkgError("a process pool can only be used with a Dpkg made from a filename")
+        self.dpkg = dpkg
+        self.executor = executor
+        self._semaphore = _semaphore(limit)
+        # Dpkg objects are not thread safe, so run one job at a time
+        self._lock = asyncio.Lock()
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"AsyncDpkg({self.dpkg.filename!r})"
+
+    @classmethod
+    async def open(
+        cls,
+        filename: Source,
+        executor: Executor | None = None,
+        limit: int | asyncio.Semaphore = DEFAULT_LIMIT,
+        **kwargs: Any,
+    ) -> AsyncDpkg:
+        """Make a Dpkg (which checks the file exists) without blocking
+
+        :param filename: as for Dpkg
+        :param executor: concurrent.futures.Executor
+        :param limit: int or asyncio.Semaphore; jobs in flight at once
+        :param kwargs: passed on to Dpkg
+        :returns: AsyncDpkg
+        """
+        dpkg = await asyncio.get_running_loop().run_in_executor(None, partial(Dpkg, filename, **kwargs))
+        return cls(dpkg, executor, limit)
+
+    @property
+    def _uses_process_pool(self) -> bool:
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    @property
+    def _ingested(self) -> bool:
+        """Return whether our dpkg already knows its control fields and
+        every selected digest, so a process pool has nothing to do"""
+        dpkg = self.dpkg
+        # pylint: disable=protected-access
+        return dpkg._control is not None and all(name in dpkg._digests for name in dpkg._digest_names)
+
+    async def _call(self, func: Callable[[Dpkg], R]) -> R:
+        """Run func(dpkg) in the executor or, for a process pool, ingest
+        the package there (unless that was done already) and fill in our
+        dpkg from the result"""
+        async with self._lock:
+            if not self._uses_process_pool:
+                return await _run(self.executor, self._semaphore, func, self.dpkg)
+            dpkg = self.dpkg
+            if self._ingested:
+                return func(dpkg)
+            record = await _run(
+                self.executor,
+                self._semaphore,
+                _dpkg_ingest,
+                dpkg.filename,
+                dpkg._digest_names,  # pylint: disable=protected-access
+                dpkg.ignore_missing,
+                dpkg._cache,  # pylint: disable=protected-access
+            )
+            dpkg._restore(record)  # pylint: disable=protected-access
+            # the worker already looked in (and filled in) the metadata
+            # cache; looking again here would block the event loop
+            dpkg._cache_loaded = True  # pylint: disable=protected-access
+            # everything needed is known now, so this does not block
+            return func(dpkg)
+
+    async def control(self) -> Deb822:
+        """Return the package control fields
+
+        :returns: pydpkg.deb822.Deb822
+        """
+        return await self._call(_dpkg_control)
+
+    async def message(self) -> Message[str, str]:
+        """Return the package control message
+
+        :returns: email.Message
+        """
+        return await self._call(_dpkg_message)
+
+    async def headers(self) -> dict[str, str]:
+        """Return the package control headers
+
+        :returns: dict
+        """
+        return dict((await self.control()).fields())
+
+    async def fileinfo(self) -> FileInfo:
+        """Return the selected checksums and the size of the package
+
+        :returns: dict
+        """
+        return await self._call(_dpkg_fileinfo)
+
+    async def ingest(self) -> AsyncDpkg:
+        """Read the control message and checksums in a single pass
+
+        :returns: AsyncDpkg (self)
+        """
+        await self._call(Dpkg.ingest)
+        return self
+
+    async def digest(self, name: Digest) -> str:
+        """Return a hex digest of the package
+
+        :param name: string; md5, sha1, sha256, sha512 or blake2b
+        :returns: string
+        """
+        if self._uses_process_pool and name not in self.dpkg._digest_names:  # pylint: disable=protected-access
+            raise DpkgError(f"select the '{name}' digest when opening the package to use a process pool")
+        return await self._call(partial(Dpkg.digest, name=name))
+
+    async def data_members(self) -> list[DataMember]:
+        """Return the members of the package's data archive
+
+        :returns: list of DataMember
+        """
+        async with self._lock:
+            if self._uses_process_pool:
+                return await _run(self.executor, self._semaphore, _dpkg_data_members, self.dpkg.filename)
+            return await _run(self.executor, self._semaphore, lambda dpkg: list(dpkg.data_members()), self.dpkg)
+
+
+class AsyncDsc:
+    """An asyncio wrapper for a Dsc object.  The dsc itself is parsed in
+    the event loop's thread pool; checksums are computed in the executor,
+    one job per source file, up to limit at once."""
+
+    def __init__(
+        self, dsc: Dsc, executor: Executor | None = None, limit: int | asyncio.Semaphore = DEFAULT_LIMIT
+    ) -> None:
+        """Constructor for AsyncDsc objects; see also AsyncDsc.open()
+
+        :param dsc: Dsc
+        :param executor: concurrent.futures.Executor, defaulting to the
+            event loop's
+        :param limit: int or asyncio.Semaphore; jobs in flight at once
+        """
+        self.dsc = dsc
+        self.executor = executor
+        self._semaphore = _semaphore(limit)
+        self._lock = asyncio.Lock()
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"AsyncDsc({self.dsc.filename!r})"
+
+    @classmethod
+    async def open(
+        cls,
+        filename: str,
+        executor: Executor | None = None,
+        limit: int | asyncio.Semaphore = DEFAULT_LIMIT,
+        logger: logging.Logger | None = None,
+        cache: MetadataCache | None = None,
+    ) -> AsyncDsc:
+        """Open a dsc file and parse it without blocking
+
+        :param filename: string
+        :param executor: concurrent.futures.Executor
+        :param limit: int or asyncio.Semaphore; jobs in flight at once
+        :param logger: logging.Logger
+        :param cache: pydpkg.cache.MetadataCache
+        :returns: AsyncDsc
+        """
+        self = cls(Dsc(filename, logger=logger, cache=cache), executor, limit)
+        await self.control()
+        return self
+
+    async def _parse(self, func: Callable[[Dsc], R]) -> R:
+        async with self._lock:
+            return await _run(None, self._semaphore, func, self.dsc)
+
+    async def control(self) -> Deb822:
+        """Return the fields of the dsc
+
+        :returns: pydpkg.deb822.Deb822
+        """
+        return await self._parse(lambda dsc: dsc.control)
+
+    async def message(self) -> Message[str, str]:
+        """Return the dsc message
+
+        :returns: email.Message
+        """
+        return await self._parse(lambda dsc: dsc.message)
+
+    async def headers(self) -> dict[str, str]:
+        """Return the dsc headers
+
+        :returns: dict
+        """
+        return dict((await self.control()).fields())
+
+    async def checksums(self) -> dict[str, dict[str, str]]:
+        """Return the checksums asserted by the dsc
+
+        :returns: dict
+        """
+        return await self._parse(lambda dsc: dsc.checksums)
+
+    async def missing_files(self) -> list[str]:
+        """Return the source files that the dsc lists but we cannot find
+
+        :returns: list of strings
+        """
+        return await self._parse(lambda dsc: dsc.missing_files)
+
+    async def corrected_checksums(self) -> dict[str, defaultdict[str, str | None]]:
+        """Hash the source files concurrently and return the correct
+        checksums wherever the dsc has them wrong
+
+        :returns: dict
+        """
+        dsc = self.dsc
+        if dsc._corrected_checksums is None:  # pylint: disable=protected-access
+            jobs = await self._parse(lambda dsc: dsc._checksum_jobs())  # pylint: disable=protected-access
+            digests = await asyncio.gather(
+                *(_run(self.executor, self._semaphore, file_digests, name, types) for name, types in jobs.items())
+            )
+            dsc._corrected_checksums = dsc._compare_checksums(  # pylint: disable=protected-access
+                dict(zip(jobs, digests))
+            )
+        return dsc._corrected_checksums  # pylint: disable=protected-access
+
+    async def all_checksums_correct(self) -> bool:
+        """Return true if all checksums are correct
+
+        :returns: bool
+        """
+        return not await self.corrected_checksums()
+
+    async def validate(self) -> None:
+        """Raise exceptions if files are missing or checksums are bad
+
+        :raises: DscMissingFileError, DscBadChecksumsError
+        """
+        missing = await self.missing_files()
+        if missing:
+            raise DscMissingFileError(missing)
+        corrected = await self.corrected_checksums()
+        if corrected:
+            raise DscBadChecksumsError(corrected)
+
+
+async def scan_async(
+    paths: Iterable[str],
+    executor: Executor | None = None,
+    limit: int = DEFAULT_LIMIT,
+    digests: Sequence[Digest] = DEFAULT_DIGESTS,
+    cache: MetadataCache | None = None,
+) -> AsyncIterator[ScanRecord]:
+    """Read the headers and fileinfo of many packages, like scan(), with
+    up to limit packages in flight; records are yielded as packages are
+    done, and a package that cannot be read yields a record with its
+    error.  Closing the iterator early (or cancelling the task driving
+    it) cancels the packages that have not started yet.
+
+    :param paths: iterable of package files and/or directories to search
+    :param executor: concurrent.futures.Executor, defaulting to the event
+        loop's; a ProcessPoolExecutor spreads the work across cpus
+    :param limit: int; packages in flight at once
+    :param digests: the checksums to include in fileinfo
+    :param cache: pydpkg.cache.MetadataCache
+    :returns: async iterator of dicts
+    """
+    loop = asyncio.get_running_loop()
+    func = partial(scan_package, digests=tuple(digests), cache=cache)
+    packages = iter_packages(paths)
+    pending: set[asyncio.Future[ScanRecord]] = set()
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < limit:
+                # walking directories blocks too
+                filename = await loop.run_in_executor(None, next, packages, None)
+                if filename is None:
+                    exhausted = True
+                else:
+                    pending.add(loop.run_in_executor(executor, func, filename))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
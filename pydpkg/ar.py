@@ -0,0 +1,167 @@
+"""pydpkg.ar: a minimal reader for the ar archives that wrap debian packages
+
+Members are located from their fixed-size headers alone, via a read_at
+callable; when that is backed by a memory map no member data is read (or
+copied) until a caller asks for it.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterator, NamedTuple, Union
+
+from pydpkg.exceptions import DpkgArchiveError
+
+if TYPE_CHECKING:
+    from _typeshed import WriteableBuffer
+
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+AR_FMAG = b"`\n"
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# read_at(offset, size) returns up to size bytes of the archive at offset
+ReadAt = Callable[[int, int], Buffer]
+
+
+class ArMember(NamedTuple):
+    """The name of an ar member and the location of its data"""
+
+    name: str
+    offset: int
+    size: int
+
+
+def _parse_header(header: Buffer, offset: int) -> tuple[str, int]:
+    """Return the raw name and the size of the member whose header was
+    found at offset"""
+    if len(header) < AR_HEADER_SIZE or bytes(header[58:60]) != AR_FMAG:
+        raise DpkgArchiveError(f"Corrupt ar archive: bad member header at offset {offset}")
+    try:
+        name = bytes(header[0:16]).decode("ascii").rstrip(" ")
+        size = int(bytes(header[48:58]).decode("ascii"))
+    except ValueError as ex:
+        raise DpkgArchiveError(f"Corrupt ar archive: bad member header at offset {offset}") from ex
+    return name, size
+
+
+def iter_members(read_at: ReadAt) -> Iterator[ArMember]:
+    """Yield the members of an ar archive, in order, reading nothing but
+    their headers (and, for long names, the name itself).  Handles both
+    the BSD (#1/len) and GNU (// table) long filename variants.
+
+    :param read_at: callable
+    :raises: DpkgArchiveError
+    """
+    if bytes(read_at(0, len(AR_MAGIC))) != AR_MAGIC:
+        raise DpkgArchiveError("Corrupt ar archive: bad magic")
+    offset = len(AR_MAGIC)
+    gnu_names = b""
+    while True:
+        header = read_at(offset, AR_HEADER_SIZE)
+        if not header:
+            return
+        name, size = _parse_header(header, offset)
+        data_offset = offset + AR_HEADER_SIZE
+        data_size = size
+        if name.startswith("#1/"):
+            if not name[3:].isdigit():
+                raise DpkgArchiveError(f"Corrupt ar archive: bad member name at offset {offset}")
+            name_len = int(name[3:])
+            name = bytes(read_at(data_offset, name_len)).rstrip(b"\0").decode("utf-8")
+            data_offset += name_len
+            data_size -= name_len
+        elif name == "//":
+            gnu_names = bytes(read_at(data_offset, size))
+            name = ""
+        elif name.startswith("/") and name[1:].isdigit():
+            start = int(name[1:])
+            end = gnu_names.find(b"\n", start)
+            name = gnu_names[start : end if end != -1 else None].decode("utf-8")
+        if name and name != "/":
+            yield ArMember(name.rstrip("/"), data_offset, data_size)
+        # member data is padded to an even offset
+        offset += AR_HEADER_SIZE + size + (size & 1)
+
+
+class MemoryviewReader(io.RawIOBase):
+    """A read-only, seekable file object over a memoryview (such as a
+    slice of a memory-mapped file), so that decompressors can consume an
+    archive member without it being copied out of the map first."""
+
+    def __init__(self, view: Buffer) -> None:
+        super().__init__()
+        self._view = memoryview(view).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def seekable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def tell(self) -> int:  # type: ignore[explicit-override]
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:  # type: ignore[explicit-override]
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer: WriteableBuffer) -> int:  # type: ignore[explicit-override]
+        target = memoryview(buffer).cast("B")
+        size = min(len(target), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        target[:size] = self._view[self._pos : self._pos + size]
+        self._pos += size
+        return size
+
+    def close(self) -> None:  # type: ignore[explicit-override]
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+class WindowReader(io.RawIOBase):
+    """A read-only, seekable file object over a window of another seekable
+    binary file object, for archives that cannot be memory-mapped"""
+
+    def __init__(self, fileobj: BinaryIO, offset: int, size: int) -> None:
+        super().__init__()
+        self._fileobj = fileobj
+        self._offset = offset
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def seekable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def tell(self) -> int:  # type: ignore[explicit-override]
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:  # type: ignore[explicit-override]
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer: WriteableBuffer) -> int:  # type: ignore[explicit-override]
+        target = memoryview(buffer).cast("B")
+        size = min(len(target), self._size - self._pos)
+        if size <= 0:
+            return 0
+        self._fileobj.seek(self._offset + self._pos)
+        data = self._fileobj.read(size)
+        target[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
@@ -0,0 +1,263 @@
+"""pydpkg.cache: a persistent metadata cache for Dpkg and Dsc objects
+
+Entries are JSON documents keyed on a file's real path and validated
+against its stat signature (device, inode, size, mtime_ns), or keyed on
+the sha256 of its contents, so that unchanged packages never have to be
+opened again.  The default backend is a SQLite database in WAL mode,
+which many worker processes can share.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Literal, NamedTuple, TypedDict
+
+from pydpkg.exceptions import DpkgError
+
+CacheKey = Literal["stat", "content"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET size = size - old.size + new.size;
+END;
+"""
+
+
+class CacheStats(TypedDict):
+    """Type definition for MetadataCache.stats(); the counters are for
+    this process only"""
+
+    hits: int
+    misses: int
+    stale: int
+    evictions: int
+    entries: int
+    size: int
+
+
+class CacheEntry(NamedTuple):
+    """Where a file's metadata is kept in the cache, and the signature
+    the file had when that was worked out"""
+
+    key: str
+    signature: str
+
+
+def stat_signature(path: str) -> str:
+    """Return a string that changes whenever the file at path is replaced
+    or modified: its device, inode, size and mtime in nanoseconds
+
+    :param path: string
+    :returns: string
+    """
+    stat = os.stat(path)
+    return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def content_digest(path: str) -> str:
+    """Return the sha256 hex digest of the file at path
+
+    :param path: string
+    :returns: string
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class MetadataCache:
+    """A size-bounded, least-recently-used metadata store in SQLite.
+
+    With key="stat" (the default) entries belong to a file's path and are
+    discarded as stale once its stat signature changes; looking one up
+    costs a stat() and never opens the file.  With key="content" entries
+    belong to the sha256 of the file's contents, which survives copies,
+    renames and touches but costs a full read of the file per lookup.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, path: str, max_bytes: int = 256 << 20, key: CacheKey = "stat", timeout: float = 30.0) -> None:
+        """Constructor for MetadataCache objects
+
+        :param path: string; the database file, created if need be
+        :param max_bytes: int; entries beyond this total size are evicted,
+            least recently used first
+        :param key: "stat" or "content"
+        :param timeout: float; seconds to wait for other processes' locks
+        """
+        if key not in ("stat", "content"):
+            raise DpkgError(f"Unknown cache key '{key}'; choose from stat, content")
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.key = key
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = 0
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"MetadataCache({self.path!r}, max_bytes={self.max_bytes}, key={self.key!r})"
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not cross a fork, so each process
+        # (e.g. a scan() worker) opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def entry(self, filename: str, kind: str) -> CacheEntry:
+        """Return the database key and the signature of a file as it is
+        now.  Take this before reading the file and hand it to put(), so
+        that a file replaced while it was being read is not stored under
+        its new signature.
+
+        :param filename: string
+        :param kind: string; e.g. dpkg or dsc
+        :returns: CacheEntry
+        """
+        if self.key == "content":
+            return CacheEntry(f"{kind}:sha256:{content_digest(filename)}", "")
+        return CacheEntry(f"{kind}:{os.path.realpath(filename)}", stat_signature(filename))
+
+    def get(self, filename: str, kind: str, entry: CacheEntry | None = None) -> dict[str, Any] | None:
+        """Return the cached metadata of a kind for a file, or None if
+        there is none or the file has changed since it was stored.
+
+        :param filename: string
+        :param kind: string; e.g. dpkg or dsc
+        :param entry: CacheEntry; defaults to entry(filename, kind)
+        :returns: dict or None
+        """
+        key, signature = entry or self.entry(filename, kind)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT signature, data FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[0] != signature:
+                self.stale += 1
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE key = ? AND signature = ?", (key, row[0]))
+                return None
+            self.hits += 1
+            with conn:
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        data: dict[str, Any] = json.loads(row[1])
+        return data
+
+    def put(self, filename: str, kind: str, data: dict[str, Any], entry: CacheEntry | None = None) -> None:
+        """Store metadata of a kind for a file, replacing any previous
+        entry, then evict entries if the cache has grown too large.
+
+        :param filename: string
+        :param kind: string; e.g. dpkg or dsc
+        :param data: dict; must be JSON serializable
+        :param entry: CacheEntry taken before the file was read; defaults
+            to entry(filename, kind), the file as it is now
+        """
+        key, signature = entry or self.entry(filename, kind)
+        document = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO entries (key, signature, data, size, last_used) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET signature = excluded.signature, data = excluded.data, "
+                    "size = excluded.size, last_used = excluded.last_used",
+                    (key, signature, document, len(key) + len(document), time.time()),
+                )
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Evict the least recently used entries until the cache is back
+        below 90% of max_bytes, so that eviction does not happen on
+        every put once the cache is full"""
+        (total,) = conn.execute("SELECT size FROM totals").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        keys = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self.evictions += len(keys)
+
+    def stats(self) -> CacheStats:
+        """Return this process's hit/miss/stale/eviction counters plus the
+        current number of entries and their total size
+
+        :returns: dict
+        """
+        with self._lock:
+            conn = self._connection()
+            (entries,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            (size,) = conn.execute("SELECT size FROM totals").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size": size,
+        }
+
+    def clear(self) -> None:
+        """Remove every entry from the cache"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        """Close this process's database connection"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # connections and locks cannot be pickled, e.g. to scan() workers
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,167 @@
+"""pydpkg.compression: decompressor backends for package archive members
+
+control.tar and data.tar may be compressed in several ways, told apart
+by the suffix of their ar member name ("gz" for control.tar.gz, "" for a
+plain control.tar).  Each suffix has one or more backends; the available
+backend with the highest priority is used, so installing isal or zlib-ng
+is enough to speed up every gzip member, and register_decompressor()
+plugs in others (or overrides ours).
+
+Backends name the module they need and import it only when first used,
+so a backend whose module is not installed is simply skipped.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+from contextlib import nullcontext
+from typing import IO, Callable, ContextManager, NamedTuple, cast
+
+from pydpkg.exceptions import DpkgError
+
+# what a backend does: wrap a compressed file object in a decompressing one
+Opener = Callable[[IO[bytes]], ContextManager[IO[bytes]]]
+
+
+class Decompressor(NamedTuple):
+    """A decompressor backend: the member suffix it handles, its name,
+    the module it needs (None for none), how to open a compressed file
+    object with it and its priority among the backends for the suffix"""
+
+    suffix: str
+    name: str
+    module: str | None
+    open: Opener
+    priority: int = 0
+
+    @property
+    def available(self) -> bool:
+        """Return whether the module this backend needs is installed"""
+        return self.module is None or importlib.util.find_spec(self.module) is not None
+
+
+_REGISTRY: dict[str, list[Decompressor]] = {}
+# the backend chosen for each suffix, until the registry changes
+_SELECTED: dict[str, Decompressor] = {}
+
+
+def register_decompressor(
+    suffix: str, name: str, opener: Opener, module: str | None = None, priority: int = 0
+) -> Decompressor:
+    """Register a decompressor backend, replacing any of the same name
+    for the suffix
+
+    :param suffix: string; the member suffix, such as "gz" or "" for none
+    :param name: string; the backend name
+    :param opener: callable taking a compressed binary file object and
+        returning a context manager that yields the decompressed one
+    :param module: string; the module the backend needs, if any
+    :param priority: int; the available backend with the highest priority
+        is used
+    :returns: Decompressor
+    """
+    backend = Decompressor(suffix, name, module, opener, priority)
+    backends = [other for other in _REGISTRY.get(suffix, []) if other.name != name]
+    backends.append(backend)
+    backends.sort(key=lambda other: -other.priority)
+    _REGISTRY[suffix] = backends
+    _SELECTED.clear()
+    return backend
+
+
+def unregister_decompressor(suffix: str, name: str) -> None:
+    """Remove a decompressor backend
+
+    :param suffix: string
+    :param name: string
+    """
+    _REGISTRY[suffix] = [backend for backend in _REGISTRY.get(suffix, []) if backend.name != name]
+    if not _REGISTRY[suffix]:
+        del _REGISTRY[suffix]
+    _SELECTED.clear()
+
+
+def suffixes() -> list[str]:
+    """Return the member suffixes that have a registered backend
+
+    :returns: list of strings
+    """
+    return list(_REGISTRY)
+
+
+def decompressors(suffix: str, available: bool = True) -> list[Decompressor]:
+    """Return the backends for a suffix, highest priority first
+
+    :param suffix: string
+    :param available: bool; only return the backends that can be used
+    :returns: list of Decompressor
+    """
+    return [backend for backend in _REGISTRY.get(suffix, []) if backend.available or not available]
+
+
+def get_decompressor(suffix: str, name: str | None = None) -> Decompressor:
+    """Return the backend to use for a suffix: the named one, or else the
+    available one with the highest priority
+
+    :param suffix: string
+    :param name: string
+    :returns: Decompressor
+    :raises: DpkgError
+    """
+    if name is None and suffix in _SELECTED:
+        return _SELECTED[suffix]
+    for backend in decompressors(suffix):
+        if name is None or backend.name == name:
+            if name is None:
+                _SELECTED[suffix] = backend
+            return backend
+    if name is None:
+        raise DpkgError(f"Unknown archive type: '{suffix}'")
+    raise DpkgError(f"No available decompressor '{name}' for archive type '{suffix}'")
+
+
+def _gzip(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    import gzip  # pylint: disable=import-outside-toplevel
+
+    return cast(ContextManager[IO[bytes]], gzip.GzipFile(fileobj=fileobj))
+
+
+def _isal(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    igzip = importlib.import_module("isal.igzip")
+    return cast(ContextManager[IO[bytes]], igzip.IGzipFile(fileobj=fileobj))
+
+
+def _zlib_ng(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    gzip_ng = importlib.import_module("zlib_ng.gzip_ng")
+    return cast(ContextManager[IO[bytes]], gzip_ng.GzipNGFile(fileobj=fileobj))
+
+
+def _lzma(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    import lzma  # pylint: disable=import-outside-toplevel
+
+    return cast(ContextManager[IO[bytes]], lzma.open(fileobj))
+
+
+def _zstandard(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    zstandard = importlib.import_module("zstandard")
+    return cast(ContextManager[IO[bytes]], zstandard.ZstdDecompressor().stream_reader(fileobj))
+
+
+def _bz2(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    import bz2  # pylint: disable=import-outside-toplevel
+
+    return cast(ContextManager[IO[bytes]], bz2.open(fileobj))
+
+
+def _uncompressed(fileobj: IO[bytes]) -> ContextManager[IO[bytes]]:
+    return nullcontext(fileobj)
+
+
+register_decompressor("gz", "zlib", _gzip)
+register_decompressor("gz", "zlib-ng", _zlib_ng, module="zlib_ng", priority=10)
+register_decompressor("gz", "isal", _isal, module="isal", priority=20)
+register_decompressor("xz", "lzma", _lzma)
+register_decompressor("zst", "zstandard", _zstandard, module="zstandard")
+register_decompressor("bz2", "bz2", _bz2)
+register_decompressor("", "none", _uncompressed)
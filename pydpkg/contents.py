@@ -0,0 +1,180 @@
+"""pydpkg.contents: build apt Contents indices from package data archives"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import tempfile
+from itertools import groupby
+from typing import IO, Iterable, Iterator, TypedDict
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.packages import COMPRESSIONS, atomic_write
+from pydpkg.scanner import bounded_imap, iter_packages
+
+
+class ContentsRecord(TypedDict):
+    """Type definition for the result of package_contents()"""
+
+    filename: str
+    location: str | None
+    paths: list[str]
+    error: Exception | None
+
+
+def package_location(headers: dict[str, str]) -> str:
+    """Return how a package is named in a Contents index: section/package,
+    or just the package name if it has no section
+
+    :param headers: dict; the package control headers
+    :returns: string
+    """
+    lowered = {name.lower(): value for name, value in headers.items()}
+    package = lowered["package"]
+    section = lowered.get("section")
+    return f"{section}/{package}" if section else package
+
+
+def package_contents(filename: str) -> ContentsRecord:
+    """List the files (anything but directories) that a package ships,
+    capturing (rather than raising) any error.
+
+    :param filename: string
+    :returns: dict
+    """
+    try:
+        dpkg = Dpkg(filename)
+        location = package_location(dpkg.headers)
+        paths = [member.path for member in dpkg.data_members() if member.type != "directory"]
+        return {"filename": filename, "location": location, "paths": paths, "error": None}
+    except Exception as ex:  # pylint: disable=broad-except
+        return {"filename": filename, "location": None, "paths": [], "error": ex}
+
+
+class ContentsIndex:
+    """An apt Contents index: which packages ship each file.
+
+    (path, package) entries are collected in memory up to max_entries,
+    then sorted and spilled to a temporary run file; the final index is a
+    streaming merge of the runs, so memory use stays bounded however
+    large the archive is.
+    """
+
+    def __init__(
+        self, max_entries: int = 1_000_000, tmpdir: str | None = None, logger: logging.Logger | None = None
+    ) -> None:
+        """Constructor for ContentsIndex objects
+
+        :param max_entries: int; entries held in memory before spilling
+        :param tmpdir: string; where to put run files
+        :param logger: logging.Logger
+        """
+        self.max_entries = max_entries
+        self.errors: dict[str, Exception] = {}
+        self._log = logger or logging.getLogger(__name__)
+        self._tmpdir = tempfile.TemporaryDirectory(dir=tmpdir, prefix="pydpkg-contents-")
+        self._entries: list[tuple[str, str]] = []
+        self._runs: list[str] = []
+
+    def __enter__(self) -> ContentsIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the run files"""
+        self._tmpdir.cleanup()
+
+    def add(self, location: str, paths: Iterable[str]) -> None:
+        """Record that the package at location ships paths
+
+        :param location: string; see package_location()
+        :param paths: iterable of strings
+        """
+        for path in paths:
+            if "\n" in path:
+                self._log.warning("skipping unrepresentable path in %s: %r", location, path)
+                continue
+            self._entries.append((path, location))
+            if len(self._entries) >= self.max_entries:
+                self._spill()
+
+    def add_packages(self, paths: Iterable[str], workers: int | None = 1, chunksize: int = 1) -> None:
+        """List the data archives of many packages across a pool of worker
+        processes and add them; packages that cannot be read are left out
+        and recorded in errors.
+
+        :param paths: iterable of package files and/or directories to search
+        :param workers: number of worker processes; 1 lists them in this
+            process and None uses one per cpu
+        :param chunksize: number of packages handed to a worker at a time
+        """
+        for record in bounded_imap(package_contents, iter_packages(paths), workers, chunksize):
+            if record["error"] is not None or record["location"] is None:
+                self._log.warning("skipping %s: %s", record["filename"], record["error"])
+                self.errors[record["filename"]] = record["error"] or ValueError("no location")
+                continue
+            self.add(record["location"], record["paths"])
+
+    def _spill(self) -> None:
+        self._entries.sort()
+        fd, run = tempfile.mkstemp(dir=self._tmpdir.name, suffix=".run")
+        with os.fdopen(fd, "w", encoding="utf-8", errors="surrogateescape") as fileobj:
+            fileobj.writelines(f"{path}\0{location}\n" for path, location in self._entries)
+        self._log.debug("spilled %d contents entries to %s", len(self._entries), run)
+        self._runs.append(run)
+        self._entries = []
+
+    @staticmethod
+    def _read_run(fileobj: IO[str]) -> Iterator[tuple[str, str]]:
+        for line in fileobj:
+            path, location = line[:-1].split("\0")
+            yield path, location
+
+    def entries(self) -> Iterator[tuple[str, list[str]]]:
+        """Yield each path in the index, in order, with the sorted list of
+        packages that ship it
+
+        :returns: iterator of (string, list) tuples
+        """
+        self._entries.sort()
+        runs = [open(path, encoding="utf-8", errors="surrogateescape") for path in self._runs]  # pylint: disable=consider-using-with
+        try:
+            merged = heapq.merge(self._entries, *(self._read_run(run) for run in runs))
+            for path, group in groupby(merged, key=lambda entry: entry[0]):
+                yield path, sorted({location for _, location in group})
+        finally:
+            for run in runs:
+                run.close()
+
+    def lines(self) -> Iterator[str]:
+        """Yield the lines of the Contents index
+
+        :returns: iterator of strings
+        """
+        for path, locations in self.entries():
+            yield f"{path:<55} {','.join(locations)}\n"
+
+    def write(self, filename: str, compressions: Iterable[str] = ("gz",)) -> list[str]:
+        """Write the Contents index to filename plus a suffix for each
+        compression ('' for uncompressed, gz, xz, zst), replacing any
+        previous files atomically
+
+        :param filename: string, e.g. dists/stable/main/Contents-amd64
+        :param compressions: iterable of strings
+        :returns: list of the files written
+        """
+        written = []
+        for compression in compressions:
+            if compression not in COMPRESSIONS:
+                raise ValueError(f"Unknown compression '{compression}'; choose from {', '.join(COMPRESSIONS)}")
+            suffix, opener = COMPRESSIONS[compression]
+            atomic_write(
+                filename + suffix,
+                lambda fileobj: fileobj.writelines(line.encode("utf-8", "surrogateescape") for line in self.lines()),
+                opener,
+            )
+            written.append(filename + suffix)
+        return written
@@ -0,0 +1,134 @@
+"""pydpkg.controlfiles: parsed md5sums and conffiles control members
+
+Both are kept as the raw bytes read from the control archive and only
+parsed the first time they are looked into, so asking a package for its
+control members costs nothing beyond the one decompression of
+control.tar.*.  Paths are decoded as utf-8 with surrogateescape, as
+tarfile decodes member names, so they can be compared with the paths of
+Dpkg.data_members().
+"""
+
+from __future__ import annotations
+
+import posixpath
+import re
+from typing import Iterator, Mapping, NamedTuple, Sequence, overload
+
+from pydpkg.exceptions import DpkgControlMemberError
+
+MD5_HEX_LENGTH = 32
+_MD5_HEX_RE = re.compile(f"[0-9a-fA-F]{{{MD5_HEX_LENGTH}}}")
+
+
+def _lines(data: bytes) -> Iterator[tuple[int, str]]:
+    for number, line in enumerate(data.decode("utf-8", "surrogateescape").split("\n"), 1):
+        if line.strip():
+            yield number, line
+
+
+class Md5sums(Mapping[str, str]):
+    """The md5sums control member: a mapping of the paths of the files a
+    package ships (normalized like DataMember.path, without a leading ./
+    or /) to their md5 hex digests"""
+
+    __slots__ = ("_data", "_digests")
+
+    def __init__(self, data: bytes = b"") -> None:
+        """Constructor for Md5sums objects
+
+        :param data: bytes; the md5sums member as read from the package
+        """
+        self._data = data
+        self._digests: dict[str, str] | None = None
+
+    @property
+    def data(self) -> bytes:
+        """Return the md5sums member as read from the package"""
+        return self._data
+
+    def _parse(self) -> dict[str, str]:
+        if self._digests is None:
+            digests = {}
+            for number, line in _lines(self._data):
+                # "<digest>  <path>", or "<digest> *<path>" as md5sum -b writes
+                digest, separator, path = line[:MD5_HEX_LENGTH], line[MD5_HEX_LENGTH:][:2], line[MD5_HEX_LENGTH + 2 :]
+                if not _MD5_HEX_RE.fullmatch(digest) or separator not in ("  ", " *") or not path:
+                    raise DpkgControlMemberError(f"Malformed md5sums line {number}: {line!r}")
+                digests[posixpath.normpath(path).lstrip("/")] = digest.lower()
+            self._digests = digests
+        return self._digests
+
+    def __getitem__(self, path: str) -> str:  # type: ignore[explicit-override]
+        return self._parse()[path]
+
+    def __iter__(self) -> Iterator[str]:  # type: ignore[explicit-override]
+        return iter(self._parse())
+
+    def __len__(self) -> int:  # type: ignore[explicit-override]
+        return len(self._parse())
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"Md5sums({self._data!r})"
+
+
+class Conffile(NamedTuple):
+    """An entry of the conffiles control member: an absolute path plus
+    any flags (such as remove-on-upgrade) that preceded it"""
+
+    path: str
+    flags: tuple[str, ...] = ()
+
+
+class Conffiles(Sequence[Conffile]):
+    """The conffiles control member, as a sequence of Conffile entries in
+    the order they are listed"""
+
+    __slots__ = ("_data", "_entries")
+
+    def __init__(self, data: bytes = b"") -> None:
+        """Constructor for Conffiles objects
+
+        :param data: bytes; the conffiles member as read from the package
+        """
+        self._data = data
+        self._entries: tuple[Conffile, ...] | None = None
+
+    @property
+    def data(self) -> bytes:
+        """Return the conffiles member as read from the package"""
+        return self._data
+
+    def _parse(self) -> tuple[Conffile, ...]:
+        if self._entries is None:
+            entries = []
+            for number, line in _lines(self._data):
+                # flags come first, so that paths may contain spaces
+                start = line.find(" /")
+                if line.startswith("/"):
+                    entries.append(Conffile(line.rstrip()))
+                elif start > 0:
+                    entries.append(Conffile(line[start + 1 :].rstrip(), tuple(line[:start].split())))
+                else:
+                    raise DpkgControlMemberError(f"Malformed conffiles line {number}: {line!r}")
+            self._entries = tuple(entries)
+        return self._entries
+
+    @property
+    def paths(self) -> list[str]:
+        """Return the path of every conffile"""
+        return [entry.path for entry in self._parse()]
+
+    @overload
+    def __getitem__(self, index: int) -> Conffile: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[Conffile]: ...
+
+    def __getitem__(self, index: int | slice) -> Conffile | Sequence[Conffile]:  # type: ignore[explicit-override]
+        return self._parse()[index]
+
+    def __len__(self) -> int:  # type: ignore[explicit-override]
+        return len(self._parse())
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"Conffiles({self._data!r})"
@@ -0,0 +1,216 @@
+"""pydpkg.deb822: a fast parser for debian control data
+
+Control files, dsc files and Packages/Sources indices are made of
+paragraphs of "Name: value" fields, where a value may continue over
+following lines that start with a space or tab.  Deb822 parses a
+paragraph with a few regular expression passes that record where each
+field's value lies; values are only sliced out of the text when they are
+first asked for.
+
+Values are exactly what email.message_from_string would have produced:
+the whitespace after the colon is dropped, continuation lines are kept
+as they are (including their leading whitespace) and the final newline
+is removed.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import IO, TYPE_CHECKING, Iterable, Iterator, MutableMapping, Union
+
+from pydpkg.exceptions import Deb822Error
+
+if TYPE_CHECKING:
+    from email.message import Message
+
+READ_BUFFER_SIZE = 1 << 20
+
+# the patterns all start at a newline, which lets the regular expression
+# engine skip from one line to the next instead of trying every position:
+# a field is a line that starts with its name and a colon, and a line that
+# starts with neither whitespace, a comment nor a field name is an error
+_FIELD = re.compile(r"\n([^\s:#][^\s:]*):[ \t]*")
+_BAD_LINE = re.compile(r"\n([^\s:#][^\s:]*(?:[ \t][^\n]*)?|:[^\n]*)(?=\n)")
+_COMMENT = re.compile(r"\n#[^\n]*")
+# paragraphs are separated by one or more blank (or whitespace only) lines
+_SEPARATOR = re.compile(r"\n(?:[ \t]*\n)+")
+_BLANK = re.compile(r"(?:[ \t]*\n)+")
+
+Fields = Union["Deb822", Iterable[tuple[str, str]]]
+
+
+class Deb822(MutableMapping[str, str]):
+    """A single paragraph of control data: an ordered mapping of field
+    names to values in which names are case-insensitive."""
+
+    __slots__ = ("_text", "_names", "_spans", "_values", "_index")
+
+    def __init__(self, fields: Fields = ()) -> None:
+        """Constructor for Deb822 objects; see also Deb822.parse()
+
+        :param fields: Deb822 or iterable of (name, value) tuples
+        """
+        self._text = ""
+        self._names: list[str] = []
+        self._spans: list[tuple[int, int]] = []
+        # None until the value has been sliced out of _text
+        self._values: list[str | None] = []
+        self._index: dict[str, int] = {}
+        for name, value in fields.items() if isinstance(fields, Deb822) else fields:
+            self[name] = value
+
+    @classmethod
+    def parse(cls, text: str) -> Deb822:
+        """Parse a single paragraph, ignoring blank lines around it and
+        comment lines
+
+        :param text: string
+        :returns: Deb822
+        :raises: Deb822Error
+        """
+        self = cls()
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        blank = _BLANK.match(text)
+        if blank is not None:
+            text = text[blank.end() :]
+        separator = _SEPARATOR.search(text)
+        if separator is not None:
+            if text[separator.end() :].strip():
+                raise Deb822Error("Expected a single paragraph of control data")
+            text = text[: separator.start()]
+        if text and text[0] in " \t":
+            raise Deb822Error("Malformed control data: continuation line before the first field")
+        # bracket the text with newlines so that every line starts after
+        # one and every value ends before one
+        text = "\n" + text.rstrip("\n") + "\n"
+        if "#" in text:
+            text = _COMMENT.sub("", text)
+        bad = _BAD_LINE.search(text)
+        if bad is not None:
+            line = text.count("\n", 0, bad.start()) + 1
+            raise Deb822Error(f"Malformed control data at line {line}: {bad.group(1)!r}")
+        self._text = text
+        fields = list(_FIELD.finditer(text))
+        for idx, match in enumerate(fields):
+            name = match.group(1)
+            lowered = name.lower()
+            if lowered in self._index:
+                raise Deb822Error(f"Duplicate field in control data: '{name}'")
+            self._index[lowered] = idx
+            self._names.append(name)
+            end = fields[idx + 1].start() if idx + 1 < len(fields) else len(text) - 1
+            self._spans.append((match.end(), end))
+        self._values = [None] * len(self._names)
+        return self
+
+    def _value(self, idx: int) -> str:
+        value = self._values[idx]
+        if value is None:
+            start, end = self._spans[idx]
+            value = self._text[start:end]
+            self._values[idx] = value
+        return value
+
+    def __getitem__(self, name: str) -> str:  # type: ignore[explicit-override]
+        return self._value(self._index[name.lower()])
+
+    def __setitem__(self, name: str, value: str) -> None:  # type: ignore[explicit-override]
+        idx = self._index.get(name.lower())
+        if idx is None:
+            self._index[name.lower()] = len(self._names)
+            self._names.append(name)
+            self._spans.append((0, 0))
+            self._values.append(value)
+        else:
+            self._values[idx] = value
+
+    def __delitem__(self, name: str) -> None:  # type: ignore[explicit-override]
+        idx = self._index.pop(name.lower())
+        del self._names[idx]
+        del self._spans[idx]
+        del self._values[idx]
+        self._index = {key: pos - (pos > idx) for key, pos in self._index.items()}
+
+    def __contains__(self, name: object) -> bool:  # type: ignore[explicit-override]
+        return isinstance(name, str) and name.lower() in self._index
+
+    def __iter__(self) -> Iterator[str]:  # type: ignore[explicit-override]
+        return iter(self._names)
+
+    def __len__(self) -> int:  # type: ignore[explicit-override]
+        return len(self._names)
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"Deb822({list(self.items())!r})"
+
+    def __str__(self) -> str:  # type: ignore[explicit-override]
+        return self.as_string()
+
+    def get(self, name: str, default: str | None = None) -> str | None:  # type: ignore[override, explicit-override]
+        """Return the value of a field, or default if there is no such
+        field
+
+        :param name: string
+        :param default: string
+        :returns: string
+        """
+        idx = self._index.get(name.lower())
+        return default if idx is None else self._value(idx)
+
+    def fields(self) -> list[tuple[str, str]]:
+        """Return every (name, value) pair, in order
+
+        :returns: list of tuples
+        """
+        return [(name, self._value(idx)) for idx, name in enumerate(self._names)]
+
+    def as_string(self) -> str:
+        """Render the paragraph as control data, followed by a blank line
+        (as email.Message.as_string() did)
+
+        :returns: string
+        """
+        return "".join(f"{name}: {value}\n" for name, value in self.fields()) + "\n"
+
+    def to_message(self) -> Message[str, str]:
+        """Return the paragraph as an email.Message, for code written
+        against the message properties of Dpkg and Dsc
+
+        :returns: email.Message
+        """
+        from email.message import Message  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        message: Message[str, str] = Message()
+        for name, value in self.fields():
+            message[name] = value
+        return message
+
+
+def iter_paragraphs(source: str | IO[str]) -> Iterator[Deb822]:
+    """Yield each paragraph of a multi-paragraph file such as a Packages
+    or Sources index.  A file object is read a chunk at a time, so the
+    whole file is never held in memory.
+
+    :param source: string or text file object
+    :returns: iterator of Deb822
+    :raises: Deb822Error
+    """
+    if isinstance(source, str):
+        chunks: Iterable[str] = (source,)
+    else:
+        chunks = iter(lambda: source.read(READ_BUFFER_SIZE), "")
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        for separator in _SEPARATOR.finditer(pending):
+            if separator.end() == len(pending):
+                # the separator may go on in the next chunk
+                break
+            if pending[start : separator.start()].strip():
+                yield Deb822.parse(pending[start : separator.start() + 1])
+            start = separator.end()
+        pending = pending[start:]
+    if pending.strip():
+        yield Deb822.parse(pending)
@@ -6,44 +6,166 @@ from __future__ import annotations
 import hashlib
 import io
 import logging
-import lzma
+import mmap
 import os
-import tarfile
-from typing import Literal, Any, TypedDict, TYPE_CHECKING, Union, IO
-from functools import cmp_to_key
-from email import message_from_string
-from email.message import Message
-from gzip import GzipFile
+import posixpath
+import sys
+from contextlib import closing, contextmanager, nullcontext
+from typing import (
+    Literal,
+    Any,
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Iterable,
+    Generator,
+    Iterator,
+    NamedTuple,
+    Sequence,
+    TypedDict,
+    TYPE_CHECKING,
+    Union,
+    IO,
+    cast,
+)
 from itertools import zip_longest
 
-# pypi imports
-import six
-import zstandard
-from arpy import Archive, ArchiveFileData
-
 # local imports
+from pydpkg.deb822 import Deb822
+from pydpkg.controlfiles import Conffiles, Md5sums
+from pydpkg import compression, metrics
+from pydpkg.ar import ArMember, MemoryviewReader, ReadAt, WindowReader, iter_members
 from pydpkg.exceptions import (
+    DpkgArchiveError,
     DpkgError,
     DpkgVersionError,
     DpkgMissingControlFile,
     DpkgMissingControlGzipFile,
+    DpkgMissingDataTarFile,
     DpkgMissingRequiredHeaderError,
 )
 from pydpkg.base import _Dbase
+from pydpkg import versions
+from pydpkg.versions import alpha_key
 
 if TYPE_CHECKING:
+    import tarfile
+    from concurrent.futures import Executor, Future
+    from email.message import Message
+    from tempfile import SpooledTemporaryFile
+
     from _typeshed import SupportsAllComparisons, SupportsRead
 
+    from pydpkg.cache import CacheEntry, MetadataCache
+
 REQUIRED_HEADERS = ("package", "version", "architecture")
 
+# large enough that per-read and per-update overhead vanishes, small enough
+# to keep memory flat on multi-GB packages
+READ_BUFFER_SIZE = 1 << 20
+
+# on multi-core machines, files at least this large have their digests
+# computed in parallel threads (hashlib releases the GIL); below it thread
+# startup costs more than it saves
+PARALLEL_DIGEST_THRESHOLD = 8 * READ_BUFFER_SIZE
+
+# an unrolled SpooledTemporaryFile is read in place through the BytesIO it
+# keeps in its private _file attribute, which is only relied on in CPython
+_SPOOLED_IN_PLACE = sys.implementation.name == "cpython"
+
+Digest = Literal["md5", "sha1", "sha256", "sha512", "blake2b"]
+DIGESTS: tuple[Digest, ...] = ("md5", "sha1", "sha256", "sha512", "blake2b")
+DEFAULT_DIGESTS: tuple[Digest, ...] = ("md5", "sha1", "sha256")
 
-class FileInfo(TypedDict):
-    """Type definition for the fileinfo dictionary."""
+
+class _FileInfoBase(TypedDict):
+    filesize: int
+
+
+class FileInfo(_FileInfoBase, total=False):
+    """Type definition for the fileinfo dictionary; only the digests
+    selected for the Dpkg object are present."""
 
     md5: str
     sha1: str
     sha256: str
-    filesize: int
+    sha512: str
+    blake2b: str
+
+
+# the suffix of a control.tar or data.tar member: "gz", "xz", "zst", "bz2",
+# "" for none, or any other suffix with a registered decompressor (see
+# pydpkg.compression)
+Compression = str
+
+# what a Dpkg can be read from: a filename, an in-memory package or a binary
+# file object (read from its start if it is seekable, else read just once)
+Source = Union[str, bytes, bytearray, memoryview, mmap.mmap, IO[bytes]]
+
+
+class DataMember(NamedTuple):
+    """A member of a package's data.tar: its normalized path (without a
+    leading ./ or /), size, permission bits, type and link target"""
+
+    path: str
+    size: int
+    mode: int
+    type: Literal["file", "directory", "symlink", "hardlink", "other"]
+    linkname: str
+
+
+class Verification(NamedTuple):
+    """The result of Dpkg.verify(): the files whose md5 differs from
+    md5sums (path -> (expected, actual) digests), the files md5sums lists
+    that the package does not ship, and the regular files it ships that
+    are neither in md5sums nor conffiles"""
+
+    mismatched: dict[str, tuple[str, str]]
+    missing: list[str]
+    extra: list[str]
+
+    @property
+    def ok(self) -> bool:
+        """Return whether every file matched md5sums"""
+        return not (self.mismatched or self.missing or self.extra)
+
+
+def _read_at(fileobj: IO[bytes], offset: int, size: int) -> bytes:
+    fileobj.seek(offset)
+    return fileobj.read(size)
+
+
+def _spooled_file(source: object) -> SpooledTemporaryFile[bytes] | None:
+    """Return source if it is a SpooledTemporaryFile, else None"""
+    # there can only be one once tempfile has been imported, and importing
+    # it ourselves would slow down every Dpkg
+    tempfile = sys.modules.get("tempfile")
+    if tempfile is not None and isinstance(source, tempfile.SpooledTemporaryFile):
+        return cast("SpooledTemporaryFile[bytes]", source)
+    return None
+
+
+def _read_chunks(fileobj: IO[bytes], nbuffers: int) -> Iterator[memoryview]:
+    """Read a file object to its end through nbuffers rotating buffers,
+    yielding each chunk read and then an empty one"""
+    buffers = [bytearray(READ_BUFFER_SIZE) for _ in range(nbuffers)]
+    readinto = getattr(fileobj, "readinto", None)
+    while True:
+        buf = buffers[0]
+        buffers.append(buffers.pop(0))
+        if readinto is not None:
+            size = readinto(buf) or 0
+        else:
+            data = fileobj.read(READ_BUFFER_SIZE)
+            size = len(data)
+            buf[:size] = data
+        yield memoryview(buf)[:size]
+        if not size:
+            return
+
+
+class _Incomplete(Exception):
+    """Raised while ingesting when a read needs bytes we have not seen yet"""
 
 
 # pylint: disable=too-many-instance-attributes,too-many-public-methods
@@ -51,27 +173,86 @@ class Dpkg(_Dbase):
     """Class allowing import and manipulation of a debian package file."""
 
     def __init__(
-        self, filename: str | None = None, ignore_missing: bool = False, logger: logging.Logger | None = None
+        self,
+        filename: Source | None = None,
+        ignore_missing: bool = False,
+        logger: logging.Logger | None = None,
+        ingest: bool = False,
+        digests: Iterable[Digest] = DEFAULT_DIGESTS,
+        cache: MetadataCache | None = None,
     ) -> None:
         """Constructor for Dpkg object
 
-        :param filename: string
+        :param filename: string, or the package itself as bytes, bytearray,
+            memoryview or mmap, or a binary file object; in-memory packages
+            and BytesIO objects are read without copying them, as are
+            unrolled SpooledTemporaryFile objects on CPython (elsewhere
+            those are read into memory once, so that they are not rolled
+            over to disk), and a file object that cannot seek is read
+            exactly once, in ingest mode
         :param ignore_missing: bool
         :param logger: logging.Logger
+        :param ingest: bool; if set, the first access to either the control
+            message or fileinfo reads the file once to populate both (see
+            ingest())
+        :param digests: the checksums included in fileinfo; any of md5,
+            sha1, sha256, sha512 and blake2b
+        :param cache: pydpkg.cache.MetadataCache; if given, the control
+            message and checksums are looked up there before the package is
+            opened, and stored there once computed
         """
-        if not isinstance(filename, six.string_types):
-            raise DpkgError("filename argument must be a string")
-
-        self.filename = os.path.expanduser(filename)
+        self.filename: str | None
+        self._source: Source
+        self._stream = False
+        self._consumed = False
+        if isinstance(filename, str):
+            self.filename = os.path.expanduser(filename)
+            if not os.path.isfile(self.filename):
+                raise DpkgError(f"filename '{filename}' does not exist")
+            self._source = self.filename
+        elif isinstance(filename, (bytes, bytearray, memoryview, mmap.mmap)) or hasattr(filename, "read"):
+            name = getattr(filename, "name", None)
+            self.filename = name if isinstance(name, str) else None
+            self._source = cast(Source, filename)
+            spooled = None if _SPOOLED_IN_PLACE else _spooled_file(filename)
+            if spooled is not None:
+                # there is no public way to reach its buffer, and asking for
+                # its fileno() would write it out to disk
+                spooled.seek(0)
+                self._source = spooled.read()
+            view = self._memory_view()
+            if view is not None:
+                view.release()
+            self._stream = view is None and not cast(IO[bytes], filename).seekable()
+            if cache is not None:
+                raise DpkgError("a metadata cache can only be used with a filename")
+        else:
+            raise DpkgError("filename argument must be a string, a bytes-like object or a binary file object")
         self.ignore_missing = ignore_missing
 
-        if not os.path.isfile(self.filename):
-            raise DpkgError(f"filename '{filename}' does not exist")
         self._log = logger or logging.getLogger(__name__)
-        self._fileinfo: FileInfo | None = None
+        # a stream can only be read once, so read everything we need then
+        self._ingest = ingest or self._stream
+        self._digest_names = tuple(digests)
+        for name in self._digest_names:
+            if name not in DIGESTS:
+                raise DpkgError(f"Unsupported digest '{name}'; choose from {', '.join(DIGESTS)}")
+        self._digests: dict[str, str] = {}
+        self._filesize: int | None = None
+        self._cache = cache
+        self._cache_loaded = cache is None
+        self._cache_entry: CacheEntry | None = None
         self._control_str: str | None = None
         self._headers: dict[str, str] | None = None
+        self._control: Deb822 | None = None
         self._message: Message[str, str] | None = None
+        # control archive members read so far, by name, and the names we
+        # looked for but did not find
+        self._control_members: dict[str, bytes] = {}
+        self._control_members_absent: set[str] = set()
+        self._control_members_complete = False
+        self._md5sums: Md5sums | None = None
+        self._conffiles: Conffiles | None = None
         self._upstream_version: str | None = None
         self._debian_revision: str | None = None
         self._epoch: int | None = None
@@ -80,7 +261,7 @@ class Dpkg(_Dbase):
         return repr(self.control_str)
 
     def __str__(self) -> str:  # type: ignore[explicit-override]
-        return six.text_type(self.control_str)  # type: ignore[no-any-return]
+        return self.control_str
 
     def __getattr__(self, attr: str) -> str:
         """Overload getattr to treat control message headers as object
@@ -91,20 +272,35 @@ class Dpkg(_Dbase):
         :returns: string
         :raises: AttributeError
         """
-        # beware: email.Message[nonexistent] returns None not KeyError
-        if attr in self.message:
-            return self.message[attr]
+        if attr in self.control:
+            return self.control[attr]
         raise AttributeError(f"'Dpkg' object has no attribute '{attr}'")
 
+    @property
+    def control(self) -> Deb822:
+        """Return the package control fields as a case-insensitive,
+        ordered mapping
+
+        :returns: pydpkg.deb822.Deb822
+        """
+        self._load_cache()
+        if self._control is None:
+            if self._ingest:
+                self.ingest()
+            else:
+                self._control = self._process_dpkg_file(self.filename or repr(self._source))
+                self._save_cache()
+        return self._control  # type: ignore[return-value]
+
     @property
     def message(self) -> Message[str, str]:
         """Return an email.Message object containing the package control
-        structure.
+        structure; prefer control, which is much cheaper.
 
         :returns: email.Message
         """
         if self._message is None:
-            self._message = self._process_dpkg_file(self.filename)
+            self._message = self.control.to_message()
         return self._message
 
     @property
@@ -114,7 +310,7 @@ class Dpkg(_Dbase):
         :returns: string
         """
         if self._control_str is None:
-            self._control_str = self.message.as_string()
+            self._control_str = self.control.as_string()
         return self._control_str
 
     @property
@@ -124,32 +320,105 @@ class Dpkg(_Dbase):
         :returns: dict
         """
         if self._headers is None:
-            self._headers = dict(self.message.items())
+            self._headers = dict(self.control.fields())
         return self._headers
 
     @property
     def fileinfo(self) -> FileInfo:
-        """Return a dictionary containing md5/sha1/sha256 checksums
-        and the size in bytes of our target file.
+        """Return a dictionary containing the selected checksums (by
+        default md5/sha1/sha256) and the size in bytes of our target file.
+        Any checksums not yet known are computed together in one pass.
 
         :returns: dict
         """
-        if self._fileinfo is None:
-            h_md5 = hashlib.md5()
-            h_sha1 = hashlib.sha1()
-            h_sha256 = hashlib.sha256()
-            with open(self.filename, "rb") as dpkg_file:
-                for chunk in iter(lambda: dpkg_file.read(128), b""):
-                    h_md5.update(chunk)
-                    h_sha1.update(chunk)
-                    h_sha256.update(chunk)
-            self._fileinfo = {
-                "md5": h_md5.hexdigest(),
-                "sha1": h_sha1.hexdigest(),
-                "sha256": h_sha256.hexdigest(),
-                "filesize": os.path.getsize(self.filename),
-            }
-        return self._fileinfo
+        self._load_cache()
+        missing = [name for name in self._digest_names if name not in self._digests]
+        if missing:
+            if self._ingest and self._control is None:
+                self.ingest()
+            else:
+                self._read_file(extract=False, digests=missing)
+                self._save_cache()
+        fileinfo = {name: self._digests[name] for name in self._digest_names}
+        return cast(FileInfo, {**fileinfo, "filesize": self.filesize})
+
+    def digest(self, name: Digest) -> str:
+        """Return a hex digest of our target file, computing just that one
+        if it is not already known.
+
+        :param name: string; md5, sha1, sha256, sha512 or blake2b
+        :returns: string
+        :raises: DpkgError
+        """
+        if name not in DIGESTS:
+            raise DpkgError(f"Unsupported digest '{name}'; choose from {', '.join(DIGESTS)}")
+        self._load_cache()
+        if name not in self._digests:
+            self._read_file(extract=False, digests=[name])
+            self._save_cache()
+        return self._digests[name]
+
+    def ingest(self) -> Dpkg:
+        """Read our target file exactly once, computing its checksums and
+        extracting the control message from the same buffers, so that both
+        fileinfo and message are populated without a second pass over a
+        (possibly huge) package.
+
+        If the control message cannot be extracted, fileinfo is still
+        populated before the error is raised.
+
+        :returns: Dpkg (self)
+        :raises: DpkgError
+        """
+        self._load_cache()
+        missing = [name for name in self._digest_names if name not in self._digests]
+        if missing or self._control is None:
+            control = self._read_file(extract=self._control is None, digests=missing)
+            if control is not None:
+                self._control = control
+            self._save_cache()
+        return self
+
+    def _load_cache(self) -> None:
+        """Fill in whatever the metadata cache knows about our target file,
+        the first time we are asked for anything"""
+        if self._cache_loaded or self._cache is None:
+            return
+        self._cache_loaded = True
+        assert self.filename is not None
+        # whatever we read from now on is stored against the file as it is
+        # now, so a package replaced in the meantime is seen as stale
+        self._cache_entry = self._cache.entry(self.filename, "dpkg")
+        record = self._cache.get(self.filename, "dpkg", self._cache_entry)
+        if record is None:
+            return
+        self._log.debug("found %s in metadata cache", self.filename)
+        self._restore(record)
+
+    def _save_cache(self) -> None:
+        """Store everything we know about our target file in the metadata
+        cache"""
+        if self._cache is None or self.filename is None:
+            return
+        self._cache.put(self.filename, "dpkg", self._snapshot(), self._cache_entry)
+
+    def _snapshot(self) -> dict[str, Any]:
+        """Return everything we know about our target file as a JSON
+        serializable dict, for the metadata cache or another process"""
+        return {
+            "control": None if self._control is None else self._control.as_string(),
+            "digests": self._digests,
+            "filesize": self._filesize,
+        }
+
+    def _restore(self, record: dict[str, Any]) -> None:
+        """Fill in whatever a _snapshot() record knows"""
+        self._digests.update(record["digests"])
+        if record["filesize"] is not None:
+            self._filesize = record["filesize"]
+        if record["control"] is not None and self._control is None:
+            # the record may have been made by a less strict caller
+            self._control = self._validate_control(Deb822.parse(record["control"]))
 
     @property
     def md5(self) -> str:
@@ -157,7 +426,7 @@ class Dpkg(_Dbase):
 
         :returns: string
         """
-        return self.fileinfo["md5"]
+        return self.digest("md5")
 
     @property
     def sha1(self) -> str:
@@ -165,7 +434,7 @@ class Dpkg(_Dbase):
 
         :returns: string
         """
-        return self.fileinfo["sha1"]
+        return self.digest("sha1")
 
     @property
     def sha256(self) -> str:
@@ -173,15 +442,35 @@ class Dpkg(_Dbase):
 
         :returns: string
         """
-        return self.fileinfo["sha256"]
+        return self.digest("sha256")
+
+    @property
+    def sha512(self) -> str:
+        """Return the sha512 hash of our target file
+
+        :returns: string
+        """
+        return self.digest("sha512")
+
+    @property
+    def blake2b(self) -> str:
+        """Return the blake2b hash of our target file
+
+        :returns: string
+        """
+        return self.digest("blake2b")
 
     @property
     def filesize(self) -> int:
         """Return the size of our target file
 
-        :returns: string
+        :returns: int
         """
-        return self.fileinfo["filesize"]
+        if self._filesize is None:
+            self._filesize = self._size()
+            if self._filesize is None:
+                self.ingest()
+        return self._filesize  # type: ignore[return-value]
 
     @property
     def epoch(self) -> int:
@@ -231,7 +520,7 @@ class Dpkg(_Dbase):
 
         :returns: string or None
         """
-        return self.message.get(header)
+        return self.control.get(header)
 
     def compare_version_with(self, version_str: str) -> Literal[-1, 0, 1]:
         """Compare my version to an arbitrary version"""
@@ -240,107 +529,491 @@ class Dpkg(_Dbase):
             raise DpkgError("No version header found in control message")
         return Dpkg.compare_versions(header_version, version_str)
 
-    @staticmethod
-    def _force_encoding(obj: Any, encoding: str = "utf-8") -> Any:
-        """Enforce uniform text encoding"""
-        if isinstance(obj, six.string_types):
-            if not isinstance(obj, six.text_type):
-                obj = six.text_type(obj, encoding)
-        return obj
-
-    def _extract_message(self, ctar: tarfile.TarFile) -> Message[str, str]:
-        """Extract the control file from an opened tar archive as a Message object"""
+    def _extract_control(self, ctar: tarfile.TarFile) -> bytes:
+        """Extract the control file from an opened tar archive
+
+        Members are visited in archive order and we stop as soon as control
+        has been read, so with a stream-mode archive nothing after it is
+        ever decompressed."""
         # pathname in the tar could be ./control, or just control
         # (there would never be two control files...right?)
-        tar_members = [os.path.basename(x.name) for x in ctar.getmembers()]
+        tar_members = []
+        for member in ctar:
+            tar_members.append(os.path.basename(member.name))
+            if tar_members[-1] != "control":
+                continue
+            self._log.debug("got control member: %s", member.name)
+            # at last!
+            control_file = ctar.extractfile(member)
+            if control_file is None:
+                raise DpkgMissingControlFile("Corrupt dpkg file: control file is None")
+            self._log.debug("got control file: %s", control_file)
+            return control_file.read()
         self._log.debug("got tar members: %s", tar_members)
-        if "control" not in tar_members:
-            raise DpkgMissingControlFile("Corrupt dpkg file: no control file in control.tar.gz")
-        control_idx = tar_members.index("control")
-        self._log.debug("got control index: %s", control_idx)
-        # at last!
-        control_file = ctar.extractfile(ctar.getmembers()[control_idx])
-        if control_file is None:
-            raise DpkgMissingControlFile("Corrupt dpkg file: control file is None")
-        self._log.debug("got control file: %s", control_file)
-        message_body: Union[str, bytes] = control_file.read()
-        # py27 lacks email.message_from_bytes, so...
-        if not isinstance(message_body, str):
-            message_body = message_body.decode("utf-8")
-        message = message_from_string(message_body)
-        self._log.debug("got control message: %s", message)
-        return message
-
-    def _read_archive(self, dpkg_archive: Archive) -> tuple[ArchiveFileData, Literal["gz", "xz", "zst"]]:
-        """Search an opened archive for a compressed control file and return it plus the compression"""
-        dpkg_archive.read_all_headers()
-
-        if b"control.tar.gz" in dpkg_archive.archived_files:
-            control_archive = dpkg_archive.archived_files[b"control.tar.gz"]
-            return control_archive, "gz"
-
-        if b"control.tar.xz" in dpkg_archive.archived_files:
-            control_archive = dpkg_archive.archived_files[b"control.tar.xz"]
-            return control_archive, "xz"
-
-        if b"control.tar.zst" in dpkg_archive.archived_files:
-            control_archive = dpkg_archive.archived_files[b"control.tar.zst"]
-            return control_archive, "zst"
-
-        raise DpkgMissingControlGzipFile("Corrupt dpkg file: no control.tar.gz/xz/zst file in ar archive.")
-
-    def _extract_message_from_tar(self, fd: SupportsRead[bytes], archive_name: str = "undefined") -> Message[str, str]:
+        raise DpkgMissingControlFile("Corrupt dpkg file: no control file in control.tar.gz")
+
+    def control_members(self, names: Iterable[str] | None = None) -> dict[str, bytes]:
+        """Return the regular files of the control archive (control,
+        md5sums, conffiles, maintainer scripts, triggers, shlibs...) by
+        name, in archive order.  The archive is decompressed once for all
+        of them, and with a subset of names only those members are kept
+        and reading stops once they have all been found.  Members are
+        cached, so asking again does not decompress anything.
+
+        :param names: iterable of member names, or None for every member
+        :returns: dict of member name to contents
+        :raises: DpkgError
+        """
+        wanted = None if names is None else set(names)
+        if not self._control_members_complete:
+            needed = None
+            if wanted is not None:
+                needed = wanted - self._control_members.keys() - self._control_members_absent
+            if needed is None or needed:
+                found = self._read_control_members(needed)
+                if needed is None:
+                    self._control_members = found
+                    self._control_members_complete = True
+                else:
+                    self._control_members.update(found)
+                    self._control_members_absent.update(needed - found.keys())
+        if wanted is None:
+            return dict(self._control_members)
+        return {name: data for name, data in self._control_members.items() if name in wanted}
+
+    def _read_control_members(self, names: set[str] | None) -> dict[str, bytes]:
+        """Decompress the control archive and read the named regular files
+        (or all of them) out of it"""
+        members: dict[str, bytes] = {}
+        with self._open_member(self._read_archive) as (control_archive, control_archive_type):
+            with self._decompress(control_archive, control_archive_type, "dpkg.control.decompress") as fileobj:
+                import tarfile  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+                with tarfile.open(fileobj=fileobj, mode="r|") as ctar:
+                    for info in ctar:
+                        name = os.path.basename(info.name)
+                        if not info.isreg() or (names is not None and name not in names):
+                            continue
+                        member_file = ctar.extractfile(info)
+                        if member_file is None:
+                            raise DpkgMissingControlFile(f"Corrupt dpkg file: cannot read control member {name}")
+                        members[name] = member_file.read()
+                        if names is not None and names <= members.keys():
+                            break
+        self._log.debug("read control members: %s", list(members))
+        if "control" in members and self._control is None:
+            # no need to decompress the archive again for the control fields
+            self._control = self._validate_control(Deb822.parse(members["control"].decode("utf-8")))
+        return members
+
+    @property
+    def md5sums(self) -> Md5sums:
+        """Return the md5sums control member as a mapping of path to md5
+        hex digest (parsed when first used); empty if the package has none
+
+        :returns: pydpkg.controlfiles.Md5sums
+        """
+        if self._md5sums is None:
+            self._md5sums = Md5sums(self.control_members(["md5sums"]).get("md5sums", b""))
+        return self._md5sums
+
+    @property
+    def conffiles(self) -> Conffiles:
+        """Return the conffiles control member as a sequence of Conffile
+        entries (parsed when first used); empty if the package has none
+
+        :returns: pydpkg.controlfiles.Conffiles
+        """
+        if self._conffiles is None:
+            self._conffiles = Conffiles(self.control_members(["conffiles"]).get("conffiles", b""))
+        return self._conffiles
+
+    def data_members(self) -> Iterator[DataMember]:
+        """Yield the members of the package's data archive in archive order,
+        without extracting anything: the archive is decompressed as a
+        stream and file bodies are skipped over, so memory use does not
+        depend on the size of the package.
+
+        :returns: iterator of DataMember
+        :raises: DpkgError
+        """
+        with self._open_data_tar() as dtar:
+            for info in dtar:
+                yield DataMember(
+                    posixpath.normpath(info.name).lstrip("/"),
+                    info.size,
+                    info.mode,
+                    self._member_type(info),
+                    info.linkname,
+                )
+
+    def verify(self) -> Verification:
+        """Check the files in the package's data archive against its
+        md5sums control member.  The data archive is decompressed once, as
+        a stream, and each regular file is hashed as it goes by, so nothing
+        is extracted and memory use does not depend on the size of the
+        package.  Conffiles are not listed in md5sums, so they are never
+        reported as extra.
+
+        :returns: Verification
+        :raises: DpkgError
+        """
+        # both members in the one pass over the control archive
+        self.control_members(["md5sums", "conffiles"])
+        expected = self.md5sums
+        conffiles = {posixpath.normpath(path).lstrip("/") for path in self.conffiles.paths}
+        actual: dict[str, str] = {}
+        mismatched: dict[str, tuple[str, str]] = {}
+        extra: list[str] = []
+        with metrics.phase("dpkg.verify"):
+            with self._open_data_tar() as dtar:
+                for info in dtar:
+                    path = posixpath.normpath(info.name).lstrip("/")
+                    if info.isreg():
+                        hasher = hashlib.md5()
+                        member_file = dtar.extractfile(info)
+                        if member_file is not None:
+                            with member_file:
+                                while chunk := member_file.read(READ_BUFFER_SIZE):
+                                    hasher.update(chunk)
+                        digest = hasher.hexdigest()
+                    elif info.islnk():
+                        # the same contents as the file linked to, seen earlier
+                        target = posixpath.normpath(info.linkname).lstrip("/")
+                        if target not in actual:
+                            continue
+                        digest = actual[target]
+                    else:
+                        continue
+                    actual[path] = digest
+                    if path not in expected:
+                        if path not in conffiles:
+                            extra.append(path)
+                    elif expected[path] != digest:
+                        mismatched[path] = (expected[path], digest)
+        missing = [path for path in expected if path not in actual]
+        return Verification(mismatched, missing, extra)
+
+    @contextmanager
+    def _open_data_tar(self) -> Iterator[tarfile.TarFile]:
+        """Open the package's data archive as a stream-mode tar file"""
+        with self._open_member(self._read_data_archive) as (data_archive, data_archive_type):
+            with self._decompress(data_archive, data_archive_type, "dpkg.data.decompress") as fileobj:
+                import tarfile  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+                with tarfile.open(fileobj=fileobj, mode="r|") as dtar:
+                    yield dtar
+
+    @staticmethod
+    def _member_type(info: tarfile.TarInfo) -> Literal["file", "directory", "symlink", "hardlink", "other"]:
+        if info.isreg():
+            return "file"
+        if info.isdir():
+            return "directory"
+        if info.issym():
+            return "symlink"
+        if info.islnk():
+            return "hardlink"
+        return "other"
+
+    def _read_data_archive(self, read_at: ReadAt) -> tuple[ArMember, Compression]:
+        """Search an ar archive for the data archive and return its member
+        plus the compression"""
+        return self._find_tar_member(read_at, "data.tar", DpkgMissingDataTarFile)
+
+    def _read_archive(self, read_at: ReadAt) -> tuple[ArMember, Compression]:
+        """Search an ar archive for the control archive and return its
+        member plus the compression.  Only member headers are read, and we
+        stop at the control member, so data.tar.* is never touched."""
+        return self._find_tar_member(read_at, "control.tar", DpkgMissingControlGzipFile, stop_at="data.tar")
+
+    def _find_tar_member(
+        self, read_at: ReadAt, prefix: str, error: type[DpkgError], stop_at: str | None = None
+    ) -> tuple[ArMember, Compression]:
+        """Return the first ar member named prefix plus a suffix that has
+        a decompressor, and the suffix.  The search ends at a prefix member
+        with an unknown suffix, or at a member named stop_at plus anything."""
+        for member in iter_members(read_at):
+            self._log.debug("found ar member: %s", member)
+            if member.name.startswith(prefix):
+                suffix = member.name[len(prefix) :]
+                if suffix == "" or (suffix.startswith(".") and suffix[1:] in compression.suffixes()):
+                    return member, suffix[1:]
+                break
+            if stop_at is not None and member.name.startswith(stop_at):
+                break
+
+        formats = "/".join(suffix for suffix in compression.suffixes() if suffix)
+        raise error(f"Corrupt dpkg file: no {prefix} or {prefix}.{formats} file in ar archive.")
+
+    def _extract_control_from_tar(self, fd: SupportsRead[bytes], archive_name: str = "undefined") -> bytes:
         """Extract the control file in a tar archive from a decompressed archive fileobj"""
         self._log.debug("opened %s control archive: %s", archive_name, fd)
-        with tarfile.open(fileobj=io.BytesIO(fd.read())) as ctar:
+        # stream mode: read members sequentially instead of buffering the
+        # whole decompressed archive so that we can seek around in it
+        import tarfile  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        with tarfile.open(fileobj=fd, mode="r|") as ctar:  # type: ignore[call-overload]
             self._log.debug("opened tar file: %s", ctar)
-            message = self._extract_message(ctar)
-        return message
-
-    def _extract_message_from_archive(
-        self, control_archive: IO[bytes], control_archive_type: Literal["gz", "xz", "zst"]
-    ) -> Message[str, str]:
-        """Extract the control file from a compressed archive fileobj"""
-        if control_archive_type == "gz":
-            with GzipFile(fileobj=control_archive) as gzf:
-                return self._extract_message_from_tar(gzf, "gzip")
-
-        if control_archive_type == "xz":
-            with lzma.open(control_archive) as xzf:
-                return self._extract_message_from_tar(xzf, "xz")
-
-        if control_archive_type == "zst":
-            zst = zstandard.ZstdDecompressor()
-            with zst.stream_reader(control_archive) as reader:
-                return self._extract_message_from_tar(reader, "zst")
-
-        raise DpkgError(f"Unknown control archive type: {control_archive_type}")
-
-    def _process_dpkg_file(self, filename: str) -> Message[str, str]:
-        with Archive(filename) as archive:
-            control_archive, control_archive_type = self._read_archive(archive)
-            self._log.debug("found controlgz: %s", control_archive)
-            message = self._extract_message_from_archive(control_archive, control_archive_type)
+            control = self._extract_control(ctar)
+        return control
+
+    def _extract_control_from_archive(self, control_archive: IO[bytes], control_archive_type: Compression) -> Deb822:
+        """Extract and parse the control file from a compressed archive
+        fileobj"""
+        with self._decompress(control_archive, control_archive_type, "dpkg.control.decompress") as fileobj:
+            with metrics.phase("dpkg.control.tar") as phase:
+                data = self._extract_control_from_tar(fileobj, control_archive_type)
+                phase.add(exclude=metrics.read_seconds(fileobj))
+        with metrics.phase("dpkg.control.parse") as phase:
+            control = Deb822.parse(data.decode("utf-8"))
+            phase.add(bytes_read=len(data))
+        self._log.debug("got control fields: %s", control)
+        return control
+
+    @staticmethod
+    @contextmanager
+    def _decompress(
+        archive: IO[bytes], archive_type: Compression, phase: str = "dpkg.decompress"
+    ) -> Iterator[IO[bytes]]:
+        """Wrap a compressed archive fileobj in a decompressing one, using
+        the preferred backend for the compression; when metrics are on,
+        the time spent decompressing is recorded as phase"""
+        with compression.get_decompressor(archive_type).open(archive) as fileobj:
+            with metrics.counting(fileobj, phase, archive) as counted:
+                yield counted
+
+    def _memory_view(self) -> memoryview | None:
+        """Return a byte view of our source if it is already in memory"""
+        source = self._source
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            return memoryview(source).cast("B")
+        spooled = _spooled_file(source) if _SPOOLED_IN_PLACE else None
+        # pylint: disable-next=protected-access
+        if spooled is not None and not spooled._rolled:  # type: ignore[attr-defined]
+            # asking for its fileno() would write it out to disk, and there
+            # is no public way to reach the BytesIO it keeps until then, so
+            # this relies on CPython's _rolled and _file attributes (as
+            # test_spooled_file_in_memory checks)
+            source = spooled._file  # pylint: disable=protected-access
+        if isinstance(source, io.BytesIO):
+            return source.getbuffer()
+        return None
+
+    def _size(self) -> int | None:
+        """Return the size of our source, or None if it is a stream"""
+        source = self._source
+        if isinstance(source, str):
+            return os.path.getsize(source)
+        view = self._memory_view()
+        if view is not None:
+            with view:
+                return len(view)
+        if self._stream:
+            return None
+        fileobj = cast(IO[bytes], source)
+        return fileobj.seek(0, io.SEEK_END)
+
+    @staticmethod
+    @contextmanager
+    def _map(fileobj: IO[bytes], name: str | None) -> Iterator[memoryview]:
+        try:
+            mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as ex:
+            raise DpkgArchiveError(f"Corrupt dpkg file: cannot map '{name}': {ex}") from ex
+        with mapped, memoryview(mapped) as view:
+            yield view
+
+    @contextmanager
+    def _archive(self) -> Iterator[memoryview | IO[bytes]]:
+        """Yield the whole archive as a memoryview when it is in memory or
+        can be memory-mapped, else as a seekable binary file object"""
+        view = self._memory_view()
+        if view is not None:
+            with view:
+                yield view
+            return
+        if isinstance(self._source, str):
+            with open(self._source, "rb") as dpkg_file, self._map(dpkg_file, self.filename) as view:
+                yield view
+            return
+        if self._stream:
+            raise DpkgError("Cannot seek in a stream; it can only be read once, with ingest()")
+        fileobj = cast(IO[bytes], self._source)
+        try:
+            fileobj.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            yield fileobj
+            return
+        with self._map(fileobj, self.filename) as view:
+            yield view
+
+    @contextmanager
+    def _open_member(
+        self, find: Callable[[ReadAt], tuple[ArMember, Compression]]
+    ) -> Iterator[tuple[IO[bytes], Compression]]:
+        """Locate an ar member in our source with find() and yield it as a
+        fileobj, plus its compression.  Nothing but ar headers is read up
+        front, and for archives in memory or memory-mapped the member is
+        a slice of the archive rather than a copy."""
+        with self._archive() as archive:
+            with metrics.phase("dpkg.ar") as phase:
+                if isinstance(archive, memoryview):
+                    # headers are tiny, so copying them out is fine
+                    member, archive_type = find(
+                        phase.reads(lambda offset, size: bytes(archive[offset : offset + size]))
+                    )
+                    total = len(archive)
+                else:
+                    member, archive_type = find(phase.reads(lambda offset, size: _read_at(archive, offset, size)))
+                    total = archive.seek(0, io.SEEK_END)
+            self._log.debug("found member: %s", member)
+            if member.offset + member.size > total:
+                raise DpkgArchiveError(f"Corrupt dpkg file: {member.name} is truncated")
+            if isinstance(archive, memoryview):
+                # ...but the member itself is handed over as a slice
+                with MemoryviewReader(archive[member.offset : member.offset + member.size]) as reader:
+                    yield cast(IO[bytes], reader), archive_type
+            else:
+                with WindowReader(cast(BinaryIO, archive), member.offset, member.size) as reader:
+                    yield cast(IO[bytes], reader), archive_type
+
+    def _chunks(self, nbuffers: int) -> Generator[memoryview, None, None]:
+        """Yield our whole source in chunks of up to READ_BUFFER_SIZE bytes,
+        then an empty chunk.  Chunks of an archive in memory are slices of
+        it; otherwise they are read into nbuffers rotating buffers, so each
+        chunk stays valid until nbuffers - 1 more have been yielded."""
+        if isinstance(self._source, str):
+            with open(self._source, "rb", buffering=0) as dpkg_file:
+                yield from _read_chunks(dpkg_file, nbuffers)
+            return
+        view = self._memory_view()
+        if view is not None:
+            with view:
+                for offset in range(0, len(view), READ_BUFFER_SIZE):
+                    yield view[offset : offset + READ_BUFFER_SIZE]
+                yield view[:0]
+            return
+        fileobj = cast(IO[bytes], self._source)
+        if self._stream:
+            if self._consumed:
+                raise DpkgError("Cannot read a stream twice; select every digest needed up front")
+            self._consumed = True
+        else:
+            fileobj.seek(0)
+        yield from _read_chunks(fileobj, nbuffers)
+
+    def _read_file(self, extract: bool, digests: Sequence[str]) -> Deb822 | None:
+        """Stream our target file through the named hashers in large
+        buffers, recording the digests and the file size.  If extract is
+        set, the start of the file is also kept until the control archive
+        has been seen in full, and the control fields parsed from it are
+        returned.
+
+        With several digests on a large file, each hasher runs in its own
+        thread over a shared buffer while the next buffer is being read."""
+        hashers = [hashlib.new(name) for name in digests]
+        head = bytearray()
+        control: Deb822 | None = None
+        error: Exception | None = None
+        filesize = 0
+        parallel = (
+            len(hashers) > 1
+            and (os.cpu_count() or 1) > 1
+            and (self._size() or PARALLEL_DIGEST_THRESHOLD) >= PARALLEL_DIGEST_THRESHOLD
+        )
+        pending: list[Future[None]] = []
+        executor_context: ContextManager[Executor | None] = nullcontext()
+        if parallel:
+            from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+
+            executor_context = ThreadPoolExecutor(len(hashers))
+        with metrics.phase("dpkg.read") as phase:
+            # while the hashers work on one buffer we read into the other
+            with closing(self._chunks(2 if parallel else 1)) as chunks:
+                with executor_context as executor:
+                    for chunk in chunks:
+                        size = len(chunk)
+                        for future in pending:
+                            future.result()
+                        if executor is None:
+                            for hasher in hashers:
+                                hasher.update(chunk)
+                        else:
+                            pending = [executor.submit(hasher.update, chunk) for hasher in hashers]
+                        filesize += size
+                        if extract and control is None and error is None:
+                            head += chunk
+                            try:
+                                control = self._extract_control_from_head(head, complete=not size)
+                            except Exception as ex:  # pylint: disable=broad-except
+                                # finish hashing first; raised below
+                                error = ex
+                            if control is not None or error is not None:
+                                # drop our copy of the head of the archive
+                                head = bytearray()
+                    for future in pending:
+                        future.result()
+            phase.add(bytes_read=filesize)
+        self._digests.update((hasher.name, hasher.hexdigest()) for hasher in hashers)
+        self._filesize = filesize
+        if error is not None:
+            raise error
+        return control
+
+    def _extract_control_from_head(self, head: bytearray, complete: bool) -> Deb822 | None:
+        """Extract the control fields from the first bytes of an archive,
+        or return None if more of the archive is needed to do so.
+
+        :param head: bytearray; the start of the archive
+        :param complete: bool; whether head is the entire archive
+        :returns: Deb822 or None
+        """
+
+        def read_at(offset: int, size: int) -> bytes:
+            if offset + size > len(head) and not complete:
+                raise _Incomplete
+            return bytes(head[offset : offset + size])
 
+        try:
+            with metrics.phase("dpkg.ar") as phase:
+                control_member, control_archive_type = self._read_archive(phase.reads(read_at))
+        except _Incomplete:
+            return None
+        end = control_member.offset + control_member.size
+        if end > len(head):
+            if not complete:
+                return None
+            raise DpkgArchiveError("Corrupt dpkg file: control archive is truncated")
+        with memoryview(head) as view, MemoryviewReader(view[control_member.offset : end]) as control_archive:
+            control = self._extract_control_from_archive(cast(IO[bytes], control_archive), control_archive_type)
+        return self._validate_control(control)
+
+    def _process_dpkg_file(self, filename: str) -> Deb822:
+        self._log.debug("processing dpkg file: %s", filename)
+        with self._open_member(self._read_archive) as (control_archive, control_archive_type):
+            control = self._extract_control_from_archive(control_archive, control_archive_type)
+        return self._validate_control(control)
+
+    def _validate_control(self, control: Deb822) -> Deb822:
+        """Check the control fields for required headers; the values are
+        already text, decoded as utf-8"""
         for req in REQUIRED_HEADERS:
-            if req not in list(map(str.lower, message.keys())):
+            if req not in control:
                 if self.ignore_missing:
                     self._log.debug('Header "%s" not found in control message', req)
                     continue
                 raise DpkgMissingRequiredHeaderError(f"Corrupt control section; header: '{req}' not found")
         self._log.debug("all required headers found")
-
-        for header in message.keys():
-            self._log.debug("coercing header to utf8: %s", header)
-            message.replace_header(header, self._force_encoding(message[header]))
-        self._log.debug("all required headers coerced")
-
-        return message
+        return control
 
     @staticmethod
     def get_epoch(version_str: str) -> tuple[int, str]:
         """Parse the epoch out of a package version string.
         Return (epoch, version); epoch is zero if not found."""
+        cache = versions.get_version_cache()
+        if cache is not None:
+            return cache.parse(version_str).epoch, version_str[version_str.find(":") + 1 :]
         try:
             # there could be more than one colon,
             # but we only care about the first
@@ -356,6 +1029,8 @@ class Dpkg(_Dbase):
                 f"Corrupt dpkg version '{version_str}': epochs can only be ints, and "
                 "epochless versions cannot use the colon character."
             ) from ex
+        if epoch < 0:
+            raise DpkgVersionError(f"Corrupt dpkg version '{version_str}': epochs cannot be negative.")
 
         return epoch, version_str[e_index + 1 :]
 
@@ -364,6 +1039,11 @@ class Dpkg(_Dbase):
         """Given a version string that could potentially contain both an upstream
         revision and a debian revision, return a tuple of both.  If there is no
         debian revision, return 0 as the second tuple element."""
+        cache = versions.get_version_cache()
+        if cache is not None:
+            # behind a zero epoch, any colons belong to the upstream version
+            parsed = cache.parse(f"0:{version_str}")
+            return parsed.upstream, parsed.revision
         try:
             d_index = version_str.rindex("-")
         except ValueError:
@@ -378,6 +1058,10 @@ class Dpkg(_Dbase):
         debian revision.
         :param: version_str
         :returns: tuple"""
+        cache = versions.get_version_cache()
+        if cache is not None:
+            parsed = cache.parse(version_str)
+            return parsed.epoch, parsed.upstream, parsed.revision
         epoch, full_ver = Dpkg.get_epoch(version_str)
         upstream_rev, debian_rev = Dpkg.get_upstream(full_ver)
         return epoch, upstream_rev, debian_rev
@@ -419,13 +1103,20 @@ class Dpkg(_Dbase):
         comparison algorithm described at section 5.6.12 in:
         https://www.debian.org/doc/debian-policy/ch-controlfields.html#version
         """
+        cache = versions.get_version_cache()
+        if cache is not None:
+            return list(cache.memoize("listify", revision_str, Dpkg._listify))
+        return list(Dpkg._listify(revision_str))
+
+    @staticmethod
+    def _listify(revision_str: str) -> tuple[str | int, ...]:
         result: list[str | int] = []
         while revision_str:
             rev_1, remains = Dpkg.get_alphas(revision_str)
             rev_2, remains = Dpkg.get_digits(remains)
             result.extend([rev_1, rev_2])
             revision_str = remains
-        return result
+        return tuple(result)
 
     # pylint: disable=invalid-name,too-many-return-statements
     @staticmethod
@@ -483,7 +1174,17 @@ class Dpkg(_Dbase):
     def compare_revision_strings(rev1: str, rev2: str) -> Literal[-1, 0, 1]:
         """Compare two debian revision strings as described at
         https://www.debian.org/doc/debian-policy/ch-controlfields.html#version
-        """
+
+        This uses the single-pass comparison engine in pydpkg.versions;
+        the original listify()-based implementation is kept as
+        compare_revision_strings_listify() for reference."""
+        return versions.compare_revisions(rev1, rev2)
+
+    @staticmethod
+    def compare_revision_strings_listify(rev1: str, rev2: str) -> Literal[-1, 0, 1]:
+        """Compare two debian revision strings by splitting them with
+        listify() and comparing the pieces with dstringcmp(); equivalent to,
+        but considerably slower than, compare_revision_strings()."""
         # TODO(memory): this function now fails pylint R0912 too-many-branches
         if rev1 == rev2:
             return 0
@@ -541,6 +1242,14 @@ class Dpkg(_Dbase):
         if ver1 == ver2:
             return 0
 
+        cache = versions.get_version_cache()
+        if cache is not None:
+            # cached versions carry precomputed keys that order exactly
+            # like the comparisons below
+            key1 = cache.parse(str(ver1)).key
+            key2 = cache.parse(str(ver2)).key
+            return 1 if key1 > key2 else -1 if key1 < key2 else 0
+
         # note the string conversion: the debian policy here explicitly
         # specifies ASCII string comparisons, so if you are mad enough to
         # actually cram unicode characters into your package name, you are on
@@ -569,14 +1278,38 @@ class Dpkg(_Dbase):
 
     @staticmethod
     def compare_versions_key(x: str) -> SupportsAllComparisons:
-        """Uses functools.cmp_to_key to convert the compare_versions()
-        function to a function suitable to passing to sorted() and friends
-        as a key."""
-        return cmp_to_key(Dpkg.compare_versions)(x)
+        """Return a precomputed sort key for a version string, suitable for
+        passing to sorted() and friends as a key.  The key is a plain tuple
+        that orders the same way as compare_versions(), so each version is
+        parsed once and sorting does no python-level comparisons."""
+        return versions.version_key(x)
 
     @staticmethod
     def dstringcmp_key(x: str) -> SupportsAllComparisons:
-        """Uses functools.cmp_to_key to convert the dstringcmp()
-        function to a function suitable to passing to sorted() and friends
+        """Return a precomputed sort key that orders strings the same way
+        as dstringcmp(), suitable for passing to sorted() and friends
         as a key."""
-        return cmp_to_key(Dpkg.dstringcmp)(x)
+        return alpha_key(x)
+
+    @staticmethod
+    def sort_versions(version_strs: Iterable[str]) -> list[str]:
+        """Return a new list of version strings in ascending order.  All
+        versions are tokenized once, up front, into compact byte keys and
+        sorted without any per-comparison python callbacks."""
+        return versions.sort_versions(version_strs)
+
+    @staticmethod
+    def argsort_versions(version_strs: Sequence[str]) -> list[int]:
+        """Return the list of indices that would sort a sequence of
+        version strings, as per sort_versions()."""
+        return versions.argsort_versions(version_strs)
+
+    @staticmethod
+    def max_version(version_strs: Iterable[str]) -> str:
+        """Return the highest of an iterable of version strings"""
+        return versions.max_version(version_strs)
+
+    @staticmethod
+    def min_version(version_strs: Iterable[str]) -> str:
+        """Return the lowest of an iterable of version strings"""
+        return versions.min_version(version_strs)
@@ -1,4 +1,4 @@
-"""pydpkg.dpkg.Dpkg: a class to represent dpkg files"""
+"""pydpkg.dsc.Dsc: a class to represent dsc files"""
 
 from __future__ import annotations
 
@@ -7,40 +7,51 @@ import hashlib
 import logging
 import os
 from collections import defaultdict
-from email import message_from_file, message_from_string
-from email.message import Message
 from typing import TYPE_CHECKING, Any
 
-# pypi imports
-import six
-import pgpy
-
 
 # local imports
 from pydpkg.exceptions import (
     DscMissingFileError,
     DscBadChecksumsError,
 )
+from pydpkg import metrics
 from pydpkg.base import _Dbase
+from pydpkg.deb822 import Deb822
 
 if TYPE_CHECKING:
+    from email.message import Message
     from hashlib import _Hash
 
+    # pgpy (and with it cryptography) takes longer to import than all of
+    # pydpkg, so it is only imported once a dsc file is actually read
+    import pgpy
+
+    from pydpkg.cache import CacheEntry, MetadataCache
+
 REQUIRED_HEADERS = ("package", "version", "architecture")
 
+READ_BUFFER_SIZE = 1 << 20
+
+PGP_SIGNED_MESSAGE = "-----BEGIN PGP SIGNED MESSAGE-----"
+PGP_SIGNATURE = "-----BEGIN PGP SIGNATURE-----"
+
 
 class Dsc(_Dbase):
     """Class allowing import and manipulation of a debian source
     description (dsc) file."""
 
     # pylint: disable=too-many-instance-attributes
-    def __init__(self, filename: str | None = None, logger: logging.Logger | None = None) -> None:
-        if not isinstance(filename, six.string_types):
+    def __init__(
+        self, filename: str | None = None, logger: logging.Logger | None = None, cache: MetadataCache | None = None
+    ) -> None:
+        if not isinstance(filename, str):
             raise TypeError("filename must be a string")
 
         self.filename = os.path.expanduser(filename)
         self._dirname = os.path.dirname(self.filename)
         self._log = logger or logging.getLogger(__name__)
+        self._control: Deb822 | None = None
         self._message: Message[str, str] | None = None
         self._source_files: list[tuple[str, int, bool]] | None = None
         self._sizes: set[tuple[str, int]] | None = None
@@ -48,12 +59,14 @@ class Dsc(_Dbase):
         self._checksums: dict[str, dict[str, str]] | None = None
         self._corrected_checksums: dict[str, defaultdict[str, str | None]] | None = None
         self._pgp_message: pgpy.PGPMessage | None = None
+        self._pgp_armored: str | None = None
+        self._cache = cache
 
     def __repr__(self) -> str:  # type: ignore[explicit-override]
         return repr(self.message_str)
 
     def __str__(self) -> str:  # type: ignore[explicit-override]
-        return six.text_type(self.message_str)  # type: ignore[no-any-return]
+        return self.message_str
 
     def __getattr__(self, attr: str) -> Any:
         """Overload getattr to treat message headers as object
@@ -69,9 +82,8 @@ class Dsc(_Dbase):
             return self.__dict__[attr]
         # handle attributes with dashes :-(
         munged = attr.replace("_", "-")
-        # beware: email.Message[nonexistent] returns None not KeyError
-        if munged in self.message:
-            return self.message[munged]
+        if munged in self.control:
+            return self.control[munged]
         raise AttributeError(f"'Dsc' object has no attribute '{attr}'")
 
     def get(self, item: str, ret: str | None = None) -> Any | None:
@@ -81,27 +93,39 @@ class Dsc(_Dbase):
         except KeyError:
             return ret
 
+    @property
+    def control(self) -> Deb822:
+        """Return the fields of the dsc file as a case-insensitive,
+        ordered mapping"""
+        if self._control is None:
+            self._control = self._process_dsc_file()
+        return self._control
+
     @property
     def message(self) -> Message[str, str]:
-        """Return an email.Message object containing the parsed dsc file"""
+        """Return an email.Message object containing the parsed dsc file;
+        prefer control, which is much cheaper"""
         self._log.debug("accessing message property")
         if self._message is None:
-            self._message = self._process_dsc_file()
+            self._message = self.control.to_message()
         return self._message
 
     @property
     def headers(self) -> dict[str, str]:
         """Return a dictionary of the message items"""
-        if self._message is None:
-            self._message = self._process_dsc_file()
-        return dict(self._message.items())
+        return dict(self.control.fields())
 
     @property
     def pgp_message(self) -> pgpy.PGPMessage | None:
         """Return a pgpy.PGPMessage object containing the signed dsc
         message (or None if the message is unsigned)"""
-        if self._message is None:
-            self._message = self._process_dsc_file()
+        if self._control is None:
+            self._control = self._process_dsc_file()
+        if self._pgp_message is None and self._pgp_armored is not None:
+            # the message came from the metadata cache
+            import pgpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+            self._pgp_message = pgpy.PGPMessage.from_blob(self._pgp_armored)
         return self._pgp_message
 
     @property
@@ -152,7 +176,7 @@ class Dsc(_Dbase):
         :returns: string
         """
         if self._message_str is None:
-            self._message_str = self.message.as_string()
+            self._message_str = self.control.as_string()
         return self._message_str
 
     @property
@@ -178,7 +202,7 @@ class Dsc(_Dbase):
         the form {hashtype: {filename: {digest}}}"""
         self._log.debug("process_checksums()")
         sums: dict[str, dict[str, str]] = {}
-        for key in self.message.keys():
+        for key in self.control:
             if key.lower().startswith("checksums"):
                 hashtype = key.split("-")[1].lower()
             # grrrrrr debian :( :( :(
@@ -187,7 +211,7 @@ class Dsc(_Dbase):
             else:
                 continue
             sums[hashtype] = {}
-            source = self.message[key]
+            source = self.control[key]
             for line in source.split("\n"):
                 if line:  # grrr py3--
                     digest, _, filename = line.strip().split(" ")
@@ -195,14 +219,14 @@ class Dsc(_Dbase):
                     sums[hashtype][pathname] = digest
         return sums
 
-    def _internalize_message(self, msg: Message[str, str]) -> Message[str, str]:
+    def _internalize_control(self, control: Deb822) -> Deb822:
         """Ugh: the dsc message body may not include a Files or
         Checksums-foo entry for _itself_, which makes for hilarious
         misadventures up the chain.  So, pfeh, we add it."""
-        self._log.debug("internalize_message()")
+        self._log.debug("internalize_control()")
         base = os.path.basename(self.filename)
         size = os.path.getsize(self.filename)
-        for key, source in msg.items():
+        for key, source in control.fields():
             self._log.debug("processing key: %s", key)
             if key.lower().startswith("checksums"):
                 hashtype = key.split("-")[1].lower()
@@ -228,14 +252,22 @@ class Dsc(_Dbase):
                 self._log.debug("got %s digest: %s", hashtype, hasher.hexdigest())
                 newline = f"\n {hasher.hexdigest()} {size} {base}"
                 self._log.debug("new line: %s", newline)
-                msg.replace_header(key, msg[key] + newline)
-        return msg
+                control[key] = control[key] + newline
+        return control
 
-    def _process_dsc_file(self) -> Message[str, str]:
+    def _process_dsc_file(self) -> Deb822:
         """Extract the dsc message from a file: parse the dsc body
-        and return an email.Message object.  Attempt to extract the
-        RFC822 message from an OpenPGP message if necessary."""
+        and return its fields.  Attempt to extract the RFC822 message
+        from an OpenPGP message if necessary."""
         self._log.debug("process_dsc_file()")
+        cache_entry: CacheEntry | None = None
+        if self._cache is not None:
+            cache_entry = self._cache.entry(self.filename, "dsc")
+            record = self._cache.get(self.filename, "dsc", cache_entry)
+            if record is not None:
+                self._log.debug("found %s in metadata cache", self.filename)
+                self._pgp_armored = record["pgp"]
+                return Deb822.parse(record["message"])
         if not (self.filename.endswith(".dsc") or self.filename.endswith(".dsc.asc")):
             self._log.debug(
                 "File %s does not appear to be a dsc file; pressing "
@@ -243,20 +275,28 @@ class Dsc(_Dbase):
                 "explode.",
                 self.filename,
             )
-        try:
-            self._pgp_message = pgpy.PGPMessage.from_file(self.filename)
-            self._log.debug("Found pgp signed message")
-        except IOError as ex:
-            self._log.fatal('Could not read dsc file "%s": %s', self.filename, ex)
-            raise
-        except (ValueError, pgpy.errors.PGPError) as ex:
-            self._log.warning("dsc file %s is not signed or has a corrupt sig: %s", self.filename, ex)
-        if self._pgp_message is not None:
-            msg = message_from_string(self._pgp_message.message)
-        else:
-            with open(self.filename, encoding="UTF-8") as fileobj:
-                msg = message_from_file(fileobj)
-        return self._internalize_message(msg)
+        import pgpy  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        with metrics.phase("dsc.parse") as phase:
+            try:
+                self._pgp_message = pgpy.PGPMessage.from_file(self.filename)
+                self._log.debug("Found pgp signed message")
+            except IOError as ex:
+                self._log.fatal('Could not read dsc file "%s": %s', self.filename, ex)
+                raise
+            except (ValueError, pgpy.errors.PGPError) as ex:
+                self._log.warning("dsc file %s is not signed or has a corrupt sig: %s", self.filename, ex)
+            if self._pgp_message is not None:
+                text = self._pgp_message.message
+            else:
+                with open(self.filename, encoding="UTF-8") as fileobj:
+                    text = strip_signature(fileobj.read())
+            control = self._internalize_control(Deb822.parse(text))
+            phase.add(bytes_read=os.path.getsize(self.filename))
+        if self._cache is not None:
+            pgp = None if self._pgp_message is None else str(self._pgp_message)
+            self._cache.put(self.filename, "dsc", {"message": control.as_string(), "pgp": pgp}, cache_entry)
+        return control
 
     def _process_source_files(self) -> list[tuple[str, int, bool]]:
         """Walk through the list of lines in the 'Files' section of
@@ -272,7 +312,7 @@ class Dsc(_Dbase):
         self._log.debug("process_source_files()")
         filenames: list[tuple[str, int, bool]] = []
         try:
-            files = self.message["Files"]
+            files = self.control["Files"]
         except KeyError:
             self._log.fatal('DSC file "%s" does not have a Files section', self.filename)
             raise
@@ -289,14 +329,61 @@ class Dsc(_Dbase):
         append the correct checksum to a similarly structured dict
         and return them all at the end."""
         self._log.debug("validate_checksums()")
+        actual = {filename: file_digests(filename, hashtypes) for filename, hashtypes in self._checksum_jobs().items()}
+        return self._compare_checksums(actual)
+
+    def _checksum_jobs(self) -> dict[str, list[str]]:
+        """Return the hash types asserted for each source file, so that
+        each file only has to be read once"""
+        jobs: dict[str, list[str]] = defaultdict(list)
+        for hashtype, filenames in self.checksums.items():
+            for filename in filenames:
+                jobs[filename].append(hashtype)
+        return dict(jobs)
+
+    def _compare_checksums(self, actual: dict[str, dict[str, str]]) -> dict[str, defaultdict[str, str | None]]:
+        """Return the actual checksums that differ from the asserted ones,
+        keyed first by hash type and then by filename"""
         bad_hashes: defaultdict[str, defaultdict[str, str | None]] = defaultdict(lambda: defaultdict(None))
-        for hashtype, filenames in six.iteritems(self.checksums):
-            for filename, digest in six.iteritems(filenames):
-                hasher: _Hash = getattr(hashlib, hashtype)()
-                with open(filename, "rb") as fileobj:
-                    # pylint: disable=cell-var-from-loop
-                    for chunk in iter(lambda: fileobj.read(128), b""):
-                        hasher.update(chunk)
-                if hasher.hexdigest() != digest:
-                    bad_hashes[hashtype][filename] = hasher.hexdigest()
+        for hashtype, filenames in self.checksums.items():
+            for filename, digest in filenames.items():
+                if actual[filename][hashtype] != digest:
+                    bad_hashes[hashtype][filename] = actual[filename][hashtype]
         return dict(bad_hashes)
+
+
+def strip_signature(text: str) -> str:
+    """Return the signed text of a clearsigned OpenPGP message (whose
+    signature could not be read) as is done by dpkg-source; any other
+    text is returned unchanged.
+
+    :param text: string
+    :returns: string
+    """
+    if not text.startswith(PGP_SIGNED_MESSAGE):
+        return text
+    # skip the armor headers, which end at the first blank line
+    start = text.find("\n\n")
+    end = text.find("\n" + PGP_SIGNATURE)
+    if start == -1 or end == -1:
+        return text
+    lines = text[start + 2 : end + 1].splitlines(keepends=True)
+    # undo dash-escaping
+    return "".join(line[2:] if line.startswith("- ") else line for line in lines)
+
+
+def file_digests(filename: str, hashtypes: list[str]) -> dict[str, str]:
+    """Return hex digests of a file for each of hashtypes (hashlib names
+    such as md5 or sha256), computed together in a single read.
+
+    :param filename: string
+    :param hashtypes: list of strings
+    :returns: dict
+    """
+    hashers: list[_Hash] = [getattr(hashlib, hashtype)() for hashtype in hashtypes]
+    with metrics.phase("dsc.hash") as phase, open(filename, "rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(READ_BUFFER_SIZE), b""):
+            for hasher in hashers:
+                hasher.update(chunk)
+        phase.add(bytes_read=fileobj.tell())
+    return {hashtype: hasher.hexdigest() for hashtype, hasher in zip(hashtypes, hashers)}
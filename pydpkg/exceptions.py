@@ -11,16 +11,36 @@ class DscError(Exception):
     """Base error class for Dsc errors"""
 
 
+class Deb822Error(DpkgError, DscError):
+    """Malformed control data, in a package, dsc file or index"""
+
+
 class DpkgVersionError(DpkgError):
     """Corrupt or unparseable version string"""
 
 
+class DpkgArchiveError(DpkgError):
+    """Corrupt or unreadable ar archive"""
+
+
 class DpkgMissingControlFile(DpkgError):
-    """No control file found in control.tar.gz/xz/zst"""
+    """No control file found in control.tar or control.tar.gz/xz/zst/bz2"""
 
 
 class DpkgMissingControlGzipFile(DpkgError):
-    """No control.tar.gz/xz/zst file found in dpkg file"""
+    """No control.tar or control.tar.gz/xz/zst/bz2 file found in dpkg file"""
+
+
+class DpkgMissingDataTarFile(DpkgError):
+    """No data.tar, data.tar.gz/xz/zst/bz2 file found in dpkg file"""
+
+
+class DpkgControlMemberError(DpkgError):
+    """Malformed md5sums or conffiles member in control.tar"""
+
+
+class DpkgRemoteError(DpkgError):
+    """A remote package could not be read"""
 
 
 class DpkgMissingRequiredHeaderError(DpkgError):
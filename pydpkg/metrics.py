@@ -0,0 +1,316 @@
+"""pydpkg.metrics: optional per-phase timings and byte counters
+
+Nothing is measured unless a sink is installed with set_sink() or
+instrument(); until then phase() hands back a shared object whose methods
+do nothing, and no file objects are wrapped, so the cost of the hooks is
+a global lookup per phase.  Once a sink is installed, each phase of
+package and dsc inspection reports its wall clock time plus the bytes it
+read and decompressed:
+
+    dpkg.ar                  finding a member in the ar archive
+    dpkg.control.decompress  time spent decompressing control.tar.*
+    dpkg.control.tar         scanning control.tar, less decompression
+    dpkg.control.parse       parsing the control fields
+    dpkg.data.decompress     time spent decompressing data.tar.*
+    dpkg.read                reading and hashing a whole package (and, in
+                             ingest mode, extracting its control fields)
+    dpkg.verify              checking data.tar against md5sums (including
+                             dpkg.data.decompress)
+    dsc.parse                reading, unsigning and parsing a dsc file
+    dsc.hash                 hashing one of a dsc's source files
+    remote.fetch             one HTTP Range request
+
+The sink is per process: with scan() or verify() across worker processes
+it only sees the work done in this one, so measure with workers=1.
+"""
+
+from __future__ import annotations
+
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import IO, Callable, Iterable, Iterator, Protocol, TextIO, cast
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0)
+
+ReadAt = Callable[[int, int], bytes]
+
+
+class MetricsSink(Protocol):
+    """Anything that can receive a phase measurement"""
+
+    def record(self, phase: str, seconds: float, bytes_read: int, bytes_decompressed: int) -> None:
+        """Receive the wall clock time of one run of a phase and the bytes
+        it read and decompressed"""
+
+
+_sink: MetricsSink | None = None
+
+
+def set_sink(sink: MetricsSink | None) -> MetricsSink | None:
+    """Install a sink for every phase measured in this process, or None
+    to stop measuring
+
+    :param sink: MetricsSink or None
+    :returns: the previously installed sink
+    """
+    global _sink  # pylint: disable=global-statement
+    previous, _sink = _sink, sink
+    return previous
+
+
+def get_sink() -> MetricsSink | None:
+    """Return the installed sink, if any"""
+    return _sink
+
+
+@contextmanager
+def instrument(sink: MetricsSink) -> Iterator[MetricsSink]:
+    """Install a sink for the duration of a with block
+
+    :param sink: MetricsSink
+    :returns: context manager yielding the sink
+    """
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_sink(previous)
+
+
+class _Phase:
+    """A phase being measured; it is recorded when the with block ends,
+    unless the block raised"""
+
+    __slots__ = ("_sink", "_name", "_start", "_bytes_read", "_bytes_decompressed", "_excluded")
+
+    def __init__(self, sink: MetricsSink, name: str) -> None:
+        self._sink = sink
+        self._name = name
+        self._start = 0.0
+        self._bytes_read = 0
+        self._bytes_decompressed = 0
+        self._excluded = 0.0
+
+    def __enter__(self) -> _Phase:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        if exc_type is None:
+            seconds = max(time.perf_counter() - self._start - self._excluded, 0.0)
+            self._sink.record(self._name, seconds, self._bytes_read, self._bytes_decompressed)
+
+    def add(self, bytes_read: int = 0, bytes_decompressed: int = 0, exclude: float = 0.0) -> None:
+        """Count bytes toward the phase, or leave out time that another
+        phase accounts for"""
+        self._bytes_read += bytes_read
+        self._bytes_decompressed += bytes_decompressed
+        self._excluded += exclude
+
+    def reads(self, read_at: ReadAt) -> ReadAt:
+        """Return read_at, counting the bytes it returns toward the phase"""
+
+        def counted(offset: int, size: int) -> bytes:
+            data = read_at(offset, size)
+            self._bytes_read += len(data)
+            return data
+
+        return counted
+
+
+class _NullPhase:
+    """What phase() returns when nothing is being measured"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NullPhase:
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        return None
+
+    def add(self, bytes_read: int = 0, bytes_decompressed: int = 0, exclude: float = 0.0) -> None:
+        """Do nothing"""
+
+    def reads(self, read_at: ReadAt) -> ReadAt:
+        """Return read_at as it is"""
+        return read_at
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name: str) -> _Phase | _NullPhase:
+    """Return a context manager measuring a phase, for the installed sink
+
+    :param name: string
+    :returns: context manager
+    """
+    sink = _sink
+    return _NULL_PHASE if sink is None else _Phase(sink, name)
+
+
+class CountingReader:
+    """Wrap a decompressing file object, timing its reads and counting
+    the bytes they return; closing it records the phase"""
+
+    def __init__(self, fileobj: IO[bytes], sink: MetricsSink, name: str, compressed: IO[bytes]) -> None:
+        """Constructor for CountingReader objects
+
+        :param fileobj: the decompressed file object
+        :param sink: MetricsSink
+        :param name: string; the phase name
+        :param compressed: the compressed file object, whose position at
+            the end gives the bytes read
+        """
+        self._fileobj = fileobj
+        self._sink = sink
+        self._name = name
+        self._compressed = compressed
+        self._start = self._tell()
+        self.seconds = 0.0
+        self.bytes_decompressed = 0
+        self.closed = False
+
+    def _tell(self) -> int:
+        try:
+            return self._compressed.tell()
+        except (AttributeError, OSError, ValueError):
+            return 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Read from the wrapped file object"""
+        start = time.perf_counter()
+        data = self._fileobj.read(size)
+        self.seconds += time.perf_counter() - start
+        self.bytes_decompressed += len(data)
+        return data
+
+    def close(self) -> None:
+        """Record the phase, once"""
+        if not self.closed:
+            self.closed = True
+            bytes_read = max(self._tell() - self._start, 0)
+            self._sink.record(self._name, self.seconds, bytes_read, self.bytes_decompressed)
+
+    def __enter__(self) -> CountingReader:
+        return self
+
+    def __exit__(self, exc_type: object, exc: object, traceback: object) -> None:
+        self.close()
+
+
+@contextmanager
+def counting(fileobj: IO[bytes], name: str, compressed: IO[bytes]) -> Iterator[IO[bytes]]:
+    """Yield fileobj as it is when nothing is being measured, or else
+    wrapped in a CountingReader for the phase name
+
+    :param fileobj: the decompressed file object
+    :param name: string; the phase name
+    :param compressed: the compressed file object
+    :returns: context manager yielding a binary file object
+    """
+    sink = _sink
+    if sink is None:
+        yield fileobj
+        return
+    with CountingReader(fileobj, sink, name, compressed) as reader:
+        yield cast(IO[bytes], reader)
+
+
+def read_seconds(fileobj: object) -> float:
+    """Return the time spent reading a file object that counting()
+    yielded, or 0.0 if it was not wrapped"""
+    return fileobj.seconds if isinstance(fileobj, CountingReader) else 0.0
+
+
+class PhaseStats:
+    """An in-process MetricsSink that keeps every timing, for percentiles
+    over a batch run.  It is thread-safe, so it can be shared by threads
+    (such as those of pydpkg.aio)."""
+
+    def __init__(self) -> None:
+        """Constructor for PhaseStats objects"""
+        self._lock = threading.Lock()
+        self._seconds: defaultdict[str, list[float]] = defaultdict(list)
+        self._bytes_read: defaultdict[str, int] = defaultdict(int)
+        self._bytes_decompressed: defaultdict[str, int] = defaultdict(int)
+
+    def record(self, phase: str, seconds: float, bytes_read: int, bytes_decompressed: int) -> None:
+        """Record one run of a phase"""
+        with self._lock:
+            self._seconds[phase].append(seconds)
+            self._bytes_read[phase] += bytes_read
+            self._bytes_decompressed[phase] += bytes_decompressed
+
+    def phases(self) -> list[str]:
+        """Return the phases recorded so far, in the order first seen"""
+        with self._lock:
+            return list(self._seconds)
+
+    def count(self, phase: str) -> int:
+        """Return how many times a phase was recorded"""
+        with self._lock:
+            return len(self._seconds.get(phase, []))
+
+    def percentile(self, phase: str, percent: float) -> float:
+        """Return a percentile (nearest rank) of a phase's timings, in
+        seconds
+
+        :param phase: string
+        :param percent: float, from 0 to 100
+        :returns: float
+        :raises: KeyError if the phase was never recorded
+        """
+        with self._lock:
+            timings = sorted(self._seconds[phase]) if phase in self._seconds else None
+        if not timings:
+            raise KeyError(phase)
+        rank = max(math.ceil(percent / 100 * len(timings)), 1)
+        return timings[min(rank, len(timings)) - 1]
+
+    def summary(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> dict[str, dict[str, float]]:
+        """Return, for each phase, its count, total and maximum seconds,
+        percentiles (as "p50" and so on) and bytes read and decompressed
+
+        :param percentiles: iterable of floats
+        :returns: dict
+        """
+        percentiles = tuple(percentiles)
+        summary = {}
+        for name in self.phases():
+            with self._lock:
+                timings = list(self._seconds[name])
+                bytes_read = self._bytes_read[name]
+                bytes_decompressed = self._bytes_decompressed[name]
+            stats = {"count": float(len(timings)), "total": sum(timings), "max": max(timings)}
+            for percent in percentiles:
+                stats[f"p{percent:g}"] = self.percentile(name, percent)
+            stats["bytes_read"] = float(bytes_read)
+            stats["bytes_decompressed"] = float(bytes_decompressed)
+            summary[name] = stats
+        return summary
+
+    def report(self, file: TextIO | None = None, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> None:
+        """Print a table of the summary, with times in milliseconds and
+        byte counts in MiB
+
+        :param file: text file object; defaults to sys.stdout
+        :param percentiles: iterable of floats
+        """
+        percentiles = tuple(percentiles)
+        columns = ["count", *(f"p{percent:g}" for percent in percentiles), "max", "total", "MiB read", "MiB decomp"]
+        summary = self.summary(percentiles)
+        width = max([len("phase"), *map(len, summary)])
+        lines = [f"{'phase':<{width}}" + "".join(f"{column:>12}" for column in columns)]
+        for name, stats in summary.items():
+            values = [f"{int(stats['count'])}"]
+            values += [f"{stats[f'p{percent:g}'] * 1000:.3f}" for percent in percentiles]
+            values += [f"{stats['max'] * 1000:.3f}", f"{stats['total'] * 1000:.1f}"]
+            values += [f"{stats['bytes_read'] / (1 << 20):.2f}", f"{stats['bytes_decompressed'] / (1 << 20):.2f}"]
+            lines.append(f"{name:<{width}}" + "".join(f"{value:>12}" for value in values))
+        print("\n".join(lines), file=file or sys.stdout)
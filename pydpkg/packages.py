@@ -0,0 +1,237 @@
+"""pydpkg.packages: build apt Packages indices, incrementally"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import os
+import tempfile
+from typing import IO, Callable, Iterable, TypedDict, cast
+
+from pydpkg.dpkg import FileInfo
+from pydpkg.scanner import iter_packages, scan
+
+# the fields that the index adds to each control stanza
+INDEX_FIELDS = ("Filename", "Size", "MD5sum", "SHA1", "SHA256")
+
+
+def _zstandard_open(path: str) -> IO[bytes]:
+    import zstandard  # pylint: disable=import-outside-toplevel
+
+    return cast(IO[bytes], zstandard.open(path, "wb"))
+
+
+# the suffix and opener for each supported output compression
+COMPRESSIONS: dict[str, tuple[str, Callable[[str], IO[bytes]]]] = {
+    "": ("", lambda path: open(path, "wb")),  # pylint: disable=consider-using-with
+    "gz": (".gz", lambda path: cast(IO[bytes], gzip.GzipFile(path, "wb", mtime=0))),
+    "xz": (".xz", lambda path: lzma.open(path, "wb")),
+    "zst": (".zst", _zstandard_open),
+}
+
+STATE_FORMAT = 1
+
+
+class PackagesStats(TypedDict):
+    """Type definition for the outcome of PackagesIndex.update()"""
+
+    reused: int
+    read: int
+    removed: int
+    failed: int
+
+
+class _Entry(TypedDict):
+    stat: list[int]
+    stanza: str
+
+
+def stat_signature(path: str) -> list[int]:
+    """Return the (device, inode, size, mtime_ns) of a file, which changes
+    whenever a package is rebuilt or replaced in the pool
+
+    :param path: string
+    :returns: list of ints
+    """
+    stat = os.stat(path)
+    return [stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def format_stanza(headers: dict[str, str], filename: str, fileinfo: FileInfo) -> str:
+    """Return the Packages stanza for a package: its control fields with
+    Filename, Size and the checksums inserted ahead of Description
+
+    :param headers: dict; the package control headers
+    :param filename: string; the package path relative to the archive root
+    :param fileinfo: dict
+    :returns: string
+    """
+    index_fields = {name.lower() for name in INDEX_FIELDS}
+    fields = [(name, value) for name, value in headers.items() if name.lower() not in index_fields]
+    position = next((idx for idx, (name, _) in enumerate(fields) if name.lower() == "description"), len(fields))
+    fields[position:position] = [
+        ("Filename", filename),
+        ("Size", str(fileinfo["filesize"])),
+        ("MD5sum", fileinfo["md5"]),
+        ("SHA1", fileinfo["sha1"]),
+        ("SHA256", fileinfo["sha256"]),
+    ]
+    return "".join(f"{name}: {value}\n" for name, value in fields)
+
+
+class PackagesIndex:
+    """An apt Packages index over the .deb files below an archive root.
+
+    Each package's stanza is remembered in a state file together with the
+    package's stat signature, so rebuilding the index only reads packages
+    that were added or changed since the previous run; and if nothing
+    changed at all, the existing compressed outputs are left as they are.
+    """
+
+    def __init__(
+        self, root: str, state_file: str | None = None, workers: int = 1, logger: logging.Logger | None = None
+    ) -> None:
+        """Constructor for PackagesIndex objects
+
+        :param root: string; the archive root that Filename fields are
+            relative to
+        :param state_file: string; where to keep stanzas between runs, or
+            None to always read every package
+        :param workers: int; worker processes used to read packages
+        :param logger: logging.Logger
+        """
+        self.root = os.path.expanduser(root)
+        self.state_file = state_file
+        self.workers = workers
+        self.errors: dict[str, Exception] = {}
+        self._log = logger or logging.getLogger(__name__)
+        self._entries: dict[str, _Entry] = {}
+        self._outputs: dict[str, str] = {}
+        if state_file is not None and os.path.exists(state_file):
+            self._load_state(state_file)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load_state(self, state_file: str) -> None:
+        with open(state_file, encoding="utf-8") as fileobj:
+            state = json.load(fileobj)
+        if state.get("format") != STATE_FORMAT:
+            self._log.warning("ignoring state file %s with unknown format", state_file)
+            return
+        self._entries = state["packages"]
+        self._outputs = state["outputs"]
+
+    def _save_state(self, state_file: str) -> None:
+        state = {"format": STATE_FORMAT, "packages": self._entries, "outputs": self._outputs}
+        atomic_write(state_file, lambda fileobj: fileobj.write(json.dumps(state).encode()))
+
+    def update(self, paths: Iterable[str] | None = None) -> PackagesStats:
+        """Bring the index up to date with the packages below the root (or
+        the given package files and directories within it), reading only
+        those that are new or whose stat signature changed.  Packages that
+        cannot be read are left out and recorded in errors; packages that
+        have gone are only dropped when the whole root is searched.
+
+        :param paths: iterable of strings, defaults to the root
+        :returns: dict of counts
+        """
+        stats: PackagesStats = {"reused": 0, "read": 0, "removed": 0, "failed": 0}
+        self.errors = {}
+        seen: dict[str, list[int]] = {}
+        changed: list[str] = []
+        for path in iter_packages([self.root] if paths is None else paths):
+            filename = os.path.relpath(path, self.root)
+            try:
+                seen[filename] = stat_signature(path)
+            except OSError as ex:
+                self.errors[filename] = ex
+                continue
+            entry = self._entries.get(filename)
+            if entry is not None and entry["stat"] == seen[filename]:
+                stats["reused"] += 1
+            else:
+                changed.append(path)
+
+        if paths is None:
+            for filename in set(self._entries) - set(seen):
+                del self._entries[filename]
+                stats["removed"] += 1
+
+        for record in scan(changed, workers=self.workers):
+            filename = os.path.relpath(record["filename"], self.root)
+            if record["error"] is not None or record["headers"] is None or record["fileinfo"] is None:
+                self._log.warning("skipping %s: %s", filename, record["error"])
+                self._entries.pop(filename, None)
+                self.errors[filename] = record["error"] or ValueError("no headers")
+                continue
+            stanza = format_stanza(record["headers"], filename, record["fileinfo"])
+            self._entries[filename] = {"stat": seen[filename], "stanza": stanza}
+            stats["read"] += 1
+        stats["failed"] = len(self.errors)
+        self._log.debug("updated Packages index: %s", stats)
+        return stats
+
+    def stanzas(self) -> list[str]:
+        """Return the stanzas of the index, ordered by Filename
+
+        :returns: list of strings
+        """
+        return [self._entries[filename]["stanza"] for filename in sorted(self._entries)]
+
+    def as_string(self) -> str:
+        """Return the uncompressed Packages index
+
+        :returns: string
+        """
+        return "\n".join(self.stanzas())
+
+    def write(self, filename: str, compressions: Iterable[str] = ("", "gz", "xz")) -> list[str]:
+        """Write the Packages index to filename plus a suffixed copy for
+        each compression ('' for uncompressed, gz, xz, zst), replacing any
+        previous files atomically; outputs whose contents would not change
+        are left untouched.  Then save the state file, if there is one.
+
+        :param filename: string, e.g. dists/stable/main/binary-amd64/Packages
+        :param compressions: iterable of strings
+        :returns: list of the files written
+        """
+        content = self.as_string().encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        written = []
+        for compression in compressions:
+            if compression not in COMPRESSIONS:
+                raise ValueError(f"Unknown compression '{compression}'; choose from {', '.join(COMPRESSIONS)}")
+            suffix, opener = COMPRESSIONS[compression]
+            path = filename + suffix
+            if self._outputs.get(path) == digest and os.path.exists(path):
+                self._log.debug("%s is unchanged", path)
+                continue
+            atomic_write(path, lambda fileobj: fileobj.write(content), opener)  # pylint: disable=cell-var-from-loop
+            self._outputs[path] = digest
+            written.append(path)
+        if self.state_file is not None:
+            self._save_state(self.state_file)
+        return written
+
+
+def atomic_write(
+    path: str, write: Callable[[IO[bytes]], object], opener: Callable[[str], IO[bytes]] = COMPRESSIONS[""][1]
+) -> None:
+    """Write a file via a temporary file in the same directory, so readers
+    only ever see the old or the new contents"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    os.close(fd)
+    try:
+        with opener(tmp) as fileobj:
+            write(fileobj)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
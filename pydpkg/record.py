@@ -0,0 +1,269 @@
+"""pydpkg.record: compact, immutable package records
+
+A Dpkg object keeps a logger, the parsed control data, an email.Message
+and assorted cached strings around, which is fine for inspecting a few
+packages but far too much for an in-memory view of a whole repository.
+A PackageRecord keeps just the fields, in __slots__, with the values
+that most packages share (Architecture, Section, Priority, Maintainer
+and the like) interned and the checksums stored as raw bytes.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+
+from pydpkg.deb822 import Deb822
+from pydpkg.exceptions import DpkgError
+
+if TYPE_CHECKING:
+    from pydpkg.dpkg import Dpkg
+
+# fields whose values repeat across many packages, so one shared copy of
+# each value is kept
+INTERNED_FIELDS = frozenset(
+    ("architecture", "section", "priority", "maintainer", "multi-arch", "source", "origin", "bugs", "homepage")
+)
+
+# the Packages index fields that are stored as attributes rather than in
+# the remaining fields
+_CORE_FIELDS = frozenset(("package", "version", "architecture", "filename", "size", "md5sum", "sha1", "sha256"))
+
+
+def _intern(name: str, value: str) -> str:
+    return sys.intern(value) if name.lower() in INTERNED_FIELDS else value
+
+
+def _digest(value: str | None, name: str) -> bytes | None:
+    if value is None:
+        return None
+    try:
+        return bytes.fromhex(value)
+    except ValueError as ex:
+        raise DpkgError(f"Invalid {name} checksum: '{value}'") from ex
+
+
+class PackageRecord:
+    """The control fields, location, size and checksums of a package.
+
+    Records are immutable and hashable, compare equal when all their
+    fields do, and can be built from a Dpkg or from a Packages stanza.
+    """
+
+    __slots__ = ("package", "version", "architecture", "filename", "size", "_md5", "_sha1", "_sha256", "_fields")
+
+    package: str
+    version: str
+    architecture: str
+    filename: str | None
+    size: int | None
+    _md5: bytes | None
+    _sha1: bytes | None
+    _sha256: bytes | None
+    _fields: tuple[tuple[str, str], ...]
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        fields: Mapping[str, str],
+        filename: str | None = None,
+        size: int | None = None,
+        md5: bytes | None = None,
+        sha1: bytes | None = None,
+        sha256: bytes | None = None,
+    ) -> None:
+        """Constructor for PackageRecord objects; see also from_dpkg() and
+        from_stanza()
+
+        :param fields: mapping of the control fields
+        :param filename: string; the package path in the archive
+        :param size: int; the package size in bytes
+        :param md5: bytes; the raw md5 digest of the package
+        :param sha1: bytes; the raw sha1 digest of the package
+        :param sha256: bytes; the raw sha256 digest of the package
+        :raises: DpkgError
+        """
+        lowered = {name.lower(): name for name in fields}
+        for required in ("package", "version", "architecture"):
+            if required not in lowered:
+                raise DpkgError(f"Package record is missing the '{required}' field")
+        setattr_ = super().__setattr__
+        setattr_("package", fields[lowered["package"]])
+        setattr_("version", fields[lowered["version"]])
+        setattr_("architecture", sys.intern(fields[lowered["architecture"]]))
+        setattr_("filename", filename)
+        setattr_("size", size)
+        setattr_("_md5", md5)
+        setattr_("_sha1", sha1)
+        setattr_("_sha256", sha256)
+        setattr_(
+            "_fields",
+            tuple(
+                (sys.intern(name), _intern(name, value))
+                for name, value in fields.items()
+                if name.lower() not in _CORE_FIELDS
+            ),
+        )
+
+    @classmethod
+    def from_dpkg(cls, dpkg: Dpkg, filename: str | None = None) -> PackageRecord:
+        """Build a record from a package, reading (once) whichever of its
+        control fields and its configured checksums are not yet known
+
+        :param dpkg: pydpkg.dpkg.Dpkg
+        :param filename: string; the package path in the archive, which
+            defaults to the Dpkg filename
+        :returns: PackageRecord
+        """
+        fileinfo = dpkg.fileinfo
+        return cls(
+            dpkg.control,
+            filename=dpkg.filename if filename is None else filename,
+            size=fileinfo["filesize"],
+            md5=_digest(fileinfo.get("md5"), "md5"),
+            sha1=_digest(fileinfo.get("sha1"), "sha1"),
+            sha256=_digest(fileinfo.get("sha256"), "sha256"),
+        )
+
+    @classmethod
+    def from_stanza(cls, stanza: Mapping[str, str] | str) -> PackageRecord:
+        """Build a record from a stanza of a Packages index
+
+        :param stanza: Deb822, mapping or string
+        :returns: PackageRecord
+        :raises: DpkgError
+        """
+        fields = Deb822.parse(stanza) if isinstance(stanza, str) else stanza
+        if not isinstance(fields, Deb822):
+            fields = Deb822(fields.items())
+        size = fields.get("size")
+        try:
+            return cls(
+                fields,
+                filename=fields.get("filename"),
+                size=None if size is None else int(size),
+                md5=_digest(fields.get("md5sum"), "md5"),
+                sha1=_digest(fields.get("sha1"), "sha1"),
+                sha256=_digest(fields.get("sha256"), "sha256"),
+            )
+        except ValueError as ex:
+            raise DpkgError(f"Invalid Size in Packages stanza: '{size}'") from ex
+
+    def __setattr__(self, name: str, value: Any) -> None:  # type: ignore[explicit-override]
+        raise AttributeError(f"'PackageRecord' object is immutable; cannot set '{name}'")
+
+    def __delattr__(self, name: str) -> None:  # type: ignore[explicit-override]
+        raise AttributeError(f"'PackageRecord' object is immutable; cannot delete '{name}'")
+
+    def _key(self) -> tuple[Any, ...]:
+        return (
+            self.package,
+            self.version,
+            self.architecture,
+            self.filename,
+            self.size,
+            self._md5,
+            self._sha1,
+            self._sha256,
+            self._fields,
+        )
+
+    def __eq__(self, other: object) -> bool:  # type: ignore[explicit-override]
+        if not isinstance(other, PackageRecord):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:  # type: ignore[explicit-override]
+        return hash(self._key())
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"PackageRecord({self.package!r}, {self.version!r}, {self.architecture!r})"
+
+    def __reduce__(self) -> tuple[Any, ...]:  # type: ignore[explicit-override]
+        return (
+            PackageRecord,
+            (dict(self.fields()), self.filename, self.size, self._md5, self._sha1, self._sha256),
+        )
+
+    @property
+    def md5(self) -> str | None:
+        """Return the md5 hex digest of the package, if known"""
+        return None if self._md5 is None else self._md5.hex()
+
+    @property
+    def sha1(self) -> str | None:
+        """Return the sha1 hex digest of the package, if known"""
+        return None if self._sha1 is None else self._sha1.hex()
+
+    @property
+    def sha256(self) -> str | None:
+        """Return the sha256 hex digest of the package, if known"""
+        return None if self._sha256 is None else self._sha256.hex()
+
+    def digest(self, name: str) -> bytes | None:
+        """Return the raw md5, sha1 or sha256 digest of the package
+
+        :param name: string
+        :returns: bytes or None
+        """
+        if name not in ("md5", "sha1", "sha256"):
+            raise DpkgError(f"Unsupported digest '{name}'; choose from md5, sha1, sha256")
+        digest: bytes | None = getattr(self, f"_{name}")
+        return digest
+
+    def get(self, name: str, default: str | None = None) -> str | None:
+        """Return a control field, case-insensitively
+
+        :param name: string
+        :param default: string
+        :returns: string
+        """
+        lowered = name.lower()
+        if lowered in ("package", "version", "architecture"):
+            return str(getattr(self, lowered))
+        for field, value in self._fields:
+            if field.lower() == lowered:
+                return value
+        return default
+
+    def __getitem__(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def fields(self) -> Iterator[tuple[str, str]]:
+        """Yield the control fields, Package, Version and Architecture
+        first
+
+        :returns: iterator of (name, value) tuples
+        """
+        yield "Package", self.package
+        yield "Version", self.version
+        yield "Architecture", self.architecture
+        yield from self._fields
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Return the control fields as a dict
+
+        :returns: dict
+        """
+        return dict(self.fields())
+
+    def to_stanza(self) -> str:
+        """Return the record as a Packages index stanza, with Filename,
+        Size and the checksums ahead of Description
+
+        :returns: string
+        """
+        fields = list(self.fields())
+        position = next((idx for idx, (name, _) in enumerate(fields) if name.lower() == "description"), len(fields))
+        index_fields = [
+            ("Filename", self.filename),
+            ("Size", None if self.size is None else str(self.size)),
+            ("MD5sum", self.md5),
+            ("SHA1", self.sha1),
+            ("SHA256", self.sha256),
+        ]
+        fields[position:position] = [(name, value) for name, value in index_fields if value is not None]
+        return "".join(f"{name}: {value}\n" for name, value in fields)
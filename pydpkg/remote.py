@@ -0,0 +1,234 @@
+"""pydpkg.remote: read packages on a mirror without downloading them
+
+A RangeFile is a seekable binary file object over any RangeReader, i.e.
+anything that can fetch a byte range of a remote object; Dpkg reads the
+ar headers and then only the member it needs through it, so inspecting a
+package costs a request or two of a few KB rather than the whole file.
+Reads are served from a cache of fixed-size blocks, and runs of adjacent
+missing blocks are fetched with a single request.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import urllib.error
+import urllib.request
+import urllib.response
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Mapping, Protocol
+
+from pydpkg import metrics
+from pydpkg.exceptions import DpkgRemoteError
+
+if TYPE_CHECKING:
+    from _typeshed import WriteableBuffer
+
+DEFAULT_BLOCK_SIZE = 64 << 10
+DEFAULT_MAX_BLOCKS = 256
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class RangeReader(Protocol):
+    """Anything that can fetch byte ranges of a remote object of known size"""
+
+    @property
+    def size(self) -> int:
+        """The size of the object in bytes"""
+
+    def read_range(self, offset: int, size: int) -> bytes:
+        """Return the size bytes at offset (fewer only at the end of the
+        object)"""
+
+
+class HTTPRangeReader:
+    """A RangeReader for HTTP(S) servers that honour Range requests"""
+
+    def __init__(self, url: str, timeout: float = 30.0, headers: Mapping[str, str] | None = None) -> None:
+        """Constructor for HTTPRangeReader objects
+
+        :param url: string
+        :param timeout: float; seconds to wait for each response
+        :param headers: dict; extra request headers, e.g. Authorization
+        """
+        self.url = url
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.requests = 0
+        self.bytes_read = 0
+        self._size: int | None = None
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"HTTPRangeReader({self.url!r})"
+
+    def _open(self, method: str, headers: Mapping[str, str]) -> urllib.response.addinfourl:
+        request = urllib.request.Request(self.url, headers={**self.headers, **headers}, method=method)
+        self.requests += 1
+        try:
+            response: urllib.response.addinfourl = urllib.request.urlopen(  # pylint: disable=consider-using-with
+                request, timeout=self.timeout
+            )
+        except (urllib.error.URLError, OSError) as ex:
+            raise DpkgRemoteError(f"{method} {self.url} failed: {ex}") from ex
+        return response
+
+    @property
+    def size(self) -> int:
+        """The size of the object, from the first range response or else
+        from a HEAD request
+
+        :returns: int
+        """
+        if self._size is None:
+            with self._open("HEAD", {}) as response:
+                length = response.headers.get("Content-Length")
+            if length is None:
+                raise DpkgRemoteError(f"{self.url} has no Content-Length")
+            self._size = int(length)
+        return self._size
+
+    def read_range(self, offset: int, size: int) -> bytes:
+        """Fetch size bytes at offset with a single Range request
+
+        :param offset: int
+        :param size: int
+        :returns: bytes
+        :raises: DpkgRemoteError
+        """
+        if size <= 0 or (self._size is not None and offset >= self._size):
+            return b""
+        with metrics.phase("remote.fetch") as phase:
+            with self._open("GET", {"Range": f"bytes={offset}-{offset + size - 1}"}) as response:
+                if response.status != 206:
+                    # the server sent the whole object, which is what we are
+                    # trying to avoid
+                    raise DpkgRemoteError(f"{self.url} does not support range requests (HTTP {response.status})")
+                match = _CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", ""))
+                if match is None or int(match.group(1)) != offset:
+                    raise DpkgRemoteError(
+                        f"{self.url} sent an unexpected range: {response.headers.get('Content-Range')}"
+                    )
+                if match.group(3) != "*":
+                    self._size = int(match.group(3))
+                data: bytes = response.read()
+            phase.add(bytes_read=len(data))
+        self.bytes_read += len(data)
+        return data
+
+
+class RangeFile(io.RawIOBase):
+    """A read-only, seekable binary file object over a RangeReader, with a
+    least-recently-used cache of max_blocks blocks of block_size bytes.
+
+    A read that needs more blocks than the cache holds (e.g. while
+    computing checksums) is fetched in one request and not cached.
+    """
+
+    def __init__(
+        self,
+        reader: RangeReader,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_blocks: int = DEFAULT_MAX_BLOCKS,
+        name: str | None = None,
+    ) -> None:
+        """Constructor for RangeFile objects
+
+        :param reader: RangeReader
+        :param block_size: int; the unit of fetching and caching
+        :param max_blocks: int; blocks kept in the cache
+        :param name: string; what to call the file, e.g. its url
+        """
+        super().__init__()
+        self.reader = reader
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.name = name
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._pos = 0
+
+    def readable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def seekable(self) -> bool:  # type: ignore[explicit-override]
+        return True
+
+    def tell(self) -> int:  # type: ignore[explicit-override]
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:  # type: ignore[explicit-override]
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.reader.size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer: WriteableBuffer) -> int:  # type: ignore[explicit-override]
+        target = memoryview(buffer).cast("B")
+        data = self._read(self._pos, len(target))
+        target[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def _read(self, offset: int, size: int) -> bytes:
+        """Return up to size bytes at offset, via the block cache"""
+        if size <= 0:
+            return b""
+        first = offset // self.block_size
+        last = (offset + size - 1) // self.block_size
+        if last - first + 1 > self.max_blocks:
+            return self.reader.read_range(offset, size)
+        missing = []
+        for index in range(first, last + 1):
+            if index in self._blocks:
+                # so that fetching the rest does not evict it
+                self._blocks.move_to_end(index)
+            else:
+                missing.append(index)
+        self._fetch(missing)
+        data = bytearray()
+        for index in range(first, last + 1):
+            block = self._blocks[index]
+            data += block
+            if len(block) < self.block_size:
+                # the end of the object
+                break
+        start = offset - first * self.block_size
+        return bytes(data[start : start + size])
+
+    def _fetch(self, missing: list[int]) -> None:
+        """Fetch the missing blocks, one request per run of adjacent ones"""
+        while missing:
+            run = 1
+            while run < len(missing) and missing[run] == missing[0] + run:
+                run += 1
+            data = self.reader.read_range(missing[0] * self.block_size, run * self.block_size)
+            for idx in range(run):
+                block = data[idx * self.block_size : (idx + 1) * self.block_size]
+                self._blocks[missing[idx]] = block
+                if len(block) < self.block_size:
+                    break
+            missing = missing[run:]
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+
+def open_url(
+    url: str,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_blocks: int = DEFAULT_MAX_BLOCKS,
+    timeout: float = 30.0,
+    headers: Mapping[str, str] | None = None,
+) -> RangeFile:
+    """Open a package on an HTTP(S) mirror as a seekable file object that
+    fetches only the byte ranges that are read, e.g. for Dpkg(open_url(url))
+
+    :param url: string
+    :param block_size: int; the unit of fetching and caching
+    :param max_blocks: int; blocks kept in the cache
+    :param timeout: float; seconds to wait for each response
+    :param headers: dict; extra request headers
+    :returns: RangeFile
+    """
+    return RangeFile(HTTPRangeReader(url, timeout, headers), block_size, max_blocks, name=url)
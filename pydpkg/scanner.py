@@ -0,0 +1,145 @@
+"""pydpkg.scanner: read the metadata of many debian packages in parallel"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Sequence, TypedDict, TypeVar
+
+from pydpkg.dpkg import DEFAULT_DIGESTS, Digest, Dpkg, FileInfo
+
+if TYPE_CHECKING:
+    from pydpkg.cache import MetadataCache
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class ScanRecord(TypedDict):
+    """Type definition for the records yielded by scan().  Exactly one of
+    headers/fileinfo (on success) or error (on failure) is set."""
+
+    filename: str
+    headers: dict[str, str] | None
+    fileinfo: FileInfo | None
+    error: Exception | None
+
+
+def iter_packages(paths: Iterable[str]) -> Iterator[str]:
+    """Yield package filenames from a list of files and directories;
+    directories are searched recursively for *.deb files.
+
+    :param paths: iterable of strings
+    :returns: iterator of strings
+    """
+    for path in paths:
+        path = os.path.expanduser(path)
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".deb"):
+                    yield os.path.join(dirpath, filename)
+
+
+def scan_package(
+    filename: str, digests: Sequence[Digest] = DEFAULT_DIGESTS, cache: MetadataCache | None = None
+) -> ScanRecord:
+    """Read the headers and fileinfo of a single package in one pass,
+    capturing (rather than raising) any error.
+
+    :param filename: string
+    :param digests: the checksums to include in fileinfo
+    :param cache: pydpkg.cache.MetadataCache
+    :returns: dict
+    """
+    try:
+        dpkg = Dpkg(filename, digests=digests, ingest=True, cache=cache)
+        return {"filename": filename, "headers": dpkg.headers, "fileinfo": dpkg.fileinfo, "error": None}
+    except Exception as ex:  # pylint: disable=broad-except
+        return {"filename": filename, "headers": None, "fileinfo": None, "error": ex}
+
+
+def _map_chunk(func: Callable[[T], R], chunk: list[T]) -> list[R]:
+    return [func(item) for item in chunk]
+
+
+def bounded_imap(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int | None = None,
+    chunksize: int = 1,
+    max_pending: int | None = None,
+) -> Iterator[R]:
+    """Like Pool.imap_unordered, but never consumes more of items than the
+    max_pending chunks in flight, so that neither the inputs nor the
+    results pile up in memory.  func (which must be picklable) should
+    report its errors in its result: an exception ends the iteration.
+
+    :param func: callable
+    :param items: iterable
+    :param workers: number of worker processes; defaults to the number of
+        cpus, and 1 runs func in this process without a pool
+    :param chunksize: number of items handed to a worker at a time
+    :param max_pending: chunks in flight; defaults to twice the workers
+    :returns: iterator of results, in completion order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    max_pending = max_pending or 2 * workers
+    iterator = iter(items)
+    chunks = iter(lambda: list(islice(iterator, chunksize)), [])
+    with ProcessPoolExecutor(workers) as executor:
+        pending: set[Future[list[R]]] = set()
+        try:
+            for chunk in chunks:
+                pending.add(executor.submit(_map_chunk, func, chunk))
+                if len(pending) < max_pending:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            # the caller may stop iterating early
+            executor.shutdown(cancel_futures=True)
+
+
+def scan(
+    paths: Iterable[str],
+    workers: int | None = None,
+    digests: Sequence[Digest] = DEFAULT_DIGESTS,
+    chunksize: int = 1,
+    max_pending: int | None = None,
+    cache: MetadataCache | None = None,
+) -> Iterator[ScanRecord]:
+    """Read the headers and fileinfo of many packages across a pool of
+    worker processes, yielding a record for each package as soon as it
+    is done (so not necessarily in input order).  A package that cannot
+    be read yields a record with its error instead of ending the scan.
+
+    Only max_pending chunks of chunksize packages are ever in flight, so
+    memory use stays flat however many packages there are; raise
+    chunksize to cut inter-process overhead on very many small packages.
+
+    :param paths: iterable of package files and/or directories to search
+    :param workers: number of worker processes; defaults to the number of
+        cpus, and 1 scans in this process without a pool
+    :param digests: the checksums to include in fileinfo
+    :param chunksize: number of packages handed to a worker at a time
+    :param max_pending: chunks in flight; defaults to twice the workers
+    :param cache: pydpkg.cache.MetadataCache, shared by all the workers
+    :returns: iterator of dicts
+    """
+    func = partial(scan_package, digests=tuple(digests), cache=cache)
+    return bounded_imap(func, iter_packages(paths), workers, chunksize, max_pending)
@@ -0,0 +1,52 @@
+"""pydpkg.verify: check many packages' files against their md5sums in parallel"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, TypedDict
+
+from pydpkg.dpkg import Dpkg, Verification
+from pydpkg.scanner import bounded_imap, iter_packages
+
+
+class VerifyRecord(TypedDict):
+    """Type definition for the records yielded by verify().  Exactly one
+    of result (on success) or error (on failure) is set."""
+
+    filename: str
+    result: Verification | None
+    error: Exception | None
+
+
+def verify_package(filename: str) -> VerifyRecord:
+    """Check the files a package ships against its md5sums, capturing
+    (rather than raising) any error.
+
+    :param filename: string
+    :returns: dict
+    """
+    try:
+        return {"filename": filename, "result": Dpkg(filename).verify(), "error": None}
+    except Exception as ex:  # pylint: disable=broad-except
+        return {"filename": filename, "result": None, "error": ex}
+
+
+def verify(
+    paths: Iterable[str], workers: int | None = None, chunksize: int = 1, max_pending: int | None = None
+) -> Iterator[VerifyRecord]:
+    """Check many packages against their md5sums across a pool of worker
+    processes, yielding a record for each package as soon as it is done
+    (so not necessarily in input order).  A package that cannot be read
+    yields a record with its error instead of ending the run.
+
+    Each worker streams one package's data archive at a time and only
+    max_pending chunks of chunksize packages are ever in flight, so memory
+    use stays flat however many (and however large) the packages are.
+
+    :param paths: iterable of package files and/or directories to search
+    :param workers: number of worker processes; defaults to the number of
+        cpus, and 1 verifies in this process without a pool
+    :param chunksize: number of packages handed to a worker at a time
+    :param max_pending: chunks in flight; defaults to twice the workers
+    :returns: iterator of dicts
+    """
+    return bounded_imap(verify_package, iter_packages(paths), workers, chunksize, max_pending)
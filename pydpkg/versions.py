@@ -0,0 +1,682 @@
+"""pydpkg.versions: parsed debian version strings with precomputed sort keys"""
+
+from __future__ import annotations
+
+import operator
+import re
+from bisect import bisect_left, bisect_right
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Iterable, Iterator, Literal, Sequence, Tuple, TypedDict, TypeVar, cast
+
+from pydpkg.exceptions import DpkgVersionError
+
+# every revision string is a sequence of (non-digits, digits) runs, either of
+# which may be empty; see section 5.6.12 of the debian-policy manual
+_RUN_RE = re.compile(r"([^0-9]*)([0-9]*)")
+
+# letters sort by their code point, everything that is not a letter sorts
+# after every letter, and a tilde sorts before everything including the end
+# of the string (which is encoded as zero).
+_TILDE_WEIGHT = -1
+_END_WEIGHT = 0
+_NONALPHA_OFFSET = 0x110000
+_DIGITS = frozenset("0123456789")
+
+RevisionKey = Tuple[int, ...]
+T = TypeVar("T")
+VersionKey = Tuple[int, RevisionKey, RevisionKey]
+
+
+def _char_weight(char: str) -> int:
+    """Return the sort weight of a single character of a non-digit run"""
+    if char == "~":
+        return _TILDE_WEIGHT
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + _NONALPHA_OFFSET
+
+
+def compare_revisions(rev1: str, rev2: str) -> Literal[-1, 0, 1]:
+    """Compare two upstream versions or debian revisions as described in
+    section 5.6.12 of the debian-policy manual.
+
+    This walks both strings exactly once, comparing non-digit runs
+    character by character and digit runs by length and then by their
+    first differing digit, in the same way as dpkg's own verrevcmp();
+    no intermediate lists, slices or ints are created."""
+    if rev1 == rev2:
+        return 0
+    len1, len2 = len(rev1), len(rev2)
+    i = j = 0
+    while i < len1 or j < len2:
+        # non-digit runs: a digit or the end of the string weighs zero
+        while (i < len1 and rev1[i] not in _DIGITS) or (j < len2 and rev2[j] not in _DIGITS):
+            weight1 = _char_weight(rev1[i]) if i < len1 and rev1[i] not in _DIGITS else _END_WEIGHT
+            weight2 = _char_weight(rev2[j]) if j < len2 and rev2[j] not in _DIGITS else _END_WEIGHT
+            if weight1 != weight2:
+                return -1 if weight1 < weight2 else 1
+            i += 1
+            j += 1
+        # digit runs: skip leading zeros, then the longer run is bigger,
+        # else the first differing digit decides
+        while i < len1 and rev1[i] == "0":
+            i += 1
+        while j < len2 and rev2[j] == "0":
+            j += 1
+        first_diff = 0
+        while i < len1 and j < len2 and rev1[i] in _DIGITS and rev2[j] in _DIGITS:
+            if not first_diff and rev1[i] != rev2[j]:
+                first_diff = -1 if rev1[i] < rev2[j] else 1
+            i += 1
+            j += 1
+        if i < len1 and rev1[i] in _DIGITS:
+            return 1
+        if j < len2 and rev2[j] in _DIGITS:
+            return -1
+        if first_diff:
+            return -1 if first_diff < 0 else 1
+    return 0
+
+
+@lru_cache(maxsize=4096)
+def alpha_key(alphas: str) -> RevisionKey:
+    """Return a tuple that sorts the same way as dstringcmp() would sort
+    the given non-digit run.  The trailing zero marks the end of the
+    run so that tildes sort before it and everything else after it."""
+    return tuple(_char_weight(char) for char in alphas) + (_END_WEIGHT,)
+
+
+@lru_cache(maxsize=65536)
+def revision_key(revision_str: str) -> RevisionKey:
+    """Return a flat tuple of ints that sorts the same way as
+    compare_revision_strings() would sort the given upstream version or
+    debian revision.
+
+    Each (non-digit, digit) run contributes the weights of its non-digit
+    characters, an end-of-run marker and the integer value of its digits.
+    A final end marker lets a trailing tilde run sort before the end of
+    the string and anything else sort after it.
+
+    Upstream versions and debian revisions repeat heavily across real
+    archives, so results are memoized."""
+    key: list[int] = []
+    # an empty revision compares equal to "0", so it gets the same key
+    for alphas, digits in _RUN_RE.findall(revision_str or "0"):
+        if not alphas and not digits:
+            continue
+        key.extend(alpha_key(alphas))
+        key.append(int(digits) if digits else 0)
+    key.append(_END_WEIGHT)
+    return tuple(key)
+
+
+def split_version(version_str: str) -> tuple[int, str, str]:
+    """Split a full version string into epoch, upstream version and debian
+    revision, with the same semantics as Dpkg.split_full_version()"""
+    epoch = 0
+    e_index = version_str.find(":")
+    if e_index != -1:
+        try:
+            epoch = int(version_str[0:e_index])
+        except ValueError as ex:
+            raise DpkgVersionError(
+                f"Corrupt dpkg version '{version_str}': epochs can only be ints, and "
+                "epochless versions cannot use the colon character."
+            ) from ex
+        if epoch < 0:
+            raise DpkgVersionError(f"Corrupt dpkg version '{version_str}': epochs cannot be negative.")
+        version_str = version_str[e_index + 1 :]
+    d_index = version_str.rfind("-")
+    if d_index == -1:
+        return epoch, version_str, "0"
+    return epoch, version_str[0:d_index], version_str[d_index + 1 :]
+
+
+class DebVersion:
+    """An immutable, parsed debian package version.
+
+    The version string is split and tokenized exactly once, into a key
+    tuple that python can compare natively; two DebVersions compare (and
+    hash) equal whenever dpkg would consider them equal, e.g. '1.0' and
+    '0:1.0-0'.
+    """
+
+    __slots__ = ("epoch", "upstream", "revision", "key", "_version_str")
+
+    epoch: int
+    upstream: str
+    revision: str
+    key: VersionKey
+    _version_str: str
+
+    def __init__(self, version_str: str) -> None:
+        """Constructor for DebVersion object
+
+        :param version_str: string
+        :raises: DpkgVersionError
+        """
+        version_str = str(version_str)
+        epoch, upstream, revision = split_version(version_str)
+        object.__setattr__(self, "_version_str", version_str)
+        object.__setattr__(self, "epoch", epoch)
+        object.__setattr__(self, "upstream", upstream)
+        object.__setattr__(self, "revision", revision)
+        object.__setattr__(self, "key", (epoch, revision_key(upstream), revision_key(revision)))
+
+    @classmethod
+    def parse(cls, version: str | DebVersion) -> DebVersion:
+        """Return a DebVersion for a version string, passing existing
+        DebVersion objects through untouched.  If the version cache has
+        been enabled, parsed versions are looked up there first."""
+        if isinstance(version, DebVersion):
+            return version
+        if _VERSION_CACHE is not None and cls is DebVersion:
+            return _VERSION_CACHE.parse(version)
+        return cls(version)
+
+    def __setattr__(self, name: str, value: Any) -> None:  # type: ignore[explicit-override]
+        raise AttributeError(f"'DebVersion' object attribute '{name}' is read-only")
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"DebVersion({self._version_str!r})"
+
+    def __str__(self) -> str:  # type: ignore[explicit-override]
+        return self._version_str
+
+    def __hash__(self) -> int:  # type: ignore[explicit-override]
+        return hash(self.key)
+
+    def __eq__(self, other: object) -> bool:  # type: ignore[explicit-override]
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key == other.key
+
+    def __ne__(self, other: object) -> bool:  # type: ignore[explicit-override]
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key != other.key
+
+    def __lt__(self, other: DebVersion) -> bool:
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key < other.key
+
+    def __le__(self, other: DebVersion) -> bool:
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key <= other.key
+
+    def __gt__(self, other: DebVersion) -> bool:
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key > other.key
+
+    def __ge__(self, other: DebVersion) -> bool:
+        if not isinstance(other, DebVersion):
+            return NotImplemented
+        return self.key >= other.key
+
+
+class VersionCacheStats(TypedDict):
+    """Type definition for the version cache statistics dictionary."""
+
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class VersionCache:
+    """A size-bounded, thread-safe LRU cache of parsed DebVersion objects
+    keyed by version string, with hit/miss/eviction counters.  Other
+    immutable results of parsing a string, such as Dpkg.listify()'s, can
+    share it through memoize()."""
+
+    def __init__(self, maxsize: int = 65536) -> None:
+        """Constructor for VersionCache object
+
+        :param maxsize: int, the maximum number of cached versions
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, version_str: object) -> bool:
+        return version_str in self._entries
+
+    def parse(self, version_str: str) -> DebVersion:
+        """Return the cached DebVersion for a version string, parsing and
+        caching it on a miss.
+
+        :param version_str: string
+        :returns: DebVersion
+        :raises: DpkgVersionError
+        """
+        version_str = str(version_str)
+        return cast(DebVersion, self._lookup(version_str, version_str, DebVersion))
+
+    def memoize(self, kind: str, text: str, func: Callable[[str], T]) -> T:
+        """Return the cached result of func(text), calling it and caching
+        the result on a miss.  Results are shared between callers, so they
+        must be immutable.
+
+        :param kind: string; keeps apart the results of different funcs
+        :param text: string
+        :param func: callable taking text
+        :returns: whatever func returns
+        :raises: whatever func raises
+        """
+        return cast(T, self._lookup((kind, text), text, func))
+
+    def _lookup(self, key: Hashable, text: str, func: Callable[[str], Any]) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+            self._misses += 1
+        # parse outside of the lock; if another thread raced us to the
+        # same miss, keep its result so callers always share one object
+        value = func(text)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached versions and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def stats(self) -> VersionCacheStats:
+        """Return a dictionary of the cache counters and sizes
+
+        :returns: dict
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "maxsize": self.maxsize,
+                "currsize": len(self._entries),
+            }
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups that were served from the cache
+
+        :returns: float
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return self._hits / lookups if lookups else 0.0
+
+
+_VERSION_CACHE: VersionCache | None = None
+
+
+def enable_version_cache(maxsize: int = 65536) -> VersionCache:
+    """Turn on the process-wide cache of parsed versions, used by
+    DebVersion.parse(), Dpkg.split_full_version(), Dpkg.get_epoch(),
+    Dpkg.get_upstream(), Dpkg.listify() and Dpkg.compare_versions().
+    Calling this again replaces the cache.
+
+    :param maxsize: int
+    :returns: VersionCache
+    """
+    global _VERSION_CACHE  # pylint: disable=global-statement
+    _VERSION_CACHE = VersionCache(maxsize)
+    return _VERSION_CACHE
+
+
+def disable_version_cache() -> None:
+    """Turn off (and discard) the process-wide cache of parsed versions"""
+    global _VERSION_CACHE  # pylint: disable=global-statement
+    _VERSION_CACHE = None
+
+
+def get_version_cache() -> VersionCache | None:
+    """Return the process-wide cache of parsed versions, or None if it
+    has not been enabled"""
+    return _VERSION_CACHE
+
+
+def version_key(version_str: str) -> VersionKey:
+    """Return the native sort key for a version string; suitable for
+    passing to sorted() and friends as a key."""
+    epoch, upstream, revision = split_version(str(version_str))
+    return epoch, revision_key(upstream), revision_key(revision)
+
+
+def _encode_int(value: int) -> bytes:
+    """Encode an int >= -1 (epochs and digit runs are never negative, and
+    only a tilde weighs -1) as a length-prefixed big-endian byte string.
+    The encoding is prefix-free, never starts with a NUL byte and sorts
+    bytewise in the same order as the ints themselves."""
+    value += 2
+    length = (value.bit_length() + 7) // 8
+    return bytes((length,)) + value.to_bytes(length, "big")
+
+
+@lru_cache(maxsize=4096)
+def _encode_alphas(alphas: str) -> bytes:
+    return b"".join(_encode_int(weight) for weight in alpha_key(alphas))
+
+
+_ENCODED_END = _encode_int(_END_WEIGHT)
+_ENCODED_SMALL_INTS = tuple(_encode_int(i) for i in range(256))
+
+
+@lru_cache(maxsize=65536)
+def _encode_revision(revision_str: str) -> bytes:
+    parts: list[bytes] = []
+    for alphas, digits in _RUN_RE.findall(revision_str or "0"):
+        if not alphas and not digits:
+            continue
+        parts.append(_encode_alphas(alphas))
+        number = int(digits) if digits else 0
+        parts.append(_ENCODED_SMALL_INTS[number] if number < 256 else _encode_int(number))
+    parts.append(_ENCODED_END)
+    return b"".join(parts)
+
+
+def encode_version(version: str | DebVersion) -> bytes:
+    """Return a compact byte string that sorts bytewise in the same order
+    as compare_versions() sorts the given version.
+
+    The result is the concatenation of the encoded epoch and the encoded
+    elements of the upstream and revision keys; since revision keys are
+    prefix-free this preserves their tuple ordering exactly."""
+    epoch, upstream, revision = split_version(str(version))
+    return _encode_int(epoch) + _encode_revision(upstream) + _encode_revision(revision)
+
+
+def encode_versions(versions: Iterable[str | DebVersion]) -> list[bytes]:
+    """Tokenize a batch of versions in one pass, into a list of byte
+    strings that sort in version order"""
+    return [encode_version(version) for version in versions]
+
+
+def argsort_versions(versions: Sequence[str | DebVersion]) -> list[int]:
+    """Return the list of indices that would sort a sequence of versions.
+    The sort is stable: equal versions keep their relative order."""
+    # byte strings compare in C, which beats comparing key tuples
+    encoded = encode_versions(versions)
+    return sorted(range(len(encoded)), key=encoded.__getitem__)
+
+
+def sort_versions(versions: Iterable[str]) -> list[str]:
+    """Return a new list containing the given versions in ascending order"""
+    items = list(versions)
+    return [items[i] for i in argsort_versions(items)]
+
+
+def max_version(versions: Iterable[str]) -> str:
+    """Return the highest of the given versions
+
+    :raises: ValueError if there are no versions
+    """
+    return max(versions, key=version_key)
+
+
+def min_version(versions: Iterable[str]) -> str:
+    """Return the lowest of the given versions
+
+    :raises: ValueError if there are no versions
+    """
+    return min(versions, key=version_key)
+
+
+# relation operators as described in section 7.1 of the debian-policy
+# manual; the bare "<" and ">" are deprecated spellings of "<=" and ">="
+RELATIONS: dict[str, Callable[[Any, Any], bool]] = {
+    "<<": operator.lt,
+    "<=": operator.le,
+    "=": operator.eq,
+    ">=": operator.ge,
+    ">>": operator.gt,
+    "<": operator.le,
+    ">": operator.ge,
+}
+
+_CONSTRAINT_RE = re.compile(r"^\s*\(?\s*(<<|<=|>=|>>|=|<|>)\s*([0-9A-Za-z][^\s()]*)\s*\)?\s*$")
+
+
+class VersionConstraint:
+    """A version relation such as '>= 1:2.3-4', compiled once so that it
+    can be checked against many candidate versions without re-parsing the
+    right hand side."""
+
+    __slots__ = ("relation", "version", "_key", "_op")
+
+    def __init__(self, constraint: str) -> None:
+        """Constructor for VersionConstraint object
+
+        :param constraint: string, e.g. '>= 1:2.3-4' or '(<< 2.0~)'
+        :raises: DpkgVersionError
+        """
+        match = _CONSTRAINT_RE.match(constraint)
+        if match is None:
+            raise DpkgVersionError(f"Unparseable version constraint '{constraint}'")
+        relation, version_str = match.groups()
+        self.relation: str = relation
+        self.version: DebVersion = DebVersion.parse(version_str)
+        self._key: VersionKey = self.version.key
+        self._op: Callable[[Any, Any], bool] = RELATIONS[relation]
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"VersionConstraint({str(self)!r})"
+
+    def __str__(self) -> str:  # type: ignore[explicit-override]
+        return f"{self.relation} {self.version}"
+
+    def matches(self, version: str | DebVersion) -> bool:
+        """Return True if the given version satisfies this constraint
+
+        :param version: string or DebVersion
+        :returns: bool
+        :raises: DpkgVersionError
+        """
+        if isinstance(version, DebVersion):
+            return self._op(version.key, self._key)
+        return self._op(version_key(version), self._key)
+
+    def filter(self, versions: Iterable[str | DebVersion]) -> list[str | DebVersion]:
+        """Return the versions that satisfy this constraint, in the order
+        they were given
+
+        :param versions: iterable of strings or DebVersions
+        :returns: list
+        :raises: DpkgVersionError
+        """
+        relate, key = self._op, self._key
+        return [
+            version
+            for version in versions
+            if relate(version.key if isinstance(version, DebVersion) else version_key(version), key)
+        ]
+
+
+class VersionIndex:
+    """A set of versions kept sorted by their precomputed keys, answering
+    floor/ceiling/range queries by binary search.
+
+    Versions are stored as given (strings or DebVersions); versions that
+    dpkg considers equal, such as '1.0' and '1.0-0', are only stored once.
+    """
+
+    def __init__(self, versions: Iterable[str | DebVersion] = ()) -> None:
+        """Constructor for VersionIndex object
+
+        :param versions: iterable of strings or DebVersions
+        :raises: DpkgVersionError
+        """
+        entries: dict[VersionKey, str | DebVersion] = {}
+        for version in versions:
+            entries.setdefault(self._key(version), version)
+        self._keys: list[VersionKey] = sorted(entries)
+        self._versions: list[str | DebVersion] = [entries[key] for key in self._keys]
+
+    @staticmethod
+    def _key(version: str | DebVersion) -> VersionKey:
+        if isinstance(version, DebVersion):
+            return version.key
+        return version_key(version)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str | DebVersion]:
+        return iter(self._versions)
+
+    def __reversed__(self) -> Iterator[str | DebVersion]:
+        return iter(self._versions[::-1])
+
+    def __contains__(self, version: object) -> bool:
+        if not isinstance(version, (str, DebVersion)):
+            return False
+        key = self._key(version)
+        idx = bisect_left(self._keys, key)
+        return idx < len(self._keys) and self._keys[idx] == key
+
+    def __repr__(self) -> str:  # type: ignore[explicit-override]
+        return f"VersionIndex({self._versions!r})"
+
+    def add(self, version: str | DebVersion) -> bool:
+        """Insert a version, unless an equal version is already present
+
+        :param version: string or DebVersion
+        :returns: bool, True if the version was inserted
+        :raises: DpkgVersionError
+        """
+        key = self._key(version)
+        idx = bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            return False
+        self._keys.insert(idx, key)
+        self._versions.insert(idx, version)
+        return True
+
+    def discard(self, version: str | DebVersion) -> bool:
+        """Remove the version equal to the given one, if present
+
+        :param version: string or DebVersion
+        :returns: bool, True if a version was removed
+        :raises: DpkgVersionError
+        """
+        key = self._key(version)
+        idx = bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            del self._keys[idx]
+            del self._versions[idx]
+            return True
+        return False
+
+    def remove(self, version: str | DebVersion) -> None:
+        """Remove the version equal to the given one
+
+        :param version: string or DebVersion
+        :raises: KeyError if no such version is present
+        """
+        if not self.discard(version):
+            raise KeyError(version)
+
+    def _at(self, idx: int) -> str | DebVersion | None:
+        if 0 <= idx < len(self._versions):
+            return self._versions[idx]
+        return None
+
+    def lowest(self) -> str | DebVersion | None:
+        """Return the lowest version, or None if the index is empty"""
+        return self._at(0)
+
+    def highest(self) -> str | DebVersion | None:
+        """Return the highest version, or None if the index is empty"""
+        return self._at(len(self._versions) - 1)
+
+    def floor(self, version: str | DebVersion) -> str | DebVersion | None:
+        """Return the highest version <= the given one, or None"""
+        return self._at(bisect_right(self._keys, self._key(version)) - 1)
+
+    def lower(self, version: str | DebVersion) -> str | DebVersion | None:
+        """Return the highest version < the given one, or None"""
+        return self._at(bisect_left(self._keys, self._key(version)) - 1)
+
+    def ceiling(self, version: str | DebVersion) -> str | DebVersion | None:
+        """Return the lowest version >= the given one, or None"""
+        return self._at(bisect_left(self._keys, self._key(version)))
+
+    def higher(self, version: str | DebVersion) -> str | DebVersion | None:
+        """Return the lowest version > the given one, or None"""
+        return self._at(bisect_right(self._keys, self._key(version)))
+
+    def range(
+        self,
+        low: str | DebVersion | None = None,
+        high: str | DebVersion | None = None,
+        low_inclusive: bool = True,
+        high_inclusive: bool = False,
+    ) -> list[str | DebVersion]:
+        """Return the versions between low and high in ascending order;
+        either bound may be None to leave that end of the range open.
+
+        :param low: string, DebVersion or None
+        :param high: string, DebVersion or None
+        :param low_inclusive: bool
+        :param high_inclusive: bool
+        :returns: list
+        """
+        start, end = 0, len(self._keys)
+        if low is not None:
+            bisect = bisect_left if low_inclusive else bisect_right
+            start = bisect(self._keys, self._key(low))
+        if high is not None:
+            bisect = bisect_right if high_inclusive else bisect_left
+            end = bisect(self._keys, self._key(high))
+        return self._versions[start:end]
+
+    def best(self, constraint: str | VersionConstraint) -> str | DebVersion | None:
+        """Return the highest version satisfying a version constraint,
+        such as '<< 2.0', or None if no version does
+
+        :param constraint: string or VersionConstraint
+        :returns: string, DebVersion or None
+        :raises: DpkgVersionError
+        """
+        if not isinstance(constraint, VersionConstraint):
+            constraint = VersionConstraint(constraint)
+        relation, version = constraint.relation, constraint.version
+        if relation == "<<":
+            return self.lower(version)
+        if relation in ("<=", "<"):
+            return self.floor(version)
+        if relation == "=":
+            candidate = self.floor(version)
+        else:
+            candidate = self.highest()
+        if candidate is None or not constraint.matches(candidate):
+            return None
+        return candidate
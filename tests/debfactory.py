@@ -0,0 +1,128 @@
+"""debfactory: build synthetic debian packages for tests and benchmarks"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+
+import zstandard
+
+DEFAULT_CONTROL = """Package: synthetic
+Version: 1:1.0-1
+Architecture: all
+Maintainer: Nobody <nobody@example.com>
+Description: a synthetic package
+ built by tests/debfactory.py
+"""
+
+
+def compress(data, compression):
+    """Compress data with the named compression ('' for none)"""
+    if compression == "gz":
+        return gzip.compress(data, mtime=0)
+    if compression == "xz":
+        return lzma.compress(data)
+    if compression == "zst":
+        return zstandard.ZstdCompressor().compress(data)
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "":
+        return data
+    raise ValueError(f"unknown compression {compression!r}")
+
+
+def build_tar(members):
+    """Return an uncompressed tar archive of (name, data) members.  data
+    may be bytes for a regular file, None for a directory, or a
+    ("symlink", target) / ("hardlink", target) tuple."""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w", format=tarfile.GNU_FORMAT) as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.mtime = 1700000000
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                tar.addfile(info)
+            elif isinstance(data, tuple):
+                kind, target = data
+                info.type = tarfile.SYMTYPE if kind == "symlink" else tarfile.LNKTYPE
+                info.linkname = target
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def build_ar(members):
+    """Return an ar archive of (name, data) members"""
+    out = [b"!<arch>\n"]
+    for name, data in members:
+        header = (
+            f"{name:<16}".encode()
+            + b"0           "
+            + b"0     "
+            + b"0     "
+            + b"100644  "
+            + f"{len(data):<10}".encode()
+            + b"`\n"
+        )
+        assert len(header) == 60
+        out.append(header)
+        out.append(data)
+        if len(data) % 2:
+            out.append(b"\n")
+    return b"".join(out)
+
+
+def build_deb(
+    control=DEFAULT_CONTROL,
+    control_members=None,
+    compression="gz",
+    data_members=None,
+    data_compression=None,
+):
+    """Return the bytes of a synthetic .deb.
+
+    :param control: the control file contents, or None to leave it out
+    :param control_members: extra (name, data) control.tar members; a
+        member named "control" marks where control goes, otherwise it
+        comes first
+    :param compression: control.tar compression: gz, xz, zst, bz2 or ''
+    :param data_members: data.tar members, see build_tar()
+    :param data_compression: data.tar compression, defaults to compression
+    """
+    if isinstance(control, str):
+        control = control.encode()
+    members = list(control_members or [])
+    names = [name for name, _ in members]
+    if control is not None:
+        if "./control" in names:
+            members[names.index("./control")] = ("./control", control)
+        else:
+            members.insert(0, ("./control", control))
+    control_tar = build_tar([("./", None)] + members)
+    data_tar = build_tar([("./", None)] + list(data_members or []))
+    if data_compression is None:
+        data_compression = compression
+    control_name = "control.tar" + (f".{compression}" if compression else "")
+    data_name = "data.tar" + (f".{data_compression}" if data_compression else "")
+    return build_ar(
+        [
+            ("debian-binary", b"2.0\n"),
+            (control_name, compress(control_tar, compression)),
+            (data_name, compress(data_tar, data_compression)),
+        ]
+    )
+
+
+def write_deb(path, **kwargs):
+    """Write a synthetic .deb to path and return the path"""
+    with open(path, "wb") as fileobj:
+        fileobj.write(build_deb(**kwargs))
+    return str(path)
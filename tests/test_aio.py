@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from pydpkg.aio import AsyncDpkg, AsyncDsc, scan_async
+from pydpkg.cache import MetadataCache
+from pydpkg.dpkg import Dpkg
+from pydpkg.dsc import Dsc
+from pydpkg.exceptions import DpkgError, DpkgMissingControlFile, DscBadChecksumsError, DscMissingFileError
+
+from debfactory import DEFAULT_CONTROL, build_deb, write_deb
+
+TEST_DSC_FILE = "testdeb_0.0.0.dsc"
+TEST_BAD_DSC_FILE = "testdeb_1.1.1-bad.dsc"
+TEST_BAD_CHECKSUMS_FILE = "testdeb_0.0.0-badchecksums.dsc"
+
+
+class CountingProcessPool(ProcessPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class AsyncDpkgTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = write_deb(os.path.join(self.tmpdir.name, "synthetic.deb"))
+        self.expected = Dpkg(self.path)
+        self.expected.fileinfo
+
+    async def test_thread_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            pkg = await AsyncDpkg.open(self.path, executor=executor, digests=["sha256", "sha512"])
+            self.assertEqual(await pkg.headers(), self.expected.headers)
+            self.assertEqual((await pkg.fileinfo())["sha256"], self.expected.sha256)
+            self.assertEqual(await pkg.digest("md5"), self.expected.md5)
+            self.assertEqual(await pkg.data_members(), list(self.expected.data_members()))
+        # everything is also available synchronously now
+        self.assertEqual(pkg.dpkg.sha512, self.expected.sha512)
+
+    async def test_process_executor(self):
+        with CountingProcessPool(1) as executor:
+            pkg = await AsyncDpkg.open(self.path, executor=executor)
+            # the package is read once, in the worker
+            self.assertEqual(await pkg.headers(), self.expected.headers)
+            self.assertEqual(await pkg.fileinfo(), self.expected.fileinfo)
+            self.assertEqual((await pkg.control())["Package"], self.expected.headers["Package"])
+            self.assertEqual(await pkg.headers(), self.expected.headers)
+            self.assertEqual(await pkg.digest("sha256"), self.expected.sha256)
+            self.assertEqual(executor.submitted, 1)
+            self.assertEqual(await pkg.data_members(), list(self.expected.data_members()))
+            with pytest.raises(DpkgError):
+                await pkg.digest("blake2b")
+            with pytest.raises(DpkgError):
+                AsyncDpkg(Dpkg(build_deb()), executor=executor)
+            bad = write_deb(
+                os.path.join(self.tmpdir.name, "bad.deb"), control=None, control_members=[("./md5sums", b"")]
+            )
+            with pytest.raises(DpkgMissingControlFile):
+                await (await AsyncDpkg.open(bad, executor=executor)).headers()
+
+    async def test_process_executor_with_cache(self):
+        cache = MetadataCache(os.path.join(self.tmpdir.name, "cache.sqlite"), key="content")
+        self.addCleanup(cache.close)
+        with CountingProcessPool(1) as executor:
+            # start the worker before the cache is patched out in this process
+            executor.submit(os.getpid).result()
+            with mock.patch.object(MetadataCache, "entry", side_effect=AssertionError("looked up in the loop")):
+                pkg = await AsyncDpkg.open(self.path, executor=executor, cache=cache)
+                self.assertEqual(await pkg.headers(), self.expected.headers)
+                self.assertEqual(await pkg.fileinfo(), self.expected.fileinfo)
+                self.assertEqual(await pkg.digest("md5"), self.expected.md5)
+            self.assertEqual(executor.submitted, 2)
+        # the worker stored the package in the cache
+        self.assertEqual(cache.get(self.path, "dpkg")["digests"]["md5"], self.expected.md5)
+
+    async def test_concurrent_calls(self):
+        pkg = await AsyncDpkg.open(self.path)
+        headers, fileinfo = await asyncio.gather(pkg.headers(), pkg.fileinfo())
+        self.assertEqual(headers, self.expected.headers)
+        self.assertEqual(fileinfo, self.expected.fileinfo)
+
+    async def test_limit_and_cancellation(self):
+        release = threading.Event()
+        started = []
+
+        def slow(dpkg):
+            started.append(dpkg)
+            release.wait(5)
+            return dpkg.headers
+
+        limit = asyncio.Semaphore(1)
+        with ThreadPoolExecutor(4) as executor:
+            first = await AsyncDpkg.open(self.path, executor=executor, limit=limit)
+            second = await AsyncDpkg.open(self.path, executor=executor, limit=limit)
+            tasks = [asyncio.create_task(pkg._call(slow)) for pkg in (first, second)]
+            await asyncio.sleep(0.1)
+            # the shared semaphore only lets one job run
+            self.assertEqual(len(started), 1)
+            tasks[1].cancel()
+            release.set()
+            self.assertEqual(await tasks[0], self.expected.headers)
+            with pytest.raises(asyncio.CancelledError):
+                await tasks[1]
+            self.assertEqual(len(started), 1)
+            # the semaphore was released by the cancelled task too
+            self.assertEqual(await second.headers(), self.expected.headers)
+
+
+class AsyncDscTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dirn = os.path.dirname(__file__)
+
+    async def test_good(self):
+        with ThreadPoolExecutor(2) as executor:
+            dsc = await AsyncDsc.open(os.path.join(self.dirn, TEST_DSC_FILE), executor=executor)
+            expected = Dsc(os.path.join(self.dirn, TEST_DSC_FILE))
+            self.assertEqual(await dsc.headers(), expected.headers)
+            self.assertEqual(await dsc.checksums(), expected.checksums)
+            self.assertEqual(await dsc.missing_files(), [])
+            self.assertTrue(await dsc.all_checksums_correct())
+            await dsc.validate()
+
+    async def test_bad_checksums(self):
+        with ProcessPoolExecutor(1) as executor:
+            dsc = await AsyncDsc.open(os.path.join(self.dirn, TEST_BAD_CHECKSUMS_FILE), executor=executor)
+            expected = Dsc(os.path.join(self.dirn, TEST_BAD_CHECKSUMS_FILE))
+            self.assertEqual(await dsc.corrected_checksums(), expected.corrected_checksums)
+            self.assertFalse(await dsc.all_checksums_correct())
+            with pytest.raises(DscBadChecksumsError):
+                await dsc.validate()
+
+    async def test_missing_files(self):
+        dsc = await AsyncDsc.open(os.path.join(self.dirn, TEST_BAD_DSC_FILE))
+        with pytest.raises(DscMissingFileError):
+            await dsc.validate()
+
+
+class ScanAsyncTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.good = []
+        for idx in range(5):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            self.good.append(write_deb(os.path.join(self.tmpdir.name, f"synthetic{idx}.deb"), control=control))
+        self.bad = os.path.join(self.tmpdir.name, "bad.deb")
+        with open(self.bad, "wb") as fileobj:
+            fileobj.write(b"this is not an ar archive")
+
+    async def test_scan(self):
+        records = [record async for record in scan_async([self.tmpdir.name], limit=2)]
+        self.assertEqual(len(records), 6)
+        by_name = {record["filename"]: record for record in records}
+        for path in self.good:
+            self.assertEqual(by_name[path]["headers"], Dpkg(path).headers)
+            self.assertEqual(by_name[path]["fileinfo"], Dpkg(path).fileinfo)
+        self.assertIsInstance(by_name[self.bad]["error"], DpkgError)
+
+    async def test_process_executor(self):
+        with ProcessPoolExecutor(2) as executor:
+            records = [record async for record in scan_async(self.good, executor=executor)]
+        self.assertEqual(
+            sorted(record["headers"]["Package"] for record in records), [f"synthetic{idx}" for idx in range(5)]
+        )
+
+    async def test_close_early(self):
+        scanner = scan_async(self.good, limit=1)
+        async for record in scanner:
+            self.assertIsNone(record["error"])
+            break
+        await scanner.aclose()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import unittest
+
+from pydpkg.ar import ArMember, MemoryviewReader, iter_members
+from pydpkg.exceptions import DpkgArchiveError
+
+from debfactory import build_ar
+
+
+def reader(data):
+    return lambda offset, size: data[offset : offset + size]
+
+
+def header(name, size):
+    return f"{name:<16}{0:<12}{0:<6}{0:<6}{644:<8}{size:<10}`\n".encode()
+
+
+class ArTest(unittest.TestCase):
+    def test_members(self):
+        data = build_ar([("debian-binary", b"2.0\n"), ("control.tar.gz", b"abc"), ("data.tar.xz", b"de")])
+        members = list(iter_members(reader(data)))
+        self.assertEqual([m.name for m in members], ["debian-binary", "control.tar.gz", "data.tar.xz"])
+        self.assertEqual(members[0], ArMember("debian-binary", 68, 4))
+        for member, payload in zip(members, (b"2.0\n", b"abc", b"de")):
+            self.assertEqual(data[member.offset : member.offset + member.size], payload)
+
+    def test_bsd_long_names(self):
+        name = b"control.tar.zst\0\0\0\0\0"
+        data = b"!<arch>\n" + header("#1/20", len(name) + 4) + name + b"wxyz"
+        (member,) = iter_members(reader(data))
+        self.assertEqual(member.name, "control.tar.zst")
+        self.assertEqual(data[member.offset : member.offset + member.size], b"wxyz")
+
+    def test_gnu_long_names(self):
+        table = b"a-very-long-member-name.tar.gz/\n"
+        data = b"!<arch>\n" + header("//", len(table)) + table + header("/0", 2) + b"hi" + header("short/", 1) + b"x\n"
+        members = list(iter_members(reader(data)))
+        self.assertEqual([m.name for m in members], ["a-very-long-member-name.tar.gz", "short"])
+        self.assertEqual(data[members[0].offset : members[0].offset + 2], b"hi")
+
+    def test_headers_only(self):
+        # member sizes that run far past the end of the data are fine as
+        # long as nobody asks for the data
+        data = b"!<arch>\n" + header("control.tar.gz", 10) + b"0123456789" + header("data.tar.gz", 9999999999)
+        self.assertEqual([m.name for m in iter_members(reader(data))], ["control.tar.gz", "data.tar.gz"])
+
+    def test_corrupt(self):
+        self.assertRaises(DpkgArchiveError, list, iter_members(reader(b"!<arxh>\n")))
+        self.assertRaises(DpkgArchiveError, list, iter_members(reader(b"!<arch>\n" + b"x" * 30)))
+        self.assertRaises(DpkgArchiveError, list, iter_members(reader(b"!<arch>\n" + header("x", 1)[:-2] + b"??")))
+        self.assertRaises(DpkgArchiveError, list, iter_members(reader(b"!<arch>\n" + header("#1/zz", 1))))
+
+
+class MemoryviewReaderTest(unittest.TestCase):
+    def test_read(self):
+        data = bytearray(b"0123456789")
+        with MemoryviewReader(memoryview(data)[2:8]) as fileobj:
+            self.assertEqual(fileobj.read(2), b"23")
+            self.assertEqual(fileobj.tell(), 2)
+            self.assertEqual(fileobj.read(), b"4567")
+            self.assertEqual(fileobj.read(), b"")
+            fileobj.seek(-1, 2)
+            self.assertEqual(fileobj.read(), b"7")
+            fileobj.seek(0)
+            self.assertEqual(fileobj.read(100), b"234567")
+        # the view into data has been released again
+        data.extend(b"!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pytest
+
+from pydpkg.cache import MetadataCache
+from pydpkg.dpkg import Dpkg
+from pydpkg.dsc import Dsc
+from pydpkg.exceptions import DpkgError
+
+from debfactory import write_deb
+
+
+def put_many(args):
+    path, filename, start = args
+    cache = MetadataCache(path)
+    for idx in range(start, start + 50):
+        cache.put(filename, f"kind{idx}", {"idx": idx})
+    return cache.get(filename, f"kind{start}")
+
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db = os.path.join(self.tmpdir.name, "cache.sqlite")
+        self.deb = write_deb(os.path.join(self.tmpdir.name, "synthetic.deb"))
+
+    def cache(self, **kwargs):
+        cache = MetadataCache(self.db, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_get_put(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get(self.deb, "dpkg"))
+        cache.put(self.deb, "dpkg", {"a": [1, 2]})
+        self.assertEqual(cache.get(self.deb, "dpkg"), {"a": [1, 2]})
+        self.assertIsNone(cache.get(self.deb, "dsc"))
+        # the stat signature changes
+        os.utime(self.deb, ns=(0, 0))
+        self.assertIsNone(cache.get(self.deb, "dpkg"))
+        self.assertIsNone(cache.get(self.deb, "dpkg"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "stale": 1, "evictions": 0, "entries": 0, "size": 0})
+        self.assertRaises(DpkgError, MetadataCache, self.db, key="mtime")
+
+    def test_content_key(self):
+        cache = self.cache(key="content")
+        cache.put(self.deb, "dpkg", {"a": 1})
+        copy = os.path.join(self.tmpdir.name, "copy.deb")
+        shutil.copy(self.deb, copy)
+        self.assertEqual(cache.get(copy, "dpkg"), {"a": 1})
+
+    def test_eviction(self):
+        cache = self.cache(max_bytes=4096)
+        for idx in range(100):
+            cache.put(self.deb, f"kind{idx}", {"payload": "x" * 100})
+            # keep the oldest entry in use
+            self.assertIsNotNone(cache.get(self.deb, "kind0"))
+        stats = cache.stats()
+        self.assertLessEqual(stats["size"], 4096)
+        self.assertEqual(stats["evictions"], 100 - stats["entries"])
+        self.assertIsNotNone(cache.get(self.deb, "kind99"))
+        self.assertIsNotNone(cache.get(self.deb, "kind0"))
+        self.assertIsNone(cache.get(self.deb, "kind1"))
+        cache.clear()
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_concurrent_processes(self):
+        cache = self.cache()
+        cache.put(self.deb, "parent", {"pid": os.getpid()})
+        # the cache can be handed to (and used in) worker processes
+        cache = pickle.loads(pickle.dumps(cache))
+        with multiprocessing.get_context("spawn").Pool(4) as pool:
+            results = pool.map(put_many, [(self.db, self.deb, start) for start in range(0, 200, 50)])
+        self.assertEqual(results, [{"idx": start} for start in range(0, 200, 50)])
+        self.assertEqual(cache.stats()["entries"], 201)
+
+    def test_dpkg(self):
+        cache = self.cache()
+        dpkg = Dpkg(self.deb, cache=cache)
+        headers, fileinfo = dpkg.headers, dpkg.fileinfo
+        with mock.patch.object(Dpkg, "_process_dpkg_file", side_effect=AssertionError("opened")), mock.patch.object(
+            Dpkg, "_read_file", side_effect=AssertionError("read")
+        ):
+            dpkg = Dpkg(self.deb, cache=cache)
+            self.assertEqual(dpkg.headers, headers)
+            self.assertEqual(dpkg.fileinfo, fileinfo)
+            self.assertEqual(Dpkg(self.deb, cache=cache, ingest=True).sha256, fileinfo["sha256"])
+        self.assertEqual(cache.stats()["hits"], 2)
+        # digests not in the cache yet are computed and added
+        self.assertEqual(len(Dpkg(self.deb, cache=cache).sha512), 128)
+        self.assertIn("sha512", cache.get(self.deb, "dpkg")["digests"])
+
+    def test_dpkg_replaced_while_read(self):
+        cache = self.cache()
+        replacement = write_deb(os.path.join(self.tmpdir.name, "replacement.deb"), data_members=[("./usr/x", b"x")])
+        read_file = Dpkg._read_file
+
+        def read_then_replace(dpkg, *args, **kwargs):
+            result = read_file(dpkg, *args, **kwargs)
+            os.replace(replacement, self.deb)
+            return result
+
+        with mock.patch.object(Dpkg, "_read_file", read_then_replace):
+            old = Dpkg(self.deb, cache=cache).fileinfo
+        # the old metadata was stored against the old file, so it is stale
+        self.assertNotEqual(Dpkg(self.deb, cache=cache).fileinfo, old)
+        self.assertEqual(cache.stats()["stale"], 1)
+
+    def test_dpkg_strictness(self):
+        path = write_deb(
+            os.path.join(self.tmpdir.name, "noarch.deb"), control="Package: a\nVersion: 1\nDescription: x\n"
+        )
+        cache = self.cache()
+        self.assertEqual(Dpkg(path, ignore_missing=True, cache=cache).package, "a")
+        with pytest.raises(DpkgError):
+            Dpkg(path, cache=cache).message
+
+    def test_dsc(self):
+        cache = self.cache()
+        dirn = os.path.dirname(__file__)
+        for name in ("testdeb_0.0.0.dsc", "testdeb_0.0.0.dsc.asc"):
+            path = os.path.join(dirn, name)
+            expected = Dsc(path, cache=cache)
+            expected.message_str
+            with mock.patch("pgpy.PGPMessage.from_file", side_effect=AssertionError("opened")):
+                dsc = Dsc(path, cache=cache)
+                self.assertEqual(dsc.message_str, expected.message_str)
+                self.assertEqual(dsc.checksums, expected.checksums)
+            self.assertEqual(dsc.pgp_message is None, name.endswith(".dsc"))
+            if dsc.pgp_message is not None:
+                self.assertEqual(dsc.pgp_message.message, expected.pgp_message.message)
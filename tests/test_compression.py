@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+import pytest
+
+from pydpkg import compression
+from pydpkg.compression import (
+    decompressors,
+    get_decompressor,
+    register_decompressor,
+    suffixes,
+    unregister_decompressor,
+)
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgError
+
+from debfactory import build_ar, build_tar, write_deb
+
+
+class RegistryTest(unittest.TestCase):
+    def test_builtin(self):
+        self.assertEqual(sorted(suffixes()), ["", "bz2", "gz", "xz", "zst"])
+        self.assertEqual(
+            [backend.name for backend in decompressors("gz", available=False)], ["isal", "zlib-ng", "zlib"]
+        )
+        self.assertEqual(get_decompressor("gz", "zlib").name, "zlib")
+        payload = b"payload" * 100
+        with get_decompressor("gz", "zlib").open(io.BytesIO(gzip.compress(payload))) as fileobj:
+            self.assertEqual(fileobj.read(), payload)
+        with get_decompressor("").open(io.BytesIO(payload)) as fileobj:
+            self.assertEqual(fileobj.read(), payload)
+        with pytest.raises(DpkgError):
+            get_decompressor("lz4")
+        with pytest.raises(DpkgError):
+            get_decompressor("gz", "nonexistent")
+
+    def test_unavailable_backends_are_skipped(self):
+        register_decompressor("gz", "missing", compression._gzip, module="pydpkg_no_such_module", priority=100)
+        self.addCleanup(unregister_decompressor, "gz", "missing")
+        self.assertFalse(decompressors("gz", available=False)[0].available)
+        self.assertNotEqual(get_decompressor("gz").name, "missing")
+        with pytest.raises(DpkgError):
+            get_decompressor("gz", "missing")
+
+    def test_plug_in(self):
+        opened = []
+
+        @contextmanager
+        def reverse(fileobj):
+            opened.append(fileobj)
+            yield io.BytesIO(fileobj.read()[::-1])
+
+        register_decompressor("rev", "reverse", reverse)
+        self.addCleanup(unregister_decompressor, "rev", "reverse")
+        self.assertIn("rev", suffixes())
+        control_tar = build_tar([("./control", b"Package: a\nVersion: 1\nArchitecture: all\n")])
+        data_tar = build_tar([("./usr", None)])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "reversed.deb")
+            with open(path, "wb") as fileobj:
+                fileobj.write(
+                    build_ar(
+                        [
+                            ("debian-binary", b"2.0\n"),
+                            ("control.tar.rev", control_tar[::-1]),
+                            ("data.tar.rev", data_tar[::-1]),
+                        ]
+                    )
+                )
+            dpkg = Dpkg(path)
+            self.assertEqual(dpkg.package, "a")
+            self.assertEqual([member.path for member in dpkg.data_members()], ["usr"])
+        self.assertEqual(len(opened), 2)
+        unregister_decompressor("rev", "reverse")
+        self.assertNotIn("rev", suffixes())
+
+    def test_priority(self):
+        calls = []
+
+        def counting(fileobj):
+            calls.append(fileobj)
+            return compression._gzip(fileobj)
+
+        register_decompressor("gz", "counting", counting, priority=1000)
+        self.addCleanup(unregister_decompressor, "gz", "counting")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.assertEqual(Dpkg(write_deb(os.path.join(tmpdir, "a.deb"))).package, "synthetic")
+        self.assertEqual(len(calls), 1)
+        unregister_decompressor("gz", "counting")
+        self.assertNotEqual(get_decompressor("gz").name, "counting")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from pydpkg.contents import ContentsIndex, package_location
+
+from debfactory import DEFAULT_CONTROL, write_deb
+
+
+class ContentsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pool = os.path.join(self.tmpdir.name, "pool")
+        os.mkdir(self.pool)
+        for idx, section in enumerate(("utils", "libs", None)):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            if section:
+                control += f"Section: {section}\n"
+            members = [
+                ("./usr", None),
+                ("./usr/bin", None),
+                (f"./usr/bin/tool{idx}", b"#!/bin/sh\n"),
+                ("./usr/share/doc/shared/README", b"shared by all"),
+                (f"./usr/bin/link{idx}", ("symlink", f"tool{idx}")),
+            ]
+            write_deb(os.path.join(self.pool, f"synthetic{idx}.deb"), control=control, data_members=members)
+        with open(os.path.join(self.pool, "broken.deb"), "wb") as fileobj:
+            fileobj.write(b"!<arch>\n")
+
+    def expected(self):
+        return [
+            ("usr/bin/link0", ["utils/synthetic0"]),
+            ("usr/bin/link1", ["libs/synthetic1"]),
+            ("usr/bin/link2", ["synthetic2"]),
+            ("usr/bin/tool0", ["utils/synthetic0"]),
+            ("usr/bin/tool1", ["libs/synthetic1"]),
+            ("usr/bin/tool2", ["synthetic2"]),
+            ("usr/share/doc/shared/README", ["libs/synthetic1", "synthetic2", "utils/synthetic0"]),
+        ]
+
+    def test_package_location(self):
+        self.assertEqual(package_location({"Package": "a", "Section": "contrib/utils"}), "contrib/utils/a")
+        self.assertEqual(package_location({"package": "a"}), "a")
+
+    def test_build(self):
+        with ContentsIndex() as index:
+            index.add_packages([self.pool])
+            self.assertEqual(list(index.entries()), self.expected())
+            self.assertEqual(list(index.errors), [os.path.join(self.pool, "broken.deb")])
+
+    def test_spill_and_workers(self):
+        with ContentsIndex(max_entries=2) as index:
+            index.add_packages([self.pool], workers=2)
+            self.assertEqual(len(index._runs), 4)
+            self.assertEqual(list(index.entries()), self.expected())
+            output = os.path.join(self.tmpdir.name, "dists", "Contents-all")
+            self.assertEqual(index.write(output, compressions=("", "gz")), [output, output + ".gz"])
+        with open(output, encoding="utf-8") as fileobj:
+            lines = fileobj.readlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(lines[0].split(), ["usr/bin/link0", "utils/synthetic0"])
+        self.assertEqual(
+            lines[-1].split(), ["usr/share/doc/shared/README", "libs/synthetic1,synthetic2,utils/synthetic0"]
+        )
+        with gzip.open(output + ".gz", "rt", encoding="utf-8") as fileobj:
+            self.assertEqual(fileobj.readlines(), lines)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+import unittest
+
+import pytest
+
+from pydpkg.controlfiles import Conffile, Conffiles, Md5sums
+from pydpkg.exceptions import DpkgControlMemberError, DpkgError
+
+MD5SUMS = b"""d41d8cd98f00b204e9800998ecf8427e  usr/bin/tool
+0123456789ABCDEF0123456789ABCDEF  ./usr/share/doc/tool/a file with spaces
+00112233445566778899aabbccddeeff *usr/lib/tool/\xff.so
+
+"""
+
+
+class Md5sumsTest(unittest.TestCase):
+    def test_parse(self):
+        md5sums = Md5sums(MD5SUMS)
+        self.assertIsNone(md5sums._digests)
+        self.assertEqual(
+            dict(md5sums),
+            {
+                "usr/bin/tool": "d41d8cd98f00b204e9800998ecf8427e",
+                "usr/share/doc/tool/a file with spaces": "0123456789abcdef0123456789abcdef",
+                "usr/lib/tool/\udcff.so": "00112233445566778899aabbccddeeff",
+            },
+        )
+        self.assertEqual(md5sums.data, MD5SUMS)
+        self.assertIn("usr/bin/tool", md5sums)
+        self.assertEqual(len(Md5sums()), 0)
+
+    def test_malformed(self):
+        for data in (b"d41d8cd98f00b204e9800998ecf8427e usr/bin/tool\n", b"nothex  usr/bin/tool\n", b"d41d8cd9  x\n"):
+            with pytest.raises(DpkgControlMemberError):
+                len(Md5sums(data))
+        # int(digest, 16) would accept all of these
+        for digest in (b"0x" + b"a" * 30, b"a" * 15 + b"_" + b"a" * 16, b" " + b"a" * 31, b"+" + b"a" * 31):
+            with pytest.raises(DpkgControlMemberError):
+                len(Md5sums(digest + b"  usr/bin/x\n"))
+        self.assertTrue(issubclass(DpkgControlMemberError, DpkgError))
+
+
+class ConffilesTest(unittest.TestCase):
+    def test_parse(self):
+        conffiles = Conffiles(b"/etc/tool.conf\n\nremove-on-upgrade /etc/old dir/tool.conf\n")
+        self.assertIsNone(conffiles._entries)
+        self.assertEqual(conffiles[0], Conffile("/etc/tool.conf", ()))
+        self.assertEqual(conffiles[-1:], (Conffile("/etc/old dir/tool.conf", ("remove-on-upgrade",)),))
+        self.assertEqual(conffiles.paths, ["/etc/tool.conf", "/etc/old dir/tool.conf"])
+        self.assertEqual(len(Conffiles()), 0)
+        with pytest.raises(DpkgControlMemberError):
+            len(Conffiles(b"etc/relative.conf\n"))
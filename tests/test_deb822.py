@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import io
+import os
+import unittest
+from email import message_from_string
+from email.message import Message
+from unittest import mock
+
+import pytest
+
+from pydpkg.deb822 import Deb822, iter_paragraphs
+from pydpkg.dsc import Dsc, strip_signature
+from pydpkg.exceptions import Deb822Error, DpkgError, DscError
+
+CONTROL = """Package: synthetic
+Version:  1:1.0-1
+Architecture: all
+Depends: libc6 (>= 2.36),
+\tlibfoo1
+Description: a synthetic package
+ with a long description
+ .
+ over several lines
+Files:
+ 0123 12 synthetic_1.0.orig.tar.gz
+X-Empty:
+"""
+
+
+class Deb822Test(unittest.TestCase):
+    def test_matches_email(self):
+        control = Deb822.parse(CONTROL)
+        message = message_from_string(CONTROL)
+        self.assertEqual(control.fields(), message.items())
+        self.assertEqual(list(control.items()), message.items())
+        self.assertEqual(control.as_string(), message.as_string())
+        self.assertEqual(control["Files"].split("\n")[1:], [" 0123 12 synthetic_1.0.orig.tar.gz"])
+
+    def test_mapping(self):
+        control = Deb822.parse(CONTROL)
+        self.assertEqual(len(control), 7)
+        self.assertEqual(control["PACKAGE"], "synthetic")
+        self.assertIn("architecture", control)
+        self.assertNotIn("nonexistent", control)
+        self.assertNotIn(None, control)
+        self.assertEqual(control.get("nonexistent", "foo"), "foo")
+        with pytest.raises(KeyError):
+            control["nonexistent"]
+        control["Section"] = "misc"
+        control["version"] = "2.0"
+        del control["X-EMPTY"]
+        self.assertEqual(list(control)[-2:], ["Files", "Section"])
+        self.assertEqual(control["Version"], "2.0")
+        self.assertEqual(control["section"], "misc")
+        self.assertEqual(Deb822.parse(control.as_string()), control)
+        self.assertEqual(Deb822([("Package", "a"), ("Version", "1")]).as_string(), "Package: a\nVersion: 1\n\n")
+
+    def test_values_are_lazy(self):
+        control = Deb822.parse(CONTROL)
+        self.assertEqual(control._values, [None] * 7)
+        control["Description"]
+        self.assertEqual(sum(value is not None for value in control._values), 1)
+
+    def test_to_message(self):
+        message = Deb822.parse(CONTROL).to_message()
+        self.assertIsInstance(message, Message)
+        self.assertEqual(message.items(), message_from_string(CONTROL).items())
+
+    def test_tolerated(self):
+        control = Deb822.parse("\n\n# a comment\r\nPackage: a\r\n# another\r\n more\r\n\n \n")
+        self.assertEqual(control.fields(), [("Package", "a\n more")])
+        self.assertEqual(len(Deb822.parse("")), 0)
+
+    def test_malformed(self):
+        for text in (
+            "Package a\n",
+            "Package: a\nVersion 1\n",
+            "Package: a\npackage: b\n",
+            " continued\nPackage: a\n",
+            ": a\n",
+            "Package: a\n\nPackage: b\n",
+            "-----BEGIN PGP SIGNED MESSAGE-----\nHash: SHA256\n\nSource: a\n",
+        ):
+            with pytest.raises(Deb822Error):
+                Deb822.parse(text)
+        # both Dpkg and Dsc callers can catch it
+        self.assertTrue(issubclass(Deb822Error, DpkgError))
+        self.assertTrue(issubclass(Deb822Error, DscError))
+
+    def test_iter_paragraphs(self):
+        text = "".join(f"Package: p{idx}\nVersion: {idx}\nDescription: d\n more\n\n \n" for idx in range(50))
+        expected = [f"p{idx}" for idx in range(50)]
+        self.assertEqual([para["Package"] for para in iter_paragraphs(text)], expected)
+        # paragraphs and separators that straddle reads
+        for size in (1, 7, 31, 1 << 20):
+            with mock.patch("pydpkg.deb822.READ_BUFFER_SIZE", size):
+                paragraphs = list(iter_paragraphs(io.StringIO("\n" + text)))
+            self.assertEqual([para["Package"] for para in paragraphs], expected)
+            self.assertEqual(paragraphs[-1]["Description"], "d\n more")
+        self.assertEqual(list(iter_paragraphs("\n\n")), [])
+
+
+class SignatureTest(unittest.TestCase):
+    def test_strip_signature(self):
+        signed = (
+            "-----BEGIN PGP SIGNED MESSAGE-----\nHash: SHA256\n\nSource: a\n- -not-a-field\n"
+            "-----BEGIN PGP SIGNATURE-----\n\nxxxx\n-----END PGP SIGNATURE-----\n"
+        )
+        self.assertEqual(strip_signature(signed), "Source: a\n-not-a-field\n")
+        self.assertEqual(strip_signature("Source: a\n"), "Source: a\n")
+
+    def test_unreadable_signature(self):
+        # the signature is corrupt, but the fields can still be read
+        dsc = Dsc(os.path.join(os.path.dirname(__file__), "testdeb_1.1.1-bad.dsc.asc"))
+        self.assertIsNone(dsc.pgp_message)
+        self.assertEqual(dsc.source, "testdeb")
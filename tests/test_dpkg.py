@@ -1,12 +1,31 @@
 #!/usr/bin/env python
 
+import hashlib
+import io
+import mmap
 import os
 import pytest
+import random
+import sys
+import tempfile
 import unittest
+from unittest import mock
 from email.message import Message
 
-from pydpkg.dpkg import Dpkg
-from pydpkg.exceptions import DpkgVersionError, DpkgMissingControlGzipFile
+from pydpkg.controlfiles import Conffile
+from pydpkg.deb822 import Deb822
+from pydpkg.dpkg import DIGESTS, READ_BUFFER_SIZE, DataMember, Dpkg
+from pydpkg.exceptions import (
+    Deb822Error,
+    DpkgArchiveError,
+    DpkgError,
+    DpkgVersionError,
+    DpkgMissingControlFile,
+    DpkgMissingControlGzipFile,
+    DpkgMissingDataTarFile,
+)
+
+from debfactory import build_ar, build_deb, build_tar, compress, write_deb
 
 TEST_DPKG_GZ_FILE = "testdeb_1:0.0.0-test_all.deb"
 TEST_DPKG_XZ_FILE = "sample_package_xz.deb"
@@ -38,6 +57,15 @@ class DpkgGzTest(unittest.TestCase):
         self.assertRaises(KeyError, self.dpkg.__getitem__, "xyzzy")
         self.assertRaises(AttributeError, self.dpkg.__getattr__, "xyzzy")
 
+    def test_get_header(self):
+        # header lookups do not build the email message
+        with mock.patch.object(Deb822, "to_message", side_effect=AssertionError("message built")):
+            self.assertEqual(self.dpkg.get_header("PACKAGE"), "testdeb")
+            self.assertIsNone(self.dpkg.get_header("xyzzy"))
+            self.assertEqual(self.dpkg.compare_version_with("1:0.0.0-test"), 0)
+            self.assertEqual(self.dpkg.compare_version_with("1:0.0.1"), -1)
+        self.assertEqual(self.dpkg.get_header("package"), self.dpkg.message.get("package"))
+
     def test_message(self):
         self.assertIsInstance(self.dpkg.message, type(Message()))
 
@@ -105,12 +133,325 @@ class DpkgBadTest(unittest.TestCase):
             Dpkg(dpkgfile).message
 
 
+class DpkgSyntheticTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def deb(self, name="synthetic.deb", **kwargs):
+        return write_deb(os.path.join(self.tmpdir.name, name), **kwargs)
+
+    def test_control_after_other_members(self):
+        for compression in ("gz", "xz", "zst", "bz2", ""):
+            members = [("./md5sums", b"0" * 32 + b"  usr/bin/x\n" * 10000), ("./control", b"")]
+            path = self.deb(control_members=members, compression=compression)
+            dpkg = Dpkg(path)
+            self.assertEqual(dpkg.package, "synthetic")
+            self.assertEqual(dpkg.epoch, 1)
+            self.assertEqual(Dpkg(path, ingest=True).package, "synthetic")
+
+    def test_unknown_control_compression(self):
+        path = os.path.join(self.tmpdir.name, "lz4.deb")
+        control_tar = build_tar([("./control", b"Package: a\nVersion: 1\nArchitecture: all\n")])
+        with open(path, "wb") as fileobj:
+            fileobj.write(build_ar([("debian-binary", b"2.0\n"), ("control.tar.lz4", control_tar)]))
+        with pytest.raises(DpkgMissingControlGzipFile, match="control.tar.gz/xz/zst/bz2"):
+            Dpkg(path).message
+
+    def test_control(self):
+        dpkg = Dpkg(self.deb())
+        self.assertIsInstance(dpkg.control, Deb822)
+        self.assertEqual(dpkg.control["version"], "1:1.0-1")
+        self.assertEqual(dpkg.headers, dict(dpkg.message.items()))
+        self.assertEqual(dpkg.control_str, dpkg.message.as_string())
+        with pytest.raises(Deb822Error):
+            Dpkg(self.deb(name="bad.deb", control="Package: a\nno colon here\n")).control
+
+    def test_missing_control(self):
+        dpkg = Dpkg(self.deb(control=None, control_members=[("./md5sums", b"")]))
+        with pytest.raises(DpkgMissingControlFile):
+            dpkg.message
+
+    def test_stops_reading_after_control(self):
+        # the tail of the compressed control archive is corrupt; a
+        # streaming reader never gets that far
+        noise = random.Random(0).randbytes(256 * 1024)
+        control = b"Package: a\nVersion: 1\nArchitecture: all\n"
+        compressed = compress(build_tar([("./", None), ("./control", control), ("./md5sums", noise)]), "gz")
+        corrupt = compressed[:-512] + bytes(512)
+        path = os.path.join(self.tmpdir.name, "corrupt.deb")
+        with open(path, "wb") as fileobj:
+            fileobj.write(build_ar([("debian-binary", b"2.0\n"), ("control.tar.gz", corrupt)]))
+        self.assertEqual(Dpkg(path).package, "a")
+
+    def test_data_member_is_never_read(self):
+        deb = build_deb()
+        # chop the package off in the middle of data.tar.gz
+        path = os.path.join(self.tmpdir.name, "truncated.deb")
+        with open(path, "wb") as fileobj:
+            fileobj.write(deb[: deb.index(b"data.tar.gz") + 70])
+        self.assertEqual(Dpkg(path).package, "synthetic")
+
+    def test_bad_archives(self):
+        path = os.path.join(self.tmpdir.name, "empty.deb")
+        open(path, "wb").close()
+        with pytest.raises(DpkgArchiveError):
+            Dpkg(path).message
+        with open(path, "wb") as fileobj:
+            fileobj.write(b"this is not an ar archive")
+        with pytest.raises(DpkgArchiveError):
+            Dpkg(path).message
+
+    def test_ingest(self):
+        # an incompressible control archive larger than the read buffer, so
+        # that it straddles several reads
+        noise = random.Random(1).randbytes(3 * READ_BUFFER_SIZE)
+        path = self.deb(control_members=[("./md5sums", noise)], data_members=[("./usr/share/blob", noise)])
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        expected = Dpkg(path)
+        expected.fileinfo
+        for dpkg in (Dpkg(path).ingest(), Dpkg(path, ingest=True)):
+            self.assertEqual(dpkg.headers, expected.headers)
+            # everything was read in one pass, so the file is no longer needed
+            os.rename(path, path + ".moved")
+            try:
+                self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+                self.assertEqual(dpkg.sha256, hashlib.sha256(raw).hexdigest())
+                self.assertEqual(dpkg.filesize, len(raw))
+            finally:
+                os.rename(path + ".moved", path)
+
+    def test_ingest_bad_control(self):
+        path = self.deb(control=None, control_members=[("./md5sums", b"")])
+        dpkg = Dpkg(path)
+        with pytest.raises(DpkgMissingControlFile):
+            dpkg.ingest()
+        # the checksums are still computed
+        self.assertEqual(dpkg.fileinfo["filesize"], os.path.getsize(path))
+        path = os.path.join(self.tmpdir.name, "empty.deb")
+        open(path, "wb").close()
+        with pytest.raises(DpkgArchiveError):
+            Dpkg(path, ingest=True).message
+
+    def test_selected_digests(self):
+        path = self.deb()
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        dpkg = Dpkg(path, digests=["sha256", "blake2b"])
+        self.assertEqual(
+            dpkg.fileinfo,
+            {
+                "sha256": hashlib.sha256(raw).hexdigest(),
+                "blake2b": hashlib.blake2b(raw).hexdigest(),
+                "filesize": len(raw),
+            },
+        )
+        # anything else is computed on demand
+        self.assertEqual(dpkg.sha512, hashlib.sha512(raw).hexdigest())
+        self.assertEqual(dpkg.md5, hashlib.md5(raw).hexdigest())
+        with pytest.raises(DpkgError):
+            Dpkg(path, digests=["crc32"])
+        with pytest.raises(DpkgError):
+            dpkg.digest("crc32")
+
+    def test_parallel_digests(self):
+        noise = random.Random(2).randbytes(5 * READ_BUFFER_SIZE + 17)
+        path = self.deb(data_members=[("./usr/share/blob", noise)])
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        expected = {name: hashlib.new(name, raw).hexdigest() for name in DIGESTS}
+        for threshold in (0, len(raw) + 1):
+            with mock.patch("pydpkg.dpkg.PARALLEL_DIGEST_THRESHOLD", threshold), mock.patch(
+                "os.cpu_count", return_value=4
+            ):
+                dpkg = Dpkg(path, digests=DIGESTS, ingest=True)
+                self.assertEqual(dpkg.package, "synthetic")
+                self.assertEqual(dpkg.fileinfo, dict(expected, filesize=len(raw)))
+
+    def test_control_members(self):
+        members = [
+            ("./md5sums", b"d41d8cd98f00b204e9800998ecf8427e  usr/bin/tool\n"),
+            ("./conffiles", b"/etc/tool.conf\nremove-on-upgrade /etc/old.conf\n"),
+            ("./postinst", b"#!/bin/sh\nexit 0\n"),
+            ("./scripts", None),
+        ]
+        for compression in ("gz", "xz", "zst"):
+            dpkg = Dpkg(self.deb(control_members=members, compression=compression))
+            with mock.patch.object(dpkg, "_decompress", wraps=dpkg._decompress) as decompress:
+                everything = dpkg.control_members()
+                self.assertEqual(list(everything), ["control", "md5sums", "conffiles", "postinst"])
+                self.assertEqual(everything["postinst"], b"#!/bin/sh\nexit 0\n")
+                self.assertEqual(dpkg.control_members(["postinst", "triggers"]), {"postinst": everything["postinst"]})
+                self.assertEqual(dict(dpkg.md5sums), {"usr/bin/tool": "d41d8cd98f00b204e9800998ecf8427e"})
+                self.assertEqual(
+                    list(dpkg.conffiles),
+                    [Conffile("/etc/tool.conf"), Conffile("/etc/old.conf", ("remove-on-upgrade",))],
+                )
+                # the control fields came from the same pass
+                self.assertEqual(dpkg.package, "synthetic")
+            self.assertEqual(decompress.call_count, 1)
+
+    def test_control_member_subsets(self):
+        members = [("./md5sums", b""), ("./postinst", b"exit 0\n"), ("./triggers", b"interest foo\n")]
+        dpkg = Dpkg(self.deb(control_members=members))
+        with mock.patch.object(dpkg, "_decompress", wraps=dpkg._decompress) as decompress:
+            self.assertEqual(dpkg.control_members(["postinst"]), {"postinst": b"exit 0\n"})
+            self.assertNotIn("triggers", dpkg._control_members)
+            self.assertEqual(dpkg.control_members(["postinst"]), {"postinst": b"exit 0\n"})
+            self.assertEqual(decompress.call_count, 1)
+            # absent members are remembered too
+            self.assertEqual(len(dpkg.conffiles), 0)
+            self.assertEqual(len(dpkg.conffiles), 0)
+            self.assertEqual(dpkg.control_members(["conffiles"]), {})
+            self.assertEqual(decompress.call_count, 2)
+            self.assertEqual(len(dpkg.md5sums), 0)
+            self.assertEqual(list(dpkg.control_members()), ["control", "md5sums", "postinst", "triggers"])
+            self.assertEqual(dpkg.control_members(["triggers"]), {"triggers": b"interest foo\n"})
+            self.assertEqual(decompress.call_count, 4)
+
+    def test_data_members(self):
+        members = [
+            ("./usr", None),
+            ("./usr/bin/tool", b"#!/bin/sh\n"),
+            ("./usr/bin/alias", ("symlink", "tool")),
+            ("./usr/bin/hard", ("hardlink", "./usr/bin/tool")),
+        ]
+        for compression in ("gz", "xz", "zst", "bz2", ""):
+            path = self.deb(data_members=members, data_compression=compression)
+            self.assertEqual(
+                list(Dpkg(path).data_members()),
+                [
+                    DataMember(".", 0, 0o755, "directory", ""),
+                    DataMember("usr", 0, 0o755, "directory", ""),
+                    DataMember("usr/bin/tool", 10, 0o644, "file", ""),
+                    DataMember("usr/bin/alias", 0, 0o644, "symlink", "tool"),
+                    DataMember("usr/bin/hard", 0, 0o644, "hardlink", "./usr/bin/tool"),
+                ],
+            )
+
+    def test_data_members_missing(self):
+        path = os.path.join(self.tmpdir.name, "nodata.deb")
+        with open(path, "wb") as fileobj:
+            fileobj.write(build_ar([("debian-binary", b"2.0\n"), ("control.tar.gz", b"")]))
+        with pytest.raises(DpkgMissingDataTarFile):
+            list(Dpkg(path).data_members())
+
+    def test_sources(self):
+        noise = random.Random(3).randbytes(2 * READ_BUFFER_SIZE)
+        path = self.deb(data_members=[("./usr/share/blob", noise)])
+        expected = Dpkg(path)
+        expected.fileinfo
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        spooled = tempfile.SpooledTemporaryFile(max_size=len(raw) + 1)
+        spooled.write(raw)
+        with open(path, "rb") as fileobj, mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            sources = [raw, bytearray(raw), memoryview(raw), mapped, io.BytesIO(raw), spooled, fileobj]
+            for source in sources:
+                for ingest in (False, True):
+                    dpkg = Dpkg(source, ingest=ingest)
+                    self.assertEqual(dpkg.headers, expected.headers)
+                    self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+                    self.assertEqual(dpkg.filesize, len(raw))
+                    self.assertEqual(list(dpkg.data_members()), list(expected.data_members()))
+        # a spooled file is read in memory rather than being rolled over
+        self.assertFalse(spooled._rolled)
+        self.assertEqual(Dpkg(open(path, "rb")).filename, path)
+
+    @unittest.skipUnless(sys.implementation.name == "cpython", "relies on CPython's SpooledTemporaryFile")
+    def test_spooled_file_in_memory(self):
+        path = self.deb()
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        expected = Dpkg(path)
+        spooled = tempfile.SpooledTemporaryFile(max_size=len(raw) + 1)
+        spooled.write(raw)
+        # fileno() would roll the upload over to disk
+        with mock.patch.object(spooled, "fileno", side_effect=AssertionError("rolled over")):
+            dpkg = Dpkg(spooled)
+            self.assertEqual(dpkg.headers, expected.headers)
+            self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+            self.assertEqual(list(dpkg.data_members()), list(expected.data_members()))
+            # the view exports the spooled file's own buffer rather than a
+            # copy, so the file cannot grow while it is held
+            with dpkg._memory_view() as view:
+                self.assertEqual(view, raw)
+                spooled.seek(0, io.SEEK_END)
+                self.assertRaises(BufferError, spooled.write, b"x")
+
+    def test_spooled_file_elsewhere(self):
+        path = self.deb()
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+        expected = Dpkg(path)
+        spooled = tempfile.SpooledTemporaryFile(max_size=len(raw) + 1)
+        spooled.write(raw)
+        # without CPython's private attributes it is read into memory once
+        with mock.patch("pydpkg.dpkg._SPOOLED_IN_PLACE", False), mock.patch.object(
+            spooled, "fileno", side_effect=AssertionError("rolled over")
+        ):
+            dpkg = Dpkg(spooled)
+            spooled.truncate(0)
+            self.assertEqual(dpkg.headers, expected.headers)
+            self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+            self.assertEqual(list(dpkg.data_members()), list(expected.data_members()))
+
+    def test_unmappable_file_object(self):
+        path = self.deb()
+        with open(path, "rb") as fileobj:
+            raw = fileobj.read()
+
+        # e.g. a seekable file object without a file descriptor
+        dpkg = Dpkg(io.BufferedReader(io.BytesIO(raw)))
+        self.assertEqual(dpkg.package, "synthetic")
+        self.assertEqual(dpkg.fileinfo["sha256"], hashlib.sha256(raw).hexdigest())
+        self.assertEqual(list(dpkg.data_members()), list(Dpkg(path).data_members()))
+
+    def test_stream(self):
+        path = self.deb()
+        expected = Dpkg(path)
+        expected.fileinfo
+
+        class Stream(io.RawIOBase):
+            def __init__(self, fileobj):
+                self.fileobj = fileobj
+
+            def readable(self):
+                return True
+
+            def readinto(self, buf):
+                return self.fileobj.readinto(buf)
+
+        with open(path, "rb") as fileobj:
+            # a stream is ingested: everything is read in its only pass
+            dpkg = Dpkg(Stream(fileobj))
+            self.assertEqual(dpkg.filesize, expected.filesize)
+            self.assertEqual(dpkg.headers, expected.headers)
+            self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+            with pytest.raises(DpkgError):
+                dpkg.sha512
+            with pytest.raises(DpkgError):
+                list(dpkg.data_members())
+
+    def test_bad_sources(self):
+        with pytest.raises(DpkgError):
+            Dpkg(12)
+        with pytest.raises(DpkgError):
+            Dpkg(build_deb(), cache=mock.Mock())
+        with pytest.raises(DpkgArchiveError):
+            Dpkg(b"").message
+        with pytest.raises(DpkgArchiveError):
+            Dpkg(io.BytesIO(b"this is not an ar archive")).message
+
+
 class DpkgVersionsTest(unittest.TestCase):
     def test_get_epoch(self):
         self.assertEqual(Dpkg.get_epoch("0"), (0, "0"))
         self.assertEqual(Dpkg.get_epoch("0:0"), (0, "0"))
         self.assertEqual(Dpkg.get_epoch("1:0"), (1, "0"))
         self.assertRaises(DpkgVersionError, Dpkg.get_epoch, "1a:0")
+        self.assertRaises(DpkgVersionError, Dpkg.get_epoch, "-1:0")
 
     def test_get_upstream(self):
         self.assertEqual(Dpkg.get_upstream("00"), ("00", "0"))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import pydpkg
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(pydpkg.__file__)))
+HEAVY_MODULES = ["pgpy", "cryptography", "zstandard", "six", "tarfile", "concurrent.futures"]
+
+
+def modules_loaded_by(code):
+    """Run code in a fresh interpreter and return which of HEAVY_MODULES
+    it left in sys.modules"""
+    script = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.check_output([sys.executable, "-c", script], cwd=PACKAGE_ROOT, text=True)
+    return json.loads(output.splitlines()[-1])
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_package(self):
+        self.assertEqual(modules_loaded_by("import pydpkg"), [])
+
+    def test_compare_versions(self):
+        code = "from pydpkg import Dpkg\nassert Dpkg.compare_versions('1.0', '1.1') == -1"
+        self.assertEqual(modules_loaded_by(code), [])
+
+    def test_version_index(self):
+        code = "from pydpkg import VersionIndex\nassert VersionIndex(['1.0', '2.0']).best('<< 2.0') == '1.0'"
+        self.assertEqual(modules_loaded_by(code), [])
+
+    def test_dsc_loads_pgpy_when_used(self):
+        self.assertEqual(modules_loaded_by("from pydpkg import Dsc"), [])
+        code = "from pydpkg import Dsc\nDsc('tests/testdeb_0.0.0.dsc').headers"
+        self.assertIn("pgpy", modules_loaded_by(code))
+
+    def test_attributes(self):
+        from pydpkg import dpkg, versions  # pylint: disable=import-outside-toplevel
+
+        self.assertIs(pydpkg.Dpkg, dpkg.Dpkg)
+        self.assertIs(pydpkg.DebVersion, versions.DebVersion)
+        self.assertIs(pydpkg.versions, versions)
+        self.assertIn("Dsc", dir(pydpkg))
+        with self.assertRaises(AttributeError):
+            pydpkg.no_such_name  # pylint: disable=pointless-statement
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+import hashlib
+import io
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+import pytest
+
+from pydpkg import metrics
+from pydpkg.dpkg import Dpkg
+from pydpkg.dsc import Dsc
+from pydpkg.metrics import PhaseStats, instrument
+
+from debfactory import write_deb
+
+TEST_DSC_FILE = "testdeb_0.0.0.dsc"
+
+
+class RecordingSink:
+    def __init__(self):
+        self.records = []
+
+    def record(self, phase, seconds, bytes_read, bytes_decompressed):
+        self.records.append((phase, seconds, bytes_read, bytes_decompressed))
+
+    def phases(self):
+        return [record[0] for record in self.records]
+
+    def first(self, phase):
+        return next(record for record in self.records if record[0] == phase)
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        noise = random.Random(2).randbytes(200000)
+        sums = f"{hashlib.md5(noise).hexdigest()}  usr/share/blob\n".encode()
+        self.path = write_deb(
+            os.path.join(self.tmpdir.name, "synthetic.deb"),
+            control_members=[("./md5sums", sums)],
+            data_members=[("./usr/share/blob", noise)],
+        )
+
+    def test_disabled(self):
+        self.assertIsNone(metrics.get_sink())
+        self.assertIs(metrics.phase("a"), metrics.phase("b"))
+        fileobj = io.BytesIO(b"data")
+        with metrics.counting(fileobj, "a", fileobj) as counted:
+            self.assertIs(counted, fileobj)
+        read_at = lambda offset, size: b""  # noqa: E731
+        self.assertIs(metrics.phase("a").reads(read_at), read_at)
+
+    def test_dpkg_phases(self):
+        sink = RecordingSink()
+        with instrument(sink):
+            dpkg = Dpkg(self.path)
+            dpkg.control
+            dpkg.fileinfo
+            self.assertTrue(dpkg.verify().ok)
+        self.assertIsNone(metrics.get_sink())
+        self.assertEqual(
+            sink.phases(),
+            [
+                "dpkg.ar",
+                "dpkg.control.tar",
+                "dpkg.control.decompress",
+                "dpkg.control.parse",
+                "dpkg.read",
+                "dpkg.ar",
+                "dpkg.control.decompress",
+                "dpkg.ar",
+                "dpkg.data.decompress",
+                "dpkg.verify",
+            ],
+        )
+        self.assertEqual(sink.first("dpkg.read")[2], os.path.getsize(self.path))
+        _, _, compressed, decompressed = sink.first("dpkg.data.decompress")
+        self.assertGreater(compressed, 200000)
+        self.assertGreater(decompressed, 200000)
+        self.assertEqual(sink.first("dpkg.control.parse")[2], len(dpkg.control_str) - 1)
+        self.assertGreater(sink.first("dpkg.ar")[2], 0)
+        for record in sink.records:
+            self.assertGreaterEqual(record[1], 0.0)
+        # nothing more is recorded once the sink is gone
+        Dpkg(self.path).control
+        self.assertEqual(len(sink.records), 10)
+
+    def test_ingest_phases(self):
+        sink = RecordingSink()
+        with instrument(sink):
+            Dpkg(self.path, ingest=True).control
+        self.assertEqual(sink.phases()[-1], "dpkg.read")
+        self.assertIn("dpkg.control.parse", sink.phases())
+
+    def test_failed_phases_are_not_recorded(self):
+        sink = RecordingSink()
+        with instrument(sink):
+            with pytest.raises(ValueError):
+                with metrics.phase("failing"):
+                    raise ValueError
+        self.assertEqual(sink.records, [])
+
+    def test_dsc_phases(self):
+        sink = RecordingSink()
+        with instrument(sink):
+            dsc = Dsc(os.path.join(os.path.dirname(__file__), TEST_DSC_FILE))
+            dsc.validate()
+        self.assertEqual(sink.phases()[0], "dsc.parse")
+        hashes = [record for record in sink.records if record[0] == "dsc.hash"]
+        self.assertEqual(len(hashes), len(dsc.source_files))
+        self.assertEqual(sum(record[2] for record in hashes), sum(size for _, size in dsc.sizes))
+
+
+class PhaseStatsTest(unittest.TestCase):
+    def test_percentiles(self):
+        stats = PhaseStats()
+        for ms in range(1, 101):
+            stats.record("a", ms / 1000, 10, 20)
+        stats.record("b", 0.5, 0, 0)
+        self.assertEqual(stats.phases(), ["a", "b"])
+        self.assertEqual(stats.count("a"), 100)
+        self.assertEqual(stats.count("c"), 0)
+        self.assertAlmostEqual(stats.percentile("a", 50), 0.05)
+        self.assertAlmostEqual(stats.percentile("a", 99), 0.099)
+        self.assertAlmostEqual(stats.percentile("a", 100), 0.1)
+        self.assertAlmostEqual(stats.percentile("a", 0), 0.001)
+        with pytest.raises(KeyError):
+            stats.percentile("c", 50)
+        summary = stats.summary((50, 99.9))
+        self.assertEqual(summary["a"]["count"], 100)
+        self.assertEqual(summary["a"]["bytes_read"], 1000)
+        self.assertEqual(summary["a"]["bytes_decompressed"], 2000)
+        self.assertAlmostEqual(summary["a"]["p99.9"], 0.1)
+        self.assertAlmostEqual(summary["b"]["max"], 0.5)
+        out = io.StringIO()
+        stats.report(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            lines[0].split(), ["phase", "count", "p50", "p90", "p99", "max", "total", "MiB", "read", "MiB", "decomp"]
+        )
+        self.assertEqual(lines[1].split()[:3], ["a", "100", "50.000"])
+
+    def test_threads(self):
+        stats = PhaseStats()
+
+        def work():
+            for _ in range(1000):
+                stats.record("a", 0.001, 1, 0)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(stats.count("a"), 4000)
+        self.assertEqual(stats.summary()["a"]["bytes_read"], 4000)
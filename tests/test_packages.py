@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import zstandard
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.packages import PackagesIndex, format_stanza
+
+from debfactory import DEFAULT_CONTROL, write_deb
+
+
+class PackagesIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = self.tmpdir.name
+        self.state = os.path.join(self.root, "state.json")
+        self.output = os.path.join(self.root, "dists", "stable", "main", "binary-all", "Packages")
+        for idx in range(3):
+            self.deb(idx)
+
+    def deb(self, idx, version="1:1.0-1"):
+        control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}").replace(
+            "Version: 1:1.0-1", f"Version: {version}"
+        )
+        path = os.path.join(self.root, "pool", "main", f"synthetic{idx}_all.deb")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return write_deb(path, control=control)
+
+    def test_format_stanza(self):
+        path = self.deb(0)
+        dpkg = Dpkg(path)
+        stanza = format_stanza(dpkg.headers, "pool/main/synthetic0_all.deb", dpkg.fileinfo)
+        self.assertEqual(
+            stanza,
+            "Package: synthetic0\n"
+            "Version: 1:1.0-1\n"
+            "Architecture: all\n"
+            "Maintainer: Nobody <nobody@example.com>\n"
+            "Filename: pool/main/synthetic0_all.deb\n"
+            f"Size: {dpkg.filesize}\n"
+            f"MD5sum: {dpkg.md5}\n"
+            f"SHA1: {dpkg.sha1}\n"
+            f"SHA256: {dpkg.sha256}\n"
+            "Description: a synthetic package\n"
+            " built by tests/debfactory.py\n",
+        )
+
+    def test_write(self):
+        index = PackagesIndex(self.root, state_file=self.state)
+        self.assertEqual(index.update(), {"reused": 0, "read": 3, "removed": 0, "failed": 0})
+        written = index.write(self.output, compressions=("", "gz", "xz", "zst"))
+        self.assertEqual(written, [self.output + suffix for suffix in ("", ".gz", ".xz", ".zst")])
+        with open(self.output, "rb") as fileobj:
+            content = fileobj.read()
+        self.assertEqual(content.count(b"\nFilename: pool/main/synthetic"), 3)
+        self.assertEqual(content.split(b"\n\n")[0].split(b"\n")[0], b"Package: synthetic0")
+        self.assertEqual(gzip.decompress(open(self.output + ".gz", "rb").read()), content)
+        self.assertEqual(lzma.decompress(open(self.output + ".xz", "rb").read()), content)
+        with zstandard.open(self.output + ".zst", "rb") as fileobj:
+            self.assertEqual(fileobj.read(), content)
+
+    def test_incremental(self):
+        index = PackagesIndex(self.root, state_file=self.state)
+        index.update()
+        index.write(self.output)
+        first = index.as_string()
+
+        # nothing changed: no package is opened and no output rewritten
+        index = PackagesIndex(self.root, state_file=self.state)
+        with mock.patch("pydpkg.scanner.Dpkg", side_effect=AssertionError("package was read")):
+            self.assertEqual(index.update(), {"reused": 3, "read": 0, "removed": 0, "failed": 0})
+        self.assertEqual(index.as_string(), first)
+        self.assertEqual(index.write(self.output), [])
+
+        # a changed, an added, a removed and a broken package
+        self.deb(1, version="1:2.0-1")
+        self.deb(3)
+        os.unlink(os.path.join(self.root, "pool", "main", "synthetic2_all.deb"))
+        with open(os.path.join(self.root, "pool", "main", "broken.deb"), "wb") as fileobj:
+            fileobj.write(b"!<arch>\n")
+        index = PackagesIndex(self.root, state_file=self.state)
+        self.assertEqual(index.update(), {"reused": 1, "read": 2, "removed": 1, "failed": 1})
+        self.assertEqual(list(index.errors), [os.path.join("pool", "main", "broken.deb")])
+        self.assertIn("Version: 1:2.0-1\n", index.as_string())
+        self.assertNotIn("synthetic2", index.as_string())
+        self.assertEqual(len(index.write(self.output)), 3)
+
+    def test_without_state(self):
+        index = PackagesIndex(self.root)
+        index.update()
+        self.assertEqual(len(index), 3)
+        self.assertRaises(ValueError, index.write, self.output, ["bz2"])
+        self.assertFalse(os.path.exists(self.state))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+import pytest
+
+from pydpkg.deb822 import Deb822
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgError
+from pydpkg.packages import format_stanza
+from pydpkg.record import PackageRecord
+
+from debfactory import DEFAULT_CONTROL, write_deb
+
+STANZA = """Package: synthetic
+Version: 1:1.0-1
+Architecture: amd64
+Maintainer: Nobody <nobody@example.com>
+Section: misc
+Filename: pool/main/s/synthetic/synthetic_1.0-1_amd64.deb
+Size: 1234
+MD5sum: 0123456789abcdef0123456789abcdef
+SHA256: 0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef
+Description: a synthetic package
+ over two lines
+"""
+
+
+class PackageRecordTest(unittest.TestCase):
+    def test_from_stanza(self):
+        record = PackageRecord.from_stanza(STANZA)
+        self.assertEqual((record.package, record.version, record.architecture), ("synthetic", "1:1.0-1", "amd64"))
+        self.assertEqual(record.filename, "pool/main/s/synthetic/synthetic_1.0-1_amd64.deb")
+        self.assertEqual(record.size, 1234)
+        self.assertEqual(record.digest("md5"), bytes.fromhex("0123456789abcdef0123456789abcdef"))
+        self.assertEqual(record.md5, "0123456789abcdef0123456789abcdef")
+        self.assertIsNone(record.sha1)
+        self.assertEqual(record["SECTION"], "misc")
+        self.assertEqual(record.get("description"), "a synthetic package\n over two lines")
+        self.assertIsNone(record.get("Depends"))
+        with pytest.raises(KeyError):
+            record["Depends"]
+        with pytest.raises(DpkgError):
+            record.digest("sha512")
+        self.assertEqual(
+            list(record.headers), ["Package", "Version", "Architecture", "Maintainer", "Section", "Description"]
+        )
+        self.assertEqual(record.to_stanza(), STANZA)
+        self.assertEqual(PackageRecord.from_stanza(Deb822.parse(STANZA)), record)
+        self.assertEqual(PackageRecord.from_stanza(dict(Deb822.parse(STANZA))), record)
+
+    def test_interned(self):
+        first = PackageRecord.from_stanza(STANZA)
+        second = PackageRecord.from_stanza(STANZA.replace("Package: synthetic", "Package: other"))
+        self.assertIs(first.architecture, second.architecture)
+        self.assertIs(first["Maintainer"], second["Maintainer"])
+        self.assertIs(first["Section"], sys.intern("misc"))
+
+    def test_immutable_and_hashable(self):
+        record = PackageRecord.from_stanza(STANZA)
+        with pytest.raises(AttributeError):
+            record.version = "2.0"
+        with pytest.raises(AttributeError):
+            del record.package
+        with pytest.raises(AttributeError):
+            record.extra = "x"
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(len({record, PackageRecord.from_stanza(STANZA)}), 1)
+        self.assertNotEqual(record, PackageRecord.from_stanza(STANZA.replace("Size: 1234", "Size: 1235")))
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+        self.assertEqual(repr(record), "PackageRecord('synthetic', '1:1.0-1', 'amd64')")
+
+    def test_invalid(self):
+        for stanza in (
+            STANZA.replace("Architecture: amd64\n", ""),
+            STANZA.replace("Size: 1234", "Size: big"),
+            STANZA.replace("MD5sum: 0123", "MD5sum: xyz"),
+        ):
+            with pytest.raises(DpkgError):
+                PackageRecord.from_stanza(stanza)
+
+    def test_from_dpkg(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = write_deb(os.path.join(tmpdir, "synthetic.deb"))
+            dpkg = Dpkg(path)
+            record = PackageRecord.from_dpkg(dpkg, filename="pool/synthetic.deb")
+            self.assertEqual(record.headers, dpkg.headers)
+            self.assertEqual(record.filename, "pool/synthetic.deb")
+            self.assertEqual(record.size, dpkg.filesize)
+            self.assertEqual((record.md5, record.sha1, record.sha256), (dpkg.md5, dpkg.sha1, dpkg.sha256))
+            self.assertEqual(record.to_stanza(), format_stanza(dpkg.headers, "pool/synthetic.deb", dpkg.fileinfo))
+            self.assertEqual(PackageRecord.from_stanza(record.to_stanza()), record)
+            self.assertEqual(PackageRecord.from_dpkg(dpkg).filename, path)
+            self.assertEqual(record["package"], DEFAULT_CONTROL.split("\n")[0].split(": ")[1])
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+import hashlib
+import random
+import re
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgRemoteError
+from pydpkg.remote import RangeFile, open_url
+
+from debfactory import build_deb
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Serve the server's files from memory, honouring single Range
+    requests unless the server's ranges flag is off"""
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        self.server.requests.append((self.command, self.path, self.headers.get("Range")))
+        data = self.server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        start, end, status = 0, len(data) - 1, 200
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if match and self.server.ranges:
+            start, end, status = int(match.group(1)), min(int(match.group(2)), len(data) - 1), 206
+        self.send_response(status)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if body:
+            self.wfile.write(data[start : end + 1])
+
+
+class MirrorServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # clients hang up on responses they reject, e.g. without a range
+        pass
+
+
+class FakeReader:
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def read_range(self, offset, size):
+        self.calls.append((offset, size))
+        return self.data[offset : offset + size]
+
+
+class RemoteTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MirrorServer(("127.0.0.1", 0), MirrorHandler)
+        cls.server.files = {}
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.ranges = True
+        self.noise = random.Random(0).randbytes(4 << 20)
+        self.deb = build_deb(data_members=[("./usr/share/blob", self.noise)], data_compression="")
+        self.server.files["/pool/synthetic.deb"] = self.deb
+        self.url = f"http://127.0.0.1:{self.server.server_port}/pool/synthetic.deb"
+
+    def test_headers_only_fetch_the_control_member(self):
+        remote = open_url(self.url)
+        dpkg = Dpkg(remote)
+        self.assertEqual(dpkg.filename, self.url)
+        self.assertEqual(dpkg.headers, Dpkg(self.deb).headers)
+        # one request for the first block, which holds the control member
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertLess(remote.reader.bytes_read, len(self.deb) // 50)
+
+    def test_checksums_and_members(self):
+        expected = Dpkg(self.deb)
+        dpkg = Dpkg(open_url(self.url))
+        self.assertEqual(dpkg.fileinfo, expected.fileinfo)
+        self.assertEqual(dpkg.sha256, hashlib.sha256(self.deb).hexdigest())
+        self.assertEqual(list(dpkg.data_members()), list(expected.data_members()))
+
+    def test_no_range_support(self):
+        self.server.ranges = False
+        with pytest.raises(DpkgRemoteError):
+            Dpkg(open_url(self.url)).headers
+
+    def test_missing(self):
+        with pytest.raises(DpkgRemoteError):
+            Dpkg(open_url(self.url + ".missing")).headers
+
+    def test_size_from_head(self):
+        remote = open_url(self.url)
+        self.assertEqual(remote.seek(0, 2), len(self.deb))
+        self.assertEqual(self.server.requests, [("HEAD", "/pool/synthetic.deb", None)])
+
+    def test_block_cache(self):
+        data = bytes(range(256)) * 64
+        reader = FakeReader(data)
+        remote = RangeFile(reader, block_size=1024, max_blocks=4)
+        remote.seek(1000)
+        # adjacent missing blocks are coalesced into a single request
+        self.assertEqual(remote.read(2000), data[1000:3000])
+        self.assertEqual(reader.calls, [(0, 3072)])
+        remote.seek(0)
+        self.assertEqual(remote.read(3072), data[:3072])
+        self.assertEqual(len(reader.calls), 1)
+        # least recently used blocks are evicted
+        remote.seek(5000)
+        self.assertEqual(remote.read(100), data[5000:5100])
+        remote.seek(10000)
+        self.assertEqual(remote.read(100), data[10000:10100])
+        remote.seek(0)
+        remote.read(10)
+        self.assertEqual(reader.calls[-1], (0, 1024))
+        # reads bigger than the cache bypass it
+        remote.seek(0)
+        self.assertEqual(remote.read(len(data)), data)
+        self.assertEqual(reader.calls[-1], (0, len(data)))
+        # reads at and past the end
+        remote.seek(len(data) - 10)
+        self.assertEqual(remote.read(100), data[-10:])
+        self.assertEqual(remote.read(100), b"")
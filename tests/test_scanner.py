@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+
+from pydpkg.cache import MetadataCache
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgArchiveError, DpkgMissingControlFile
+from pydpkg.scanner import iter_packages, scan
+
+from debfactory import DEFAULT_CONTROL, write_deb
+
+
+class ScanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pool = os.path.join(self.tmpdir.name, "pool")
+        os.makedirs(os.path.join(self.pool, "main", "s"))
+        self.good = []
+        for idx in range(6):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            path = os.path.join(self.pool, "main", "s", f"synthetic{idx}_1.0-1_all.deb")
+            self.good.append(write_deb(path, control=control))
+        self.missing_control = write_deb(
+            os.path.join(self.pool, "missing-control.deb"), control=None, control_members=[("./md5sums", b"")]
+        )
+        self.not_a_deb = os.path.join(self.pool, "not-a.deb")
+        with open(self.not_a_deb, "wb") as fileobj:
+            fileobj.write(b"garbage")
+        with open(os.path.join(self.pool, "README"), "w") as fileobj:
+            fileobj.write("not a package\n")
+
+    def check(self, records):
+        records = {record["filename"]: record for record in records}
+        self.assertEqual(set(records), set(self.good) | {self.missing_control, self.not_a_deb})
+        for idx, path in enumerate(self.good):
+            record = records[path]
+            self.assertIsNone(record["error"])
+            self.assertEqual(record["headers"]["Package"], f"synthetic{idx}")
+            self.assertEqual(record["fileinfo"], Dpkg(path).fileinfo)
+        self.assertIsInstance(records[self.missing_control]["error"], DpkgMissingControlFile)
+        self.assertIsInstance(records[self.not_a_deb]["error"], DpkgArchiveError)
+        self.assertIsNone(records[self.not_a_deb]["headers"])
+
+    def test_iter_packages(self):
+        self.assertEqual(list(iter_packages([self.pool]))[-1], self.good[-1])
+        self.assertEqual(len(list(iter_packages([self.pool, self.good[0]]))), 9)
+
+    def test_scan_in_process(self):
+        self.check(scan([self.pool], workers=1))
+
+    def test_scan_pool(self):
+        self.check(scan([self.pool], workers=2, max_pending=1))
+        self.check(scan([self.pool], workers=3, chunksize=4))
+
+    def test_scan_with_cache(self):
+        cache = MetadataCache(os.path.join(self.tmpdir.name, "cache.sqlite"))
+        self.addCleanup(cache.close)
+        self.check(scan([self.pool], workers=2, cache=cache))
+        self.assertEqual(cache.stats()["entries"], len(self.good))
+        self.check(scan([self.pool], workers=1, cache=cache))
+        self.assertEqual(cache.stats()["hits"], len(self.good))
+
+    def test_scan_stop_early(self):
+        records = scan([self.pool], workers=2)
+        self.assertIn(next(records)["filename"], set(self.good) | {self.missing_control, self.not_a_deb})
+        records.close()
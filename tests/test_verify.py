@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+import hashlib
+import os
+import tempfile
+import unittest
+
+from pydpkg.dpkg import Dpkg, Verification
+from pydpkg.exceptions import DpkgArchiveError
+from pydpkg.verify import verify
+
+from debfactory import DEFAULT_CONTROL, write_deb
+
+TOOL = b"#!/bin/sh\necho tool\n"
+README = b"read me\n" * 1000
+
+
+def md5sums(entries):
+    return "".join(f"{hashlib.md5(data).hexdigest()}  {path}\n" for path, data in entries).encode()
+
+
+class VerifyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def deb(self, name, data_members, sums, conffiles=b"", control=DEFAULT_CONTROL, data_compression="gz"):
+        control_members = [("./md5sums", sums)]
+        if conffiles:
+            control_members.append(("./conffiles", conffiles))
+        return write_deb(
+            os.path.join(self.tmpdir.name, name),
+            control=control,
+            control_members=control_members,
+            data_members=[("./usr", None), ("./usr/bin", None)] + data_members,
+            data_compression=data_compression,
+        )
+
+    def test_good(self):
+        data = [
+            ("./usr/bin/tool", TOOL),
+            ("./usr/bin/same", ("hardlink", "./usr/bin/tool")),
+            ("./usr/bin/alias", ("symlink", "tool")),
+            ("./usr/share/doc/synthetic/README", README),
+            ("./etc/synthetic.conf", b"setting = 1\n"),
+        ]
+        sums = md5sums([("usr/bin/tool", TOOL), ("usr/bin/same", TOOL), ("usr/share/doc/synthetic/README", README)])
+        for compression in ("gz", "xz", "zst", "bz2", ""):
+            path = self.deb("good.deb", data, sums, conffiles=b"/etc/synthetic.conf\n", data_compression=compression)
+            dpkg = Dpkg(path)
+            result = dpkg.verify()
+            self.assertEqual(result, Verification({}, [], []))
+            self.assertTrue(result.ok)
+
+    def test_bad(self):
+        data = [("./usr/bin/tool", b"corrupted"), ("./usr/bin/stowaway", b"extra")]
+        sums = md5sums([("usr/bin/tool", TOOL), ("usr/share/doc/synthetic/README", README)])
+        result = Dpkg(self.deb("bad.deb", data, sums)).verify()
+        self.assertFalse(result.ok)
+        self.assertEqual(
+            result.mismatched, {"usr/bin/tool": (hashlib.md5(TOOL).hexdigest(), hashlib.md5(b"corrupted").hexdigest())}
+        )
+        self.assertEqual(result.missing, ["usr/share/doc/synthetic/README"])
+        self.assertEqual(result.extra, ["usr/bin/stowaway"])
+
+    def test_batch(self):
+        good = []
+        for idx in range(5):
+            control = DEFAULT_CONTROL.replace("Package: synthetic", f"Package: synthetic{idx}")
+            sums = md5sums([("usr/bin/tool", TOOL)])
+            good.append(self.deb(f"synthetic{idx}.deb", [("./usr/bin/tool", TOOL)], sums, control=control))
+        bad = self.deb("bad.deb", [("./usr/bin/tool", b"corrupted")], md5sums([("usr/bin/tool", TOOL)]))
+        broken = os.path.join(self.tmpdir.name, "broken.deb")
+        with open(broken, "wb") as fileobj:
+            fileobj.write(b"garbage")
+        for workers in (1, 2):
+            records = {record["filename"]: record for record in verify([self.tmpdir.name], workers=workers)}
+            self.assertEqual(set(records), set(good) | {bad, broken})
+            for path in good:
+                self.assertTrue(records[path]["result"].ok)
+            self.assertEqual(list(records[bad]["result"].mismatched), ["usr/bin/tool"])
+            self.assertIsNone(records[broken]["result"])
+            self.assertIsInstance(records[broken]["error"], DpkgArchiveError)
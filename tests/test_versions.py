@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+
+import random
+import threading
+import unittest
+from functools import cmp_to_key
+
+import pytest
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgVersionError
+from pydpkg.versions import (
+    DebVersion,
+    VersionCache,
+    VersionConstraint,
+    VersionIndex,
+    disable_version_cache,
+    enable_version_cache,
+    encode_version,
+    encode_versions,
+    get_version_cache,
+    revision_key,
+    version_key,
+)
+
+SAMPLE_VERSIONS = [
+    "0.0.0",
+    "0:0.0.0-0",
+    "0.0.1",
+    "0.0.9",
+    "0.0.10",
+    "0.9.0",
+    "0.10.0",
+    "1.0~rc1",
+    "1.0~rc1-1",
+    "1.0",
+    "1.0-1",
+    "1.0-1~bpo1",
+    "1.0-1ubuntu1",
+    "1.0-1+deb9u1",
+    "1.0.0",
+    "1.0a",
+    "1.0+dfsg-2",
+    "1.2.3-1~deb7u1",
+    "1.2.3-1",
+    "2.7.4+reloaded2-13ubuntu1",
+    "2.7.4+reloaded2-13+deb9u1",
+    "2:0.0.44-1",
+    "2:0.0.44-nobin",
+    "1:0.0.0-test",
+    "10.0.0",
+    "9.0.0",
+    "a",
+    "a~",
+    "a~~",
+]
+
+
+class DebVersionTest(unittest.TestCase):
+    def test_components(self):
+        ver = DebVersion("1:2.3.4-5ubuntu1")
+        self.assertEqual(ver.epoch, 1)
+        self.assertEqual(ver.upstream, "2.3.4")
+        self.assertEqual(ver.revision, "5ubuntu1")
+        self.assertEqual(str(ver), "1:2.3.4-5ubuntu1")
+        self.assertEqual(repr(ver), "DebVersion('1:2.3.4-5ubuntu1')")
+
+    def test_components_match_split_full_version(self):
+        for version in SAMPLE_VERSIONS + ["foo-bar-baz", "0:0.0-00"]:
+            ver = DebVersion(version)
+            self.assertEqual((ver.epoch, ver.upstream, ver.revision), Dpkg.split_full_version(version))
+
+    def test_bad_epoch(self):
+        self.assertRaises(DpkgVersionError, DebVersion, "1a:0")
+
+    def test_negative_epoch(self):
+        for func in (DebVersion, encode_version, version_key):
+            self.assertRaises(DpkgVersionError, func, "-3:1.0")
+        self.assertRaises(DpkgVersionError, Dpkg.compare_versions, "-3:1.0", "1.0")
+        self.assertRaises(DpkgVersionError, Dpkg.sort_versions, ["-3:1.0", "1.0"])
+        self.assertRaises(DpkgVersionError, Dpkg.argsort_versions, ["-2:1.0", "1.0"])
+        self.assertRaises(DpkgVersionError, Dpkg.max_version, ["-3:1.0", "1.0"])
+
+    def test_immutable(self):
+        ver = DebVersion("1.0")
+        with pytest.raises(AttributeError):
+            ver.epoch = 2
+
+    def test_equality_and_hash(self):
+        self.assertEqual(DebVersion("1.0"), DebVersion("0:1.0-0"))
+        self.assertEqual(DebVersion("0.0.0"), DebVersion("0.0.0-00"))
+        self.assertEqual(hash(DebVersion("1.0")), hash(DebVersion("0:1.0-0")))
+        self.assertEqual(len({DebVersion("1.0"), DebVersion("1.0-0"), DebVersion("1.00")}), 1)
+        self.assertNotEqual(DebVersion("1.0"), "1.0")
+
+    def test_ordering(self):
+        self.assertLess(DebVersion("1.0~rc1"), DebVersion("1.0"))
+        self.assertLess(DebVersion("1.0"), DebVersion("1.0a"))
+        self.assertLess(DebVersion("1.0"), DebVersion("1.0.0"))
+        self.assertGreater(DebVersion("1:0.1"), DebVersion("9.9"))
+        self.assertLessEqual(DebVersion("1.0"), DebVersion("1.0-0"))
+        self.assertGreaterEqual(DebVersion("1.0-1"), DebVersion("1.0-0"))
+
+    def test_policy_tilde_ordering(self):
+        # taken from section 5.6.12 of the debian-policy manual
+        self.assertEqual(
+            sorted(["a", "", "~", "~~a", "~~"], key=revision_key),
+            ["~~", "~~a", "~", "", "a"],
+        )
+
+    def test_key_agrees_with_compare_versions(self):
+        for ver1 in SAMPLE_VERSIONS:
+            for ver2 in SAMPLE_VERSIONS:
+                key1, key2 = version_key(ver1), version_key(ver2)
+                expected = Dpkg.compare_versions(ver1, ver2)
+                self.assertEqual((key1 > key2) - (key1 < key2), expected, (ver1, ver2))
+
+    def test_sort_matches_cmp_to_key(self):
+        shuffled = list(SAMPLE_VERSIONS)
+        random.Random(5612).shuffle(shuffled)
+        by_cmp = sorted(shuffled, key=cmp_to_key(Dpkg.compare_versions))
+        by_key = sorted(shuffled, key=Dpkg.compare_versions_key)
+        self.assertEqual([version_key(x) for x in by_cmp], [version_key(x) for x in by_key])
+        self.assertEqual(
+            sorted(["0:1.0-test1", "1:0.0-test0", "0:1.0-test2"], key=Dpkg.compare_versions_key),
+            ["0:1.0-test1", "0:1.0-test2", "1:0.0-test0"],
+        )
+
+    def test_key_is_plain_tuple(self):
+        self.assertIsInstance(Dpkg.compare_versions_key("1:2.3-4"), tuple)
+
+    def test_empty_revision_is_zero(self):
+        # compare_revisions("", "0") is 0, so the keys must be equal too
+        self.assertEqual(revision_key(""), revision_key("0"))
+        self.assertEqual(DebVersion("1.0-"), DebVersion("1.0"))
+        self.assertEqual(hash(DebVersion("1.0-")), hash(DebVersion("1.0")))
+        self.assertEqual(version_key("1.0-"), version_key("1.0-0"))
+
+
+class BatchVersionsTest(unittest.TestCase):
+    def setUp(self):
+        self.shuffled = list(SAMPLE_VERSIONS) + ["1:99999999999999999999-1", "3.0-1000", "3.0-255", "3.0-256"]
+        random.Random(1234).shuffle(self.shuffled)
+        self.expected = sorted(self.shuffled, key=cmp_to_key(Dpkg.compare_versions))
+
+    def assertSameOrder(self, result, expected):
+        self.assertEqual([version_key(x) for x in result], [version_key(x) for x in expected])
+
+    def test_encode_version_preserves_order(self):
+        for ver1 in SAMPLE_VERSIONS:
+            for ver2 in SAMPLE_VERSIONS:
+                enc1, enc2 = encode_version(ver1), encode_version(ver2)
+                self.assertEqual((enc1 > enc2) - (enc1 < enc2), Dpkg.compare_versions(ver1, ver2), (ver1, ver2))
+        # an empty revision sorts as "0"
+        self.assertEqual(encode_version("1.0-"), encode_version("1.0"))
+        self.assertEqual(Dpkg.argsort_versions(["1.0-1", "1.0-", "1.0", "0.9"]), [3, 1, 2, 0])
+
+    def test_sort_versions(self):
+        self.assertSameOrder(Dpkg.sort_versions(self.shuffled), self.expected)
+        self.assertSameOrder(Dpkg.sort_versions(iter(self.shuffled)), self.expected)
+        self.assertEqual(Dpkg.sort_versions([]), [])
+
+    def test_encode_versions(self):
+        self.assertEqual(encode_versions(self.shuffled), [encode_version(ver) for ver in self.shuffled])
+        self.assertEqual(encode_versions([]), [])
+
+    def test_argsort_versions(self):
+        order = Dpkg.argsort_versions(self.shuffled)
+        self.assertEqual(sorted(order), list(range(len(self.shuffled))))
+        self.assertSameOrder([self.shuffled[i] for i in order], self.expected)
+
+    def test_argsort_is_stable(self):
+        self.assertEqual(Dpkg.argsort_versions(["1.0-0", "1.0", "0:1.0", "0.9"]), [3, 0, 1, 2])
+
+    def test_max_min_version(self):
+        self.assertEqual(Dpkg.max_version(self.shuffled), "2:0.0.44-nobin")
+        self.assertEqual(DebVersion(Dpkg.min_version(self.shuffled)), DebVersion("0.0.0"))
+        self.assertEqual(Dpkg.max_version(["1.0", "1.0~rc1"]), "1.0")
+        self.assertRaises(ValueError, Dpkg.max_version, [])
+
+
+class VersionCacheTest(unittest.TestCase):
+    def tearDown(self):
+        disable_version_cache()
+
+    def test_counters_and_eviction(self):
+        cache = VersionCache(maxsize=2)
+        first = cache.parse("1.0-1")
+        self.assertIs(cache.parse("1.0-1"), first)
+        cache.parse("2.0-1")
+        cache.parse("3.0-1")
+        self.assertNotIn("1.0-1", cache)
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 3, "evictions": 1, "maxsize": 2, "currsize": 2})
+        self.assertEqual(cache.hit_rate, 0.25)
+
+    def test_lru_order(self):
+        cache = VersionCache(maxsize=2)
+        cache.parse("1.0")
+        cache.parse("2.0")
+        cache.parse("1.0")
+        cache.parse("3.0")
+        self.assertIn("1.0", cache)
+        self.assertNotIn("2.0", cache)
+
+    def test_clear(self):
+        cache = VersionCache(maxsize=4)
+        cache.parse("1.0")
+        cache.parse("1.0")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats["hits"], 0)
+        self.assertEqual(cache.hit_rate, 0.0)
+
+    def test_bad_versions_are_not_cached(self):
+        cache = VersionCache()
+        self.assertRaises(DpkgVersionError, cache.parse, "1a:0")
+        self.assertEqual(len(cache), 0)
+
+    def test_bad_maxsize(self):
+        self.assertRaises(ValueError, VersionCache, 0)
+
+    def test_opt_in(self):
+        self.assertIsNone(get_version_cache())
+        cache = enable_version_cache(maxsize=16)
+        self.assertIs(get_version_cache(), cache)
+        self.assertEqual(Dpkg.compare_versions("1.0~rc1", "1.0"), -1)
+        self.assertEqual(Dpkg.compare_versions("1.0~rc1", "1.0"), -1)
+        self.assertEqual(Dpkg.split_full_version("1:2.3-4"), (1, "2.3", "4"))
+        self.assertIs(DebVersion.parse("1:2.3-4"), cache.parse("1:2.3-4"))
+        self.assertEqual(cache.stats["misses"], 3)
+        self.assertEqual(cache.stats["hits"], 4)
+        disable_version_cache()
+        self.assertIsNone(get_version_cache())
+
+    def test_cached_compare_versions_agrees(self):
+        expected = {(a, b): Dpkg.compare_versions(a, b) for a in SAMPLE_VERSIONS for b in SAMPLE_VERSIONS}
+        enable_version_cache(maxsize=8)
+        for (ver1, ver2), result in expected.items():
+            self.assertEqual(Dpkg.compare_versions(ver1, ver2), result, (ver1, ver2))
+
+    def test_cached_dpkg_parsers_agree(self):
+        strings = SAMPLE_VERSIONS + ["1:2:3-4", "2:3-4", "1.0-", "-1", "", "1.0~rc1+b2"]
+        expected = [(Dpkg.get_epoch(s), Dpkg.get_upstream(s), Dpkg.listify(s)) for s in strings]
+        cache = enable_version_cache(maxsize=1024)
+        for _ in range(2):
+            self.assertEqual([(Dpkg.get_epoch(s), Dpkg.get_upstream(s), Dpkg.listify(s)) for s in strings], expected)
+        self.assertEqual(cache.stats["hits"], cache.stats["misses"])
+        # callers get their own lists
+        Dpkg.listify("1.0").append("x")
+        self.assertEqual(Dpkg.listify("1.0"), ["", 1, ".", 0])
+        self.assertRaises(DpkgVersionError, Dpkg.get_epoch, "-1:0")
+        self.assertRaises(DpkgVersionError, Dpkg.get_epoch, "1a:0")
+
+    def test_thread_safety(self):
+        cache = VersionCache(maxsize=64)
+        corpus = [f"1.{i % 100}-{i % 7}" for i in range(2000)]
+
+        def worker():
+            for version in corpus:
+                self.assertEqual(str(cache.parse(version)), version)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats
+        self.assertEqual(stats["hits"] + stats["misses"], 8 * len(corpus))
+        self.assertLessEqual(stats["currsize"], 64)
+        self.assertGreaterEqual(stats["misses"] - stats["evictions"], stats["currsize"])
+
+
+class VersionConstraintTest(unittest.TestCase):
+    def test_parse(self):
+        for text in (">= 1:2.3-4", "(>= 1:2.3-4)", ">=1:2.3-4", "  ( >=  1:2.3-4 ) "):
+            constraint = VersionConstraint(text)
+            self.assertEqual(constraint.relation, ">=")
+            self.assertEqual(constraint.version, DebVersion("1:2.3-4"))
+            self.assertEqual(str(constraint), ">= 1:2.3-4")
+        self.assertEqual(repr(VersionConstraint("<< 2.0")), "VersionConstraint('<< 2.0')")
+
+    def test_bad_constraints(self):
+        for text in ("", "1.0", "~= 1.0", ">= ", ">= 1.0 2.0", ">= 1a:0"):
+            self.assertRaises(DpkgVersionError, VersionConstraint, text)
+
+    def test_relations(self):
+        for relation in ("<<", "<=", "=", ">=", ">>", "<", ">"):
+            constraint = VersionConstraint(f"{relation} 1:2.3-4")
+            for candidate in SAMPLE_VERSIONS + ["1:2.3-4", "1:2.3-4~", "1:2.3-4+b1", "1:2.3-04"]:
+                cmp = Dpkg.compare_versions(candidate, "1:2.3-4")
+                expected = {
+                    "<<": cmp < 0,
+                    "<=": cmp <= 0,
+                    "=": cmp == 0,
+                    ">=": cmp >= 0,
+                    ">>": cmp > 0,
+                    "<": cmp <= 0,
+                    ">": cmp >= 0,
+                }[relation]
+                self.assertEqual(constraint.matches(candidate), expected, (relation, candidate))
+                self.assertEqual(constraint.matches(DebVersion(candidate)), expected, (relation, candidate))
+
+    def test_tildes_and_epochs(self):
+        self.assertTrue(VersionConstraint("<< 2.0").matches("2.0~rc1"))
+        self.assertFalse(VersionConstraint(">= 2.0").matches("2.0~rc1"))
+        self.assertTrue(VersionConstraint(">> 9.9").matches("1:0.1"))
+        self.assertTrue(VersionConstraint("= 1.0").matches("0:1.0-0"))
+
+    def test_filter(self):
+        constraint = VersionConstraint(">= 1.0-1")
+        self.assertEqual(
+            constraint.filter(["0.9", "1.0-1", "1.0~rc1-1", "1:0.1", "1.0-1~bpo1", "1.0-1+deb9u1"]),
+            ["1.0-1", "1:0.1", "1.0-1+deb9u1"],
+        )
+        mixed = [DebVersion("1.0-1"), "0.1"]
+        self.assertEqual(constraint.filter(mixed), [mixed[0]])
+        self.assertEqual(constraint.filter(iter([])), [])
+
+
+class VersionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = VersionIndex(["1.0-1", "0.9-2", "1.0~rc1-1", "1:0.1-1", "1.1-1", "1.0-1+deb9u1", "0.9-2"])
+
+    def test_sorted_and_deduplicated(self):
+        self.assertEqual(list(self.index), ["0.9-2", "1.0~rc1-1", "1.0-1", "1.0-1+deb9u1", "1.1-1", "1:0.1-1"])
+        self.assertEqual(list(reversed(self.index))[0], "1:0.1-1")
+        self.assertEqual(len(self.index), 6)
+        self.assertIn("0:1.0-1", self.index)
+        self.assertNotIn("1.0-2", self.index)
+        self.assertNotIn(1, self.index)
+
+    def test_floor_ceiling(self):
+        self.assertEqual(self.index.floor("1.0-1"), "1.0-1")
+        self.assertEqual(self.index.lower("1.0-1"), "1.0~rc1-1")
+        self.assertEqual(self.index.ceiling("1.0"), "1.0-1")
+        self.assertEqual(self.index.higher("1.0-1"), "1.0-1+deb9u1")
+        self.assertEqual(self.index.lower("1.1"), "1.0-1+deb9u1")
+        self.assertIsNone(self.index.lower("0.9-2"))
+        self.assertIsNone(self.index.higher("1:0.1-1"))
+        self.assertEqual(self.index.lowest(), "0.9-2")
+        self.assertEqual(self.index.highest(), "1:0.1-1")
+        self.assertIsNone(VersionIndex().highest())
+
+    def test_range(self):
+        self.assertEqual(self.index.range("1.0~", "1.1"), ["1.0~rc1-1", "1.0-1", "1.0-1+deb9u1"])
+        self.assertEqual(
+            self.index.range("1.0-1", "1.1-1", low_inclusive=False, high_inclusive=True), ["1.0-1+deb9u1", "1.1-1"]
+        )
+        self.assertEqual(self.index.range(high="1.0"), ["0.9-2", "1.0~rc1-1"])
+        self.assertEqual(self.index.range(low="1.1-1"), ["1.1-1", "1:0.1-1"])
+        self.assertEqual(self.index.range("2.0", "1.0"), [])
+
+    def test_incremental_updates(self):
+        self.assertTrue(self.index.add("1.0-2"))
+        self.assertFalse(self.index.add("0:1.0-2"))
+        self.assertEqual(self.index.higher("1.0-1+deb9u1"), "1.0-2")
+        self.assertTrue(self.index.discard("1.0-2"))
+        self.assertFalse(self.index.discard("1.0-2"))
+        self.assertRaises(KeyError, self.index.remove, "1.0-2")
+        self.index.remove("1:0.1-1")
+        self.assertEqual(self.index.highest(), "1.1-1")
+
+    def test_best(self):
+        self.assertEqual(self.index.best("<< 1.0-1"), "1.0~rc1-1")
+        self.assertEqual(self.index.best("<= 1.0-1"), "1.0-1")
+        self.assertEqual(self.index.best("= 1.0-1"), "1.0-1")
+        self.assertIsNone(self.index.best("= 1.0-2"))
+        self.assertEqual(self.index.best(">= 1.0"), "1:0.1-1")
+        self.assertEqual(self.index.best(VersionConstraint(">> 1:0.1-1")), None)
+        self.assertIsNone(self.index.best("<< 0.9"))
+
+    def test_matches_brute_force(self):
+        rnd = random.Random(42)
+        pool = [
+            f"{rnd.randint(0, 2)}:{rnd.randint(0, 5)}.{rnd.randint(0, 5)}{rnd.choice(['', '~rc1', '+b1'])}-1"
+            for _ in range(200)
+        ]
+        index = VersionIndex(pool)
+        for probe in pool[:50]:
+            below = [v for v in pool if Dpkg.compare_versions(v, probe) < 0]
+            best = index.lower(probe)
+            if not below:
+                self.assertIsNone(best)
+            else:
+                self.assertEqual(DebVersion(best), max(DebVersion(v) for v in below))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+"""Differential fuzz tests: the single-pass comparison engine and the
+precomputed sort keys must agree with the original listify()-based
+implementation.  Set PYDPKG_FUZZ_ITERATIONS to run more (e.g. millions of)
+generated pairs; PYDPKG_FUZZ_SEED picks a different corpus."""
+
+import os
+import random
+import unittest
+
+from pydpkg.dpkg import Dpkg
+from pydpkg.exceptions import DpkgVersionError
+from pydpkg.versions import (
+    DebVersion,
+    compare_revisions,
+    disable_version_cache,
+    enable_version_cache,
+    encode_version,
+    version_key,
+)
+
+ITERATIONS = int(os.environ.get("PYDPKG_FUZZ_ITERATIONS", "20000"))
+SEED = int(os.environ.get("PYDPKG_FUZZ_SEED", "5612"))
+
+# weighted towards the characters that make debian versions interesting
+ALPHABET = "0123456789" * 3 + "~~~+++...abcxyzABZ-:"
+SUFFIXES = ["", "~rc1", "~beta2", "+dfsg", "+dfsg1", "+b1", "~deb12u1", "+really1.0", "ubuntu1", "build1", "~"]
+
+
+def random_part(rnd, max_len=8):
+    """Return a random non-empty upstream/revision string"""
+    part = "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(1, max_len)))
+    return part + rnd.choice(SUFFIXES)
+
+
+def random_upstream(rnd):
+    """Return a random upstream version, sometimes with colons or hyphens"""
+    upstream = random_part(rnd)
+    if rnd.random() < 0.1:
+        upstream += ":" + random_part(rnd, 3)
+    if rnd.random() < 0.1:
+        upstream += "-" + random_part(rnd, 3)
+    return upstream
+
+
+def random_version(rnd):
+    """Return a random full version string"""
+    version = random_upstream(rnd)
+    if rnd.random() < 0.05:
+        # usually a corrupt epoch, such as "-3" or "a", which must be rejected
+        version = f"{random_part(rnd, 2)}:{version}"
+    elif ":" in version or rnd.random() < 0.2:
+        version = f"{rnd.randint(0, 3)}:{version}"
+    if "-" in version.split(":", 1)[-1] or rnd.random() < 0.7:
+        version += "-" + random_part(rnd, 4)
+    return version
+
+
+def mutate(rnd, version):
+    """Return a near-miss of a version, to exercise long common prefixes"""
+    chars = list(version)
+    idx = rnd.randrange(len(chars))
+    action = rnd.random()
+    if action < 0.3:
+        chars.insert(idx, rnd.choice("~+.0a1"))
+    elif action < 0.6 and chars[idx] not in ":-":
+        chars[idx] = rnd.choice("~+.0a9")
+    else:
+        chars.append(rnd.choice("~+.0a1"))
+    return "".join(chars)
+
+
+def legacy_compare_versions(ver1, ver2):
+    """compare_versions() as it was, built on the listify() engine.  That
+    engine cannot handle empty strings, which dpkg takes as "0"."""
+    epoch1, upstream1, debian1 = Dpkg.split_full_version(ver1)
+    epoch2, upstream2, debian2 = Dpkg.split_full_version(ver2)
+    if epoch1 != epoch2:
+        return -1 if epoch1 < epoch2 else 1
+    upstream = Dpkg.compare_revision_strings_listify(upstream1 or "0", upstream2 or "0")
+    return upstream or Dpkg.compare_revision_strings_listify(debian1 or "0", debian2 or "0")
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+class CompareFuzzTest(unittest.TestCase):
+    def setUp(self):
+        self.rnd = random.Random(SEED)
+
+    def pairs(self):
+        for _ in range(ITERATIONS):
+            ver1 = random_version(self.rnd)
+            ver2 = mutate(self.rnd, ver1) if self.rnd.random() < 0.5 else random_version(self.rnd)
+            yield ver1, ver2
+
+    def assert_rejected(self, ver1, ver2):
+        """Every comparison path must reject what the legacy one rejects"""
+        for ver in (ver1, ver2):
+            try:
+                Dpkg.get_epoch(ver)
+            except DpkgVersionError:
+                for check in (version_key, encode_version, DebVersion, lambda bad: Dpkg.compare_versions(bad, "")):
+                    with self.assertRaises(DpkgVersionError, msg=ver):
+                        check(ver)
+        for func in (Dpkg.sort_versions, Dpkg.argsort_versions, Dpkg.max_version):
+            with self.assertRaises(DpkgVersionError, msg=(ver1, ver2)):
+                func([ver1, ver2])
+
+    def test_revision_engines_agree(self):
+        for _ in range(ITERATIONS):
+            rev1 = random_part(self.rnd)
+            rev2 = mutate(self.rnd, rev1) if self.rnd.random() < 0.5 else random_part(self.rnd)
+            expected = Dpkg.compare_revision_strings_listify(rev1, rev2)
+            self.assertEqual(compare_revisions(rev1, rev2), expected, (rev1, rev2))
+            self.assertEqual(compare_revisions(rev2, rev1), -expected, (rev2, rev1))
+
+    def test_full_versions_agree(self):
+        for ver1, ver2 in self.pairs():
+            try:
+                expected = legacy_compare_versions(ver1, ver2)
+            except DpkgVersionError:
+                self.assert_rejected(ver1, ver2)
+                continue
+            self.assertEqual(Dpkg.compare_versions(ver1, ver2), expected, (ver1, ver2))
+            key1, key2 = version_key(ver1), version_key(ver2)
+            self.assertEqual(sign((key1 > key2) - (key1 < key2)), expected, (ver1, ver2))
+            enc1, enc2 = encode_version(ver1), encode_version(ver2)
+            self.assertEqual(sign((enc1 > enc2) - (enc1 < enc2)), expected, (ver1, ver2))
+
+    def test_known_tricky_pairs(self):
+        tricky = [
+            ("1.0", "1.0~"),
+            ("1.0~", "1.0~~"),
+            ("1.0~~a", "1.0~~"),
+            ("1.0+", "1.0"),
+            ("1.0.", "1.0"),
+            ("1.0a", "1.0+"),
+            ("1.0a", "1.0."),
+            ("1.01", "1.1"),
+            ("1.001a", "1.1"),
+            ("1.0000000000000000000000001", "1.1"),
+            ("1.99999999999999999999", "1.100000000000000000000"),
+            ("1:2:3-4", "1:2:3-4~"),
+            ("1.0-beta-1", "1.0-beta-1+b1"),
+            ("1.0-", "1.0"),
+        ]
+        self.addCleanup(disable_version_cache)
+        for cached in (False, True):
+            if cached:
+                enable_version_cache()
+            for ver1, ver2 in tricky:
+                expected = legacy_compare_versions(ver1, ver2)
+                self.assertEqual(Dpkg.compare_versions(ver1, ver2), expected, (ver1, ver2, cached))
+                self.assertEqual(Dpkg.compare_versions(ver2, ver1), -expected, (ver2, ver1, cached))
+                key1, key2 = version_key(ver1), version_key(ver2)
+                self.assertEqual(sign((key1 > key2) - (key1 < key2)), expected, (ver1, ver2))
+                enc1, enc2 = encode_version(ver1), encode_version(ver2)
+                self.assertEqual(sign((enc1 > enc2) - (enc1 < enc2)), expected, (ver1, ver2))